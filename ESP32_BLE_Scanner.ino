@@ -14,13 +14,21 @@ const char* password = "Fluffy11";
 // --- MQTT ---
 const char* mqtt_server = "172.20.10.9";  // Raspberry Pi IP
 const int mqtt_port = 1883;
-const char* mqtt_topic = "edc/missing";
+// Sightings go to the Pi's mqtt_listener (edc/devices), one JSON object per
+// device: {"mac", "name", "rssi", "last_seen": <location>}. edc/missing is
+// the Pi's own missing-item alert topic for the GUI, not scanner input.
+const char* mqtt_topic = "edc/devices";
 
 // --- Device Location ---
 const char* locationName = "Kitchen"; // Change for each ESP32
 
 // --- BLE ---
 int scanTime = 5;
+// Below the old -60 cutoff on purpose: the Pi smooths RSSI and only marks a
+// tag absent once it drops under EXIT_RSSI (-75, presence_engine.py), so it
+// has to see those readings. 5 dB of margin is enough for the smoothing;
+// weaker devices are mostly strays, which the Pi ignores anyway.
+const int minReportRssi = -80;
 BLEScan* pBLEScan;
 
 // --- MQTT Client ---
@@ -61,7 +69,7 @@ void loop() {
     BLEAdvertisedDevice device = foundDevices->getDevice(i);
     int rssi = device.getRSSI();
 
-    if (rssi >= -60) {  // Only close devices
+    if (rssi >= minReportRssi) {
       String name = device.getName().c_str();
       String mac = device.getAddress().toString().c_str();
 
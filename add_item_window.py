@@ -4,23 +4,22 @@ from pathlib import Path
 DATA_FILE = Path.home() / "EDC-Detector" / "data" / "items.json"
 LOGBOOK_FILE = Path.home() / "EDC-Detector" / "data" / "logbook.json"
 
-# Ensure directories exist
-DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-LOGBOOK_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-# Ensure files exist
-if not DATA_FILE.exists():
-    with open(DATA_FILE, "w") as f:
-        json.dump([], f)  # empty list to hold items
-
-if not LOGBOOK_FILE.exists():
-    with open(LOGBOOK_FILE, "w") as f:
-        json.dump([], f)  # empty list to hold log entries
+def ensure_data_files():
+    """
+    Creates the data directory and empty files on first use, not at
+    import (like database.DB, which creates it on connect).
+    """
+    for path in (DATA_FILE, LOGBOOK_FILE):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            with open(path, "w") as f:
+                json.dump([], f)  # empty list to hold items / log entries
 
 def save_item_to_file(item):
     """
     Adds a new item dict to items.json.
     """
+    ensure_data_files()
     with open(DATA_FILE, "r") as f:
         try:
             items = json.load(f)
@@ -38,6 +37,7 @@ def log_event(entry):
     """
     Appends an entry to the logbook file.
     """
+    ensure_data_files()
     with open(LOGBOOK_FILE, "r") as f:
         try:
             logbook = json.load(f)
@@ -4,102 +4,67 @@ import kivy
 from kivy.app import App
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
-from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
-from kivy.clock import Clock
-from kivy.uix.popup import Popup
-from kivy.core.window import Window
 
-import json
-import os
 from threading import Thread
 import time
 import random
-import cv2  # USB camera
-import requests  # for ESP32 HTTP BLE API simulation
+from esp32_poller import ScannerPoller  # ESP32 HTTP BLE API
+from item_registry import get_registry
+from dashboard import ItemDashboard
+from ui_updates import UIUpdateQueue
+from state_socket import attach
+import tracing
 
 kivy.require('2.3.1')
 
-ITEMS_FILE = "items.json"
-
 # ---------------------
-# Items Load/Save
+# Items Load
 # ---------------------
 def load_items():
-    if os.path.exists(ITEMS_FILE):
-        with open(ITEMS_FILE, "r") as f:
-            try:
-                items = json.load(f)
-                if isinstance(items, list):
-                    return {item["name"]: item for item in items}
-                return items
-            except:
-                return {}
-    return {}
-
-def save_items(items):
-    with open(ITEMS_FILE, "w") as f:
-        json.dump(list(items.values()), f, indent=2)
-
-# ---------------------
-# GUI Popups
-# ---------------------
-def show_missing_popup(item_name, last_seen):
-    content = BoxLayout(orientation="vertical", padding=5)
-    content.add_widget(Label(text=f"Missing: {item_name}\nLast seen: {last_seen}", font_size=14))
-    popup = Popup(title="Missing Item", content=content,
-                  size_hint=(None, None), size=(250, 100),
-                  auto_dismiss=True, separator_height=0)
-    popup.pos = (Window.width - 260, Window.height - 120)
-    popup.open()
-    Clock.schedule_once(lambda dt: popup.dismiss(), 4)
+    # A copy: the registry replaces its name index on re-indexing, and the
+    # state client thread may change a mirror registry at any time
+    return get_registry().items_by_name()
 
 # ---------------------
 # Screens
 # ---------------------
+def format_item_row(item_name, item):
+    location = item.get("last_seen_location", "Unknown")
+    timestamp = item.get("last_seen_time", "Never")
+    return f"{item_name} - Last seen: {timestamp} at {location}"
+
 class MainScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.items = load_items()
-        self.layout = GridLayout(cols=1, spacing=5, padding=10)
+        self.layout = BoxLayout(orientation="vertical", spacing=5, padding=10)
         self.add_widget(self.layout)
+        self.dashboard = ItemDashboard(format_item_row)
+        self.layout.add_widget(self.dashboard)
+        self.add_btn = Button(text="Add Item", size_hint_y=None, height=40)
+        self.add_btn.bind(on_release=self.go_to_add_item)
+        self.layout.add_widget(self.add_btn)
+        self.updates = UIUpdateQueue(self)
         self.refresh_dashboard()
 
     def go_to_add_item(self, instance):
         self.manager.current = "add_item"
 
     def refresh_dashboard(self):
-        self.layout.clear_widgets()
-
-        for item_name, item in self.items.items():
-            location = item.get("last_seen_location", "Unknown")
-            timestamp = item.get("last_seen_time", "Never")
-
-            self.layout.add_widget(
-                Label(text=f"{item_name} - Last seen: {timestamp} at {location}")
-            )
-
-            add_btn = Button(text = "Add Item", size_hint_y=None, height=40)
-            add_btn.bind(on_release=self.go_to_add_item)
-            self.layout.add_widget(add_btn)
-        # if not hasattr(self, "add_btn"):
-        #     self.add_btn = Button(text="Add Item", size_hint_y=None, height=40)
-        #     self.add_btn.bind(on_release=self.go_to_add_item)
-        # self.layout.clear_widgets()
-        # for item_name, item in self.items.items():
-        #     self.layout.add_widget(
-        #         Label(text=f"{item_name} - Last seen: {item.get('last_seen','N/A')}")
-        #     )
-        # self.layout.add_widget(self.add_btn)
+        self.dashboard.set_items(load_items())
+
+    def refresh_item(self, item_name):
+        item = get_registry().copy_by_name(item_name)
+        if item is None:
+            self.dashboard.remove_item(item_name)
+        else:
+            self.dashboard.update_item(item_name, item)
 
     def update_item_last_seen(self, item_name, last_seen):
-        if item_name in self.items:
-            self.items[item_name]["last_seen"] = last_seen
-            save_items(self.items)
-            self.refresh_dashboard()
-            show_missing_popup(item_name, last_seen)
+        # Applied with any other pending changes on the next frame
+        with tracing.span("gui.update_item_last_seen", item=item_name):
+            self.updates.submit_missing(item_name, last_seen)
 
 # ---------------------
 # Add Item Screen
@@ -130,9 +95,8 @@ class AddItemScreen(Screen):
         mac = self.mac_input.text.strip()
         if not name:
             return
-        self.main_screen.items[name] = {"name": name, "mac": mac, "last_seen": "Never"}
-        save_items(self.main_screen.items)
-        self.main_screen.refresh_dashboard()
+        get_registry().add({"name": name, "mac": mac, "required": True, "last_seen": "Never"})
+        self.main_screen.refresh_item(name)
         self.go_back(instance)
 
     def go_back(self, instance):
@@ -141,7 +105,8 @@ class AddItemScreen(Screen):
 # ---------------------
 # Camera Detection
 # ---------------------
-def camera_detection_loop(main_screen, esp32_addresses):
+def camera_detection_loop(main_screen, poller):
+    import cv2  # USB camera; only loaded when this GUI runs detection itself
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         print("USB camera not detected")
@@ -153,69 +118,67 @@ def camera_detection_loop(main_screen, esp32_addresses):
         # Simulate person detection
         person_detected = random.choice([True, False, False])  # 33% chance
         if person_detected:
-            check_missing_items(main_screen, esp32_addresses)
+            check_missing_items(main_screen, poller)
         time.sleep(2)
     cap.release()
 
 # ---------------------
 # ESP32 BLE Detection
 # ---------------------
-def check_missing_items(main_screen, esp32_addresses):
+def check_missing_items(main_screen, poller):
     """
-    Contacts ESP32s via HTTP API to get currently seen BLE tags.
-    Compares with saved items to detect missing ones.
+    Polls all ESP32s concurrently (see esp32_poller) for the BLE tags they
+    currently see and records where each saved item was seen.
     """
-    # seen_macs = set()
-    for addr in esp32_addresses:
-        try:
-            # Example: ESP32 serves JSON {"seen": ["MAC1", "MAC2"]}
-            resp = requests.get(f"http://{addr}/seen", timeout=2)
-            if resp.status_code == 200:
-                continue
-                
-            data = resp.json()
-            location = data.get("location", addr)
-            seen_macs = {m.lower() for m in data.get("seen", [])}
-
-            for item_name, item in main_screen.items.items():
-                mac = item.get("mac", "").lower()
-                
-                if not mac:
-                    continue
-                if mac in seen_macs:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    Clock.schedule_once(lambda dt, n=item_name, loc=location, ts=timestamp:main_screen.update_item_last_seen(n, loc, ts))
-        except:
-            continue
-
-    # # Detect missing items
-    # for item_name, item in main_screen.items.items():
-    #     mac = item.get("mac", "").lower()
-    #     if mac and mac not in map(str.lower, seen_macs):
-    #         last_seen = item.get("last_seen", "Unknown")
-    #         # Update GUI on main thread
-    #         Clock.schedule_once(lambda dt, n=item_name, l=last_seen: main_screen.update_item_last_seen(n, l))
+    # Example: each ESP32 serves JSON {"location": "Kitchen", "seen": ["MAC1", "MAC2"]}
+    seen = poller.poll()
+    if not seen:
+        return
+
+    registry = get_registry()
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for mac, location in seen.items():
+        item = registry.get(mac)
+        if item is not None:
+            # Applied on the main thread, once per frame for the whole sweep
+            main_screen.updates.submit(item["name"], last_seen_location=location, last_seen_time=timestamp)
 
 # ---------------------
 # App
 # ---------------------
 class EverydayCarryApp(App):
     def build(self):
+        # With a headless daemon running (python edc.py daemon) detection
+        # lives there and the registry is a live mirror of the daemon's
+        self.main_screen = None
+        self.state_client = attach(on_update=self.on_state_update)
+
         sm = ScreenManager()
         main_screen = MainScreen(name="main")
+        self.main_screen = main_screen
         add_screen = AddItemScreen(main_screen, name="add_item")
         sm.add_widget(main_screen)
         sm.add_widget(add_screen)
 
+        if self.state_client is not None:
+            print("Attached to the EDC daemon; detection runs there")
+            main_screen.updates.submit_refresh(True)
+            return sm
+
         # ESP32 IP addresses (replace with your ESP32 devices)
         esp32_addresses = ["172.20.10.7", "172.20.10.10"]
+        poller = ScannerPoller(esp32_addresses)
 
         # Start camera/person detection in thread
-        detection_thread = Thread(target=camera_detection_loop, args=(main_screen, esp32_addresses), daemon=True)
+        detection_thread = Thread(target=camera_detection_loop, args=(main_screen, poller), daemon=True)
         detection_thread.start()
 
         return sm
 
+    def on_state_update(self, full, changed, removed):
+        if self.main_screen is not None:
+            self.main_screen.updates.submit_refresh(full, changed, removed)
+
 if __name__ == "__main__":
     EverydayCarryApp().run()
 
@@ -1,25 +1,57 @@
 import cv2
 import time
+import tracing
 from missing_logic import check_missing_items
+from motion_gate import MotionGate
+from rate_controller import RateController
+from vision_pipeline import FramePipeline, export_pipeline_metrics
+from metrics import counter, gauge, histogram
 
 PROTOTXT = "deploy.prototxt"
 MODEL = "res10_300x300_ssd_iter_140000.caffemodel"
 
+# DNN configuration; `python vision_benchmark.py --sweep` shows what each achieves here
+DNN_BACKEND = "default"  # key of BACKENDS
+DNN_TARGET = "cpu"       # key of TARGETS
+INPUT_SIZE = 300         # square input side; the SSD runs at any size, smaller is faster but misses small faces
+DNN_THREADS = 0          # OpenCV threads, 0 = leave OpenCV's default
+MODEL_MEAN = (104.0, 177.0, 123.0)
+
+BACKENDS = {name: getattr(cv2.dnn, attr) for name, attr in (
+    ("default", "DNN_BACKEND_DEFAULT"),
+    ("opencv", "DNN_BACKEND_OPENCV"),
+    ("openvino", "DNN_BACKEND_INFERENCE_ENGINE"),
+    ("cuda", "DNN_BACKEND_CUDA"),
+    ("vulkan", "DNN_BACKEND_VKCOM"),
+) if hasattr(cv2.dnn, attr)}
+TARGETS = {name: getattr(cv2.dnn, attr) for name, attr in (
+    ("cpu", "DNN_TARGET_CPU"),
+    ("cpu_fp16", "DNN_TARGET_CPU_FP16"),
+    ("opencl", "DNN_TARGET_OPENCL"),
+    ("opencl_fp16", "DNN_TARGET_OPENCL_FP16"),
+    ("myriad", "DNN_TARGET_MYRIAD"),
+    ("cuda", "DNN_TARGET_CUDA"),
+    ("cuda_fp16", "DNN_TARGET_CUDA_FP16"),
+    ("vulkan", "DNN_TARGET_VULKAN"),
+) if hasattr(cv2.dnn, attr)}
+
+# Inference pacing (see rate_controller), replacing a fixed sleep
+CPU_BUDGET = 0.75        # fraction of one core this process may use, None to ignore
+LATENCY_TARGET = None    # seconds from capture to face result, None to ignore
+
 CONFIDENCE_THRESHOLD = 0.5
 COOLDOWN = 5  # seconds between triggers
 
+# Motion gate in front of the DNN
+MOTION_THRESHOLD = 0.01  # fraction of changed pixels needed to run inference
+FORCE_EVERY = 50         # run inference at least once per this many frames
+STATS_INTERVAL = 60      # seconds between motion gate stats printouts
 
-def monitor_camera():
-    print("Starting camera person detection...")
+DNN_SECONDS = histogram("edc_dnn_forward_seconds", "DNN forward() time", ["model"]).labels(model="face")
+TRIGGERS = counter("edc_camera_triggers_total", "Missing-item checks triggered by a face")
 
-    # Load face detection model safely
-    try:
-        net = cv2.dnn.readNetFromCaffe(PROTOTXT, MODEL)
-        print("Face detection model loaded successfully.")
-    except Exception as e:
-        print("Error loading face detection model:", e)
-        return
 
+def open_camera():
     # Try V4L2 backend first, fallback to default if it fails
     try:
         cap = cv2.VideoCapture("v4l2src device=/dev/video0 ! videoconvert ! appsink", cv2.CAP_GSTREAMER)
@@ -28,56 +60,139 @@ def monitor_camera():
             cap = cv2.VideoCapture(0)
     except Exception as e:
         print("Error opening camera:", e)
-        return
+        return None
 
     if not cap.isOpened():
         print("Error: Could not open camera at all.")
-        return
+        return None
+    return cap
+
+
+def resize_for_model(frame, size=None):
+    # Resize frame for model
+    size = size or INPUT_SIZE
+    return cv2.resize(frame, (size, size))
+
+
+def make_blob(resized, size=None):
+    # Preprocessing for res10 face model
+    size = size or INPUT_SIZE
+    return cv2.dnn.blobFromImage(
+        resized,
+        1.0,
+        (size, size),
+        MODEL_MEAN
+    )
+
+
+def has_confident_face(detections):
+    # detections is 1x1xNx7 with each box's confidence in column 2
+    return bool((detections[0, 0, :, 2] > CONFIDENCE_THRESHOLD).any())
 
-    print("Camera opened successfully.")
-    last_trigger_time = 0
 
-    while True:
-        try:
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                print("Failed to grab frame, retrying...")
-                time.sleep(0.1)
-                continue
-
-            # Resize frame for model
-            resized = cv2.resize(frame, (300, 300))
-
-            # Preprocessing for res10 face model
-            blob = cv2.dnn.blobFromImage(
-                resized,
-                1.0,
-                (300, 300),
-                (104.0, 177.0, 123.0)
-            )
-
-            net.setInput(blob)
+def load_face_net(backend=None, target=None):
+    """Load the res10 SSD on the configured (or given) backend and target."""
+    backend, target = backend or DNN_BACKEND, target or DNN_TARGET
+    if backend not in BACKENDS or target not in TARGETS:
+        raise ValueError(f"unknown DNN backend/target {backend}/{target}; "
+                         f"this OpenCV has {sorted(BACKENDS)} / {sorted(TARGETS)}")
+    net = cv2.dnn.readNetFromCaffe(PROTOTXT, MODEL)
+    net.setPreferableBackend(BACKENDS[backend])
+    net.setPreferableTarget(TARGETS[target])
+    return net
+
+
+def describe_config():
+    threads = DNN_THREADS or f"{cv2.getNumThreads()} (default)"
+    return f"{DNN_BACKEND}/{DNN_TARGET}, {INPUT_SIZE}x{INPUT_SIZE}, {threads} threads"
+
+
+def make_face_detector(net, gate):
+    """Inference stage: True/False for a confident face, None if the gate skipped the frame."""
+    def infer(frame):
+        # Skip the DNN while the scene is static
+        if not gate.should_infer(frame):
+            return None
+
+        net.setInput(make_blob(resize_for_model(frame)))
+        with DNN_SECONDS.time(), tracing.span("dnn.forward"):
             detections = net.forward()
+        return has_confident_face(detections)
 
-            face_detected = False
+    return infer
 
-            for i in range(detections.shape[2]):
-                confidence = float(detections[0, 0, i, 2])
-                if confidence > CONFIDENCE_THRESHOLD:
-                    face_detected = True
-                    break
 
-            current_time = time.time()
-            if face_detected and (current_time - last_trigger_time) > COOLDOWN:
-                print("Face detected! Checking missing items...")
-                try:
-                    check_missing_items()
-                except Exception as e:
-                    print("Error checking missing items:", e)
-                last_trigger_time = current_time
+def monitor_camera(gate=None, source=None, on_trigger=None, controller=None):
+    """
+    Run face-triggered detection on one camera until interrupted.
+    `on_trigger(captured_at)` is called for each trigger (after COOLDOWN);
+    by default the missing-item check runs right here.
+    """
+    print("Starting camera person detection...")
+    if on_trigger is None:
+        on_trigger = lambda captured_at: check_missing_items()
+    if gate is None:
+        gate = MotionGate(threshold=MOTION_THRESHOLD, force_every=FORCE_EVERY)
+    if controller is None:
+        controller = RateController(cpu_budget=CPU_BUDGET, latency_target=LATENCY_TARGET)
+    if DNN_THREADS:
+        cv2.setNumThreads(DNN_THREADS)
 
-            time.sleep(0.05)  # Reduce CPU usage
+    # Load face detection model safely
+    try:
+        net = load_face_net()
+        print(f"Face detection model loaded successfully ({describe_config()}).")
+    except Exception as e:
+        print("Error loading face detection model:", e)
+        return
+
+    # `source` may be any frame source (see frame_sources), e.g. a recorded clip
+    cap = open_camera() if source is None else source
+    if cap is None or not cap.isOpened():
+        return
 
-        except Exception as e:
-            print("Unexpected error in camera loop:", e)
-            time.sleep(1)
+    print("Camera opened successfully.")
+    last_trigger_time = 0
+
+    def on_result(face_detected, frame, captured_at):
+        nonlocal last_trigger_time
+        current_time = time.time()
+        if face_detected and (current_time - last_trigger_time) <= COOLDOWN:
+            tracing.instant("cooldown", remaining=COOLDOWN - (current_time - last_trigger_time))
+        elif face_detected:
+            print(f"Face detected ({current_time - captured_at:.2f}s after capture)! Checking missing items...")
+            TRIGGERS.inc()
+            try:
+                on_trigger(captured_at)
+            except Exception as e:
+                print("Error checking missing items:", e)
+            last_trigger_time = current_time
+
+    # Capture, inference and triggering run in their own threads and
+    # only ever hand the newest frame/result to the next stage.
+    pipeline = FramePipeline(cap, make_face_detector(net, gate), on_result, controller=controller).start()
+    export_pipeline_metrics(pipeline, "camera")
+    for key, help in (("inferred", "Frames the motion gate passed to the DNN"),
+                      ("skipped", "Frames the motion gate kept from the DNN"),
+                      ("forced", "Frames passed to the DNN without motion (FORCE_EVERY)")):
+        counter(f"edc_motion_gate_{key}_total", help).set_function(lambda key=key: gate.stats()[key])
+    gauge("edc_inference_interval_seconds", "Pause the rate controller puts between inferences").set_function(
+        lambda: controller.interval)
+    gauge("edc_inference_rate", "Inferences per second over the controller's last window").set_function(
+        controller.current_rate)
+    try:
+        # Runs until interrupted, or until a recorded source runs out
+        while not pipeline.finished.wait(STATS_INTERVAL):
+            stats = gate.stats()
+            pipe = pipeline.stats()
+            rate = controller.stats()
+            print(f"Motion gate: {stats['inferred']} inferred, {stats['skipped']} skipped "
+                  f"({stats['skip_ratio']:.0%}), {stats['forced']} forced; "
+                  f"{pipe['captured']} frames captured, {pipe['frames_dropped']} superseded before inference; "
+                  f"{rate['rate']:.1f} inferences/s, {rate['interval'] * 1000:.0f} ms apart, "
+                  f"CPU {rate['cpu']:.0%}, latency {rate['latency'] * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        cap.release()
@@ -0,0 +1,184 @@
+# camera_supervisor.py
+#
+# One face-detection worker process per camera. Each worker loads its own
+# copy of the model and keeps its frames to itself; only small trigger
+# events cross into the supervisor, which restarts dead workers and turns
+# the events from all cameras into one de-duplicated stream.
+#
+#   python edc.py cameras --camera "Front Door=0" --camera "Back Door=1"
+import multiprocessing
+import queue
+import threading
+import time
+
+import tracing
+from metrics import counter, gauge
+
+CAMERAS = [{"name": "Front Door", "source": "0"}]
+DEDUP_WINDOW = 10.0     # seconds in which triggers from any camera count as one event
+WATCH_INTERVAL = 1.0    # seconds between worker liveness checks
+RESTART_BASE = 2.0      # first restart delay, doubled for every crash in a row
+RESTART_MAX = 60.0
+STABLE_AFTER = 60.0     # seconds a worker must run before its crash streak resets
+
+
+def camera_worker(name, source, events, settings=None):
+    """
+    Worker process body: one camera, one model, one pipeline. `settings`
+    overrides camera_monitor's module settings (DNN_BACKEND, INPUT_SIZE,
+    CPU_BUDGET, ...) in this process.
+    """
+    import cv2
+    import camera_monitor
+    from frame_sources import open_source
+
+    # One OpenCV thread per worker, so N workers use N cores without
+    # oversubscribing them (unless settings ask for DNN_THREADS)
+    cv2.setNumThreads(1)
+    for key, value in (settings or {}).items():
+        setattr(camera_monitor, key, value)
+
+    def on_trigger(captured_at):
+        # The frame's trace id (None unless EDC_TRACE is set) continues in the supervisor
+        events.put({"camera": name, "time": captured_at, "trace": tracing.current()})
+
+    cap = open_source(source)
+    camera_monitor.monitor_camera(source=cap, on_trigger=on_trigger)
+
+
+class CameraSupervisor:
+    """
+    Starts a worker per camera, restarts crashed ones with exponential
+    backoff, and calls `on_event(event)` at most once per DEDUP_WINDOW for
+    triggers from any camera; the event lists every camera that fired.
+    """
+
+    def __init__(self, cameras=CAMERAS, on_event=None, dedup_window=DEDUP_WINDOW, settings=None):
+        self.cameras = [dict(camera) for camera in cameras]
+        self.on_event = on_event or default_on_event
+        self.dedup_window = dedup_window
+        self.settings = dict(settings or {})
+
+        self.context = multiprocessing.get_context("spawn")
+        self.events = self.context.Queue()
+        self.workers = {}   # camera name -> worker state
+        self.stopping = threading.Event()
+        self.threads = []
+
+        self.received = 0
+        self.dispatched = 0
+        self.last_event = None
+
+    # --- Workers ---
+    def _spawn(self, camera):
+        if self.stopping.is_set():
+            return
+        process = self.context.Process(target=camera_worker, name=f"camera-{camera['name']}",
+                                       args=(camera["name"], camera["source"], self.events, self.settings),
+                                       daemon=True)
+        process.start()
+        worker = self.workers.setdefault(camera["name"], {"camera": camera, "restarts": 0, "crashes": 0})
+        worker.update(process=process, started=time.monotonic(), restart_at=None)
+        print(f"Camera worker '{camera['name']}' started (pid {process.pid})")
+
+    def _watch(self):
+        while not self.stopping.wait(WATCH_INTERVAL):
+            now = time.monotonic()
+            for name, worker in self.workers.items():
+                process = worker["process"]
+                if process.is_alive():
+                    continue
+                if worker["restart_at"] is None:
+                    if now - worker["started"] >= STABLE_AFTER:
+                        worker["crashes"] = 0
+                    worker["crashes"] += 1
+                    delay = min(RESTART_MAX, RESTART_BASE * 2 ** (worker["crashes"] - 1))
+                    worker["restart_at"] = now + delay
+                    print(f"Camera worker '{name}' exited with code {process.exitcode}; "
+                          f"restarting in {delay:.0f}s")
+                elif now >= worker["restart_at"]:
+                    worker["restarts"] += 1
+                    self._spawn(worker["camera"])
+
+    # --- Events ---
+    def _dispatch(self):
+        while not self.stopping.is_set():
+            try:
+                event = self.events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.received += 1
+
+            now = time.monotonic()
+            last = self.last_event
+            if last is not None and now - last["at"] < self.dedup_window:
+                # Same person seen by another door (or again): fold into the last event
+                tracing.instant("camera.dedup", event.get("trace"), camera=event["camera"])
+                last["count"] += 1
+                if event["camera"] not in last["cameras"]:
+                    last["cameras"].append(event["camera"])
+                continue
+            with tracing.span("camera.event", event.get("trace"), camera=event["camera"]):
+                self._emit({"cameras": [event["camera"]], "time": event["time"], "count": 1, "at": now})
+
+    def _emit(self, event):
+        self.last_event = event
+        self.dispatched += 1
+        try:
+            self.on_event(event)
+        except Exception as e:
+            print("Error handling camera event:", e)
+
+    # --- Lifecycle ---
+    def start(self):
+        for camera in self.cameras:
+            self._spawn(camera)
+            name = camera["name"]
+            gauge("edc_camera_worker_up", "1 while the camera's worker process is alive", ["camera"]).labels(
+                camera=name).set_function(lambda name=name: int(self.workers[name]["process"].is_alive()))
+            counter("edc_camera_worker_restarts_total", "Camera worker restarts", ["camera"]).labels(
+                camera=name).set_function(lambda name=name: self.workers[name]["restarts"])
+        counter("edc_camera_events_total", "Trigger events received from camera workers").set_function(
+            lambda: self.received)
+        counter("edc_camera_checks_total", "Missing-item checks after de-duplication").set_function(
+            lambda: self.dispatched)
+        for target, name in ((self._watch, "camera-watch"), (self._dispatch, "camera-events")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        for worker in self.workers.values():
+            worker["process"].terminate()
+        for worker in self.workers.values():
+            worker["process"].join(timeout=5)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "dispatched": self.dispatched,
+            "workers": {
+                name: {"alive": w["process"].is_alive(), "pid": w["process"].pid,
+                       "restarts": w["restarts"], "crashes": w["crashes"]}
+                for name, w in self.workers.items()
+            },
+        }
+
+
+def default_on_event(event):
+    from missing_logic import check_missing_items
+    print(f"Trigger from {', '.join(event['cameras'])}; checking missing items...")
+    check_missing_items()
+
+
+def parse_camera(spec):
+    """'Front Door=0' -> {"name": "Front Door", "source": "0"}; a bare source is named after itself."""
+    name, sep, source = spec.partition("=")
+    if not sep:
+        name, source = spec, spec
+    return {"name": name.strip(), "source": source.strip()}
@@ -0,0 +1,51 @@
+# dashboard.py
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+
+ROW_HEIGHT = 30
+
+
+class ItemDashboard(RecycleView):
+    """
+    Virtualized item list: only the visible rows get Label widgets, and
+    rows are keyed by item name so updating one item only rewrites its
+    own row in `data` instead of rebuilding the whole list.
+    """
+
+    def __init__(self, format_row, **kwargs):
+        super().__init__(**kwargs)
+        self.format_row = format_row
+        self.rows = {}   # item name -> index in self.data
+        self.viewclass = "Label"
+
+        layout = RecycleBoxLayout(orientation="vertical", default_size=(None, ROW_HEIGHT),
+                                  default_size_hint=(1, None), size_hint_y=None, spacing=5)
+        layout.bind(minimum_height=layout.setter("height"))
+        self.add_widget(layout)
+
+    def _row(self, name, item):
+        return {"text": self.format_row(name, item)}
+
+    def set_items(self, items):
+        """Full rebuild from a {name: item} dict."""
+        self.rows = {name: i for i, name in enumerate(items)}
+        self.data = [self._row(name, item) for name, item in items.items()]
+
+    def update_item(self, name, item):
+        """Add or refresh a single row."""
+        row = self._row(name, item)
+        index = self.rows.get(name)
+        if index is None:
+            self.rows[name] = len(self.data)
+            self.data.append(row)
+        elif self.data[index] != row:
+            self.data[index] = row
+
+    def remove_item(self, name):
+        index = self.rows.pop(name, None)
+        if index is None:
+            return
+        del self.data[index]
+        for other, i in self.rows.items():
+            if i > index:
+                self.rows[other] = i - 1
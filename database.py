@@ -1,14 +1,54 @@
+import queue
 import sqlite3
+import threading
+import time
 from pathlib import Path
 
-DB_FILE = Path.home() / "EDC-Detector" / "data" / "edc.db"
-DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+from metrics import counter, gauge, histogram
+
+DB_FILE = Path.home() / "EDC-Detector" / "data" / "edc.db"   # its directory is created on first connect
+
+WRITE_BATCH_SIZE = 500      # max queued writes committed in one transaction
+WRITE_FLUSH_INTERVAL = 0.2  # max seconds a queued write waits for its batch
+
+COMMIT_SECONDS = histogram("edc_db_commit_seconds", "SQLite commit time (one statement or one batch)", ["mode"])
+WRITES = counter("edc_db_writes_total", "SQLite write statements committed", ["mode"])
+WRITE_ERRORS = counter("edc_db_write_errors_total", "SQLite write statements that failed")
 
 class DB:
-    def __init__(self):
-        self.conn = sqlite3.connect(DB_FILE)
+    """
+    By default every write is committed immediately on this thread's
+    connection. With background=True, writes from any thread are queued
+    to a single writer thread that commits them in batches (WAL journal),
+    and reads use a per-thread connection. Writes after close() raise
+    sqlite3.ProgrammingError, as they would on a closed connection.
+    """
+    def __init__(self, background=False, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL):
+        self.background = background
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.closed = False
+        self._close_lock = threading.Lock()
+        self.conn = self._connect()
         self.create_tables()
 
+        self._local = threading.local()
+        self._queue = None
+        self._writer = None
+        if background:
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+            gauge("edc_db_queue_depth", "Writes waiting for the background writer").set_function(self._queue.qsize)
+
+    def _connect(self):
+        DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(DB_FILE, timeout=30)
+        if self.background:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
     def create_tables(self):
         c = self.conn.cursor()
         # Users table
@@ -39,44 +79,168 @@ class DB:
         """)
         self.conn.commit()
 
+    # --- Write path ---
+    def _write(self, sql, params=(), many=False, wait=False):
+        """
+        Run an INSERT/UPDATE/DELETE. In background mode the statement is
+        queued; with wait=True the call blocks until it is committed and
+        returns True/False for success.
+        """
+        if not self.background:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            try:
+                with COMMIT_SECONDS.labels(mode="direct").time():
+                    if many:
+                        self.conn.executemany(sql, params)
+                    else:
+                        self.conn.execute(sql, params)
+                    self.conn.commit()
+                WRITES.labels(mode="direct").inc()
+                return True
+            except sqlite3.Error:
+                WRITE_ERRORS.inc()
+                self.conn.rollback()
+                if wait:
+                    return False
+                raise
+
+        done = threading.Event() if wait else None
+        op = {"sql": sql, "params": params, "many": many, "done": done, "ok": True}
+        with self._close_lock:
+            # The writer exits at the close() sentinel; anything queued after it would never be committed
+            if self.closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            self._queue.put(op)
+        if done is None:
+            return None
+        done.wait()
+        return op["ok"]
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            op = self._queue.get()
+            if op is None:
+                self._queue.task_done()
+                break
+            batch = [op]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    op = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if op is None:
+                    stop = True
+                    break
+                batch.append(op)
+
+            self._commit_batch(conn, batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                break
+        conn.close()
+
+    def _commit_batch(self, conn, batch):
+        start = time.perf_counter()
+        try:
+            with conn:
+                for op in batch:
+                    self._apply(conn, op)
+            WRITES.labels(mode="batch").inc(len(batch))
+        except sqlite3.Error:
+            # One bad statement must not lose the whole batch: replay individually
+            for op in batch:
+                try:
+                    with conn:
+                        self._apply(conn, op)
+                except sqlite3.Error as e:
+                    WRITE_ERRORS.inc()
+                    op["ok"] = False
+                    if op["done"] is None:
+                        print("Error writing to database:", e)
+                else:
+                    WRITES.labels(mode="batch").inc()
+        COMMIT_SECONDS.labels(mode="batch").observe(time.perf_counter() - start)
+        for op in batch:
+            if op["done"] is not None:
+                op["done"].set()
+
+    def _apply(self, conn, op):
+        if op["many"]:
+            conn.executemany(op["sql"], op["params"])
+        else:
+            conn.execute(op["sql"], op["params"])
+
+    def flush(self):
+        """Block until every queued write has been committed."""
+        if self.background:
+            self._queue.join()
+
+    def close(self):
+        with self._close_lock:
+            self.closed = True
+        if self.background and self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        self.conn.close()
+
+    # --- Read path ---
+    def _reader(self):
+        if not self.background:
+            return self.conn
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
     # --- User methods ---
     def create_user(self, email, password):
-        try:
-            self.conn.execute("INSERT INTO users (email, password) VALUES (?, ?)", (email, password))
-            self.conn.commit()
-            return True
-        except:
-            return False
+        return self._write("INSERT INTO users (email, password) VALUES (?, ?)", (email, password), wait=True)
 
     def verify_user(self, email, password):
-        c = self.conn.cursor()
+        c = self._reader().cursor()
         c.execute("SELECT * FROM users WHERE email=? AND password=?", (email, password))
         return c.fetchone() is not None
 
     # --- Items methods ---
     def add_item(self, name, desc, mac):
-        self.conn.execute("INSERT INTO items (name, desc, mac) VALUES (?, ?, ?)", (name, desc, mac.lower()))
-        self.conn.commit()
+        self._write("INSERT INTO items (name, desc, mac) VALUES (?, ?, ?)", (name, desc, mac.lower()))
 
     def update_item(self, item_id, name, desc, mac):
-        self.conn.execute("UPDATE items SET name=?, desc=?, mac=? WHERE id=?", (name, desc, mac.lower(), item_id))
-        self.conn.commit()
+        self._write("UPDATE items SET name=?, desc=?, mac=? WHERE id=?", (name, desc, mac.lower(), item_id))
 
     def delete_item(self, item_id):
-        self.conn.execute("DELETE FROM items WHERE id=?", (item_id,))
-        self.conn.commit()
+        self._write("DELETE FROM items WHERE id=?", (item_id,))
 
     def get_items(self):
-        c = self.conn.cursor()
+        c = self._reader().cursor()
         c.execute("SELECT id, name, desc, mac FROM items ORDER BY id")
         return c.fetchall()
 
     # --- Events methods ---
     def add_event(self, level, event, timestamp):
-        self.conn.execute("INSERT INTO events (level, event, timestamp) VALUES (?, ?, ?)", (level, event, timestamp))
-        self.conn.commit()
+        self._write("INSERT INTO events (level, event, timestamp) VALUES (?, ?, ?)", (level, event, timestamp))
+
+    def add_events(self, events, wait=False):
+        """Bulk insert of (level, event, timestamp) rows. With wait=True, blocks until
+        committed and returns True/False (see _write)."""
+        events = list(events)
+        if events:
+            return self._write("INSERT INTO events (level, event, timestamp) VALUES (?, ?, ?)", events, many=True,
+                               wait=wait)
+        return True if wait else None
 
     def GetEvents(self):
-        c = self.conn.cursor()
+        c = self._reader().cursor()
         c.execute("SELECT level, event, timestamp FROM events ORDER BY id")
         return c.fetchall()
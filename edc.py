@@ -0,0 +1,194 @@
+# edc.py
+#
+# Headless entry point for the Pi-side roles. Each role imports only what
+# it needs, so e.g. the listener never loads Kivy or OpenCV.
+#
+#   python edc.py daemon --detector         # listener + state socket for GUIs + detector process
+#   python edc.py listener                  # BLE sightings -> item registry
+#   python edc.py handler                   # edc/items presence updates
+#   python edc.py detector --source 0       # HOG person detector, no window
+#   python edc.py camera --source video.mp4 # face-triggered missing-item check
+#   python edc.py camera --dnn opencv/opencl --input-size 224 --cpu-budget 0.5
+#   python edc.py cameras --camera "Front Door=0" --camera "Back Door=1"
+#   python edc.py daemon --detector --trace /tmp/edc-trace   # per-stage spans, see tracing.py
+import argparse
+import multiprocessing
+import time
+from datetime import datetime
+from threading import Thread
+
+POLL_INTERVAL = 2.0     # seconds between ESP32 HTTP sweeps in the daemon
+
+
+def run_listener(args):
+    import mqtt_listener
+    if args.broker:
+        mqtt_listener.MQTT_BROKER = args.broker
+    mqtt_listener.main()
+
+
+def poll_scanners(addresses, interval=POLL_INTERVAL):
+    """Record where each item was seen by the ESP32 /seen endpoints (see esp32_poller)."""
+    from esp32_poller import ScannerPoller
+    from item_registry import get_registry
+
+    poller = ScannerPoller(addresses)
+    registry = get_registry()
+    while True:
+        seen = poller.poll()
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for mac, location in seen.items():
+            registry.update(mac, last_seen_location=location, last_seen_time=timestamp)
+        time.sleep(interval)
+
+
+def detector_process(source):
+    # Runs in its own interpreter; item state comes from the daemon's socket
+    import state_socket
+    import person_detector
+    if state_socket.attach() is None:
+        print("Detector: state daemon not reachable, using the local items file")
+    person_detector.main(source=source or person_detector.VIDEO_SOURCE, show=False)
+
+
+def run_daemon(args):
+    """
+    The headless process that owns item state: MQTT ingestion, the state
+    socket GUIs attach to, optional ESP32 polling, and optionally the
+    person detector in a separate process so it gets its own core.
+    """
+    import mqtt_listener
+    from state_socket import start_state_socket
+
+    if args.broker:
+        mqtt_listener.MQTT_BROKER = args.broker
+    try:
+        start_state_socket()
+    except RuntimeError as e:
+        raise SystemExit(f"Not starting: {e}")
+    if args.camera:
+        start_cameras(args.camera, camera_settings(args))
+    if args.poll:
+        Thread(target=poll_scanners, args=(args.poll,), daemon=True).start()
+    if args.detector:
+        process = multiprocessing.get_context("spawn").Process(
+            target=detector_process, args=(args.source,), name="edc-detector", daemon=True)
+        process.start()
+    mqtt_listener.main()
+
+
+def run_handler(args):
+    import mqtt_handler
+    if args.broker:
+        mqtt_handler.MQTT_BROKER = args.broker
+    client = mqtt_handler.start_mqtt()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        client.loop_stop()
+
+
+def run_detector(args):
+    import person_detector
+    if args.broker:
+        person_detector.MQTT_BROKER = args.broker
+    person_detector.main(source=args.source or person_detector.VIDEO_SOURCE, show=args.show)
+
+
+def camera_settings(args):
+    """camera_monitor module settings from the command line (see vision_benchmark --sweep)."""
+    settings = {}
+    if args.dnn:
+        backend, _, target = args.dnn.partition("/")
+        settings.update(DNN_BACKEND=backend, DNN_TARGET=target or "cpu")
+    if args.input_size:
+        settings["INPUT_SIZE"] = args.input_size
+    if args.dnn_threads is not None:
+        settings["DNN_THREADS"] = args.dnn_threads
+    if args.cpu_budget is not None:
+        settings["CPU_BUDGET"] = args.cpu_budget or None
+    if args.latency_target is not None:
+        settings["LATENCY_TARGET"] = args.latency_target or None
+    return settings
+
+
+def run_camera(args):
+    import camera_monitor
+    for key, value in camera_settings(args).items():
+        setattr(camera_monitor, key, value)
+    source = None
+    if args.source:
+        from frame_sources import open_source
+        source = open_source(args.source)
+    camera_monitor.monitor_camera(source=source)
+
+
+def start_cameras(specs, settings=None):
+    from camera_supervisor import CAMERAS, CameraSupervisor, parse_camera
+    cameras = [parse_camera(spec) for spec in specs] if specs else CAMERAS
+    return CameraSupervisor(cameras, settings=settings).start()
+
+
+def run_cameras(args):
+    supervisor = start_cameras(args.camera, camera_settings(args))
+    try:
+        while True:
+            time.sleep(60)
+            stats = supervisor.stats()
+            workers = ", ".join(f"{name}: {'up' if w['alive'] else 'down'} ({w['restarts']} restarts)"
+                                for name, w in stats["workers"].items())
+            print(f"Cameras: {stats['received']} triggers, {stats['dispatched']} checks; {workers}")
+    except KeyboardInterrupt:
+        supervisor.stop()
+
+
+ROLES = {
+    "daemon": run_daemon,
+    "listener": run_listener,
+    "handler": run_handler,
+    "detector": run_detector,
+    "camera": run_camera,
+    "cameras": run_cameras,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EDC-Detector headless roles")
+    parser.add_argument("role", choices=sorted(ROLES))
+    parser.add_argument("--broker", help="MQTT broker address (default: the role's MQTT_BROKER)")
+    parser.add_argument("--source", help="camera index, video file, image directory or 'synthetic'")
+    parser.add_argument("--show", action="store_true", help="detector: show the annotated feed in a window")
+    parser.add_argument("--detector", action="store_true", help="daemon: also run the person detector process")
+    parser.add_argument("--camera", action="append", metavar="NAME=SOURCE",
+                        help="cameras/daemon: a camera to supervise (repeatable)")
+    parser.add_argument("--dnn", metavar="BACKEND[/TARGET]",
+                        help="camera(s): face DNN backend and target, e.g. opencv/opencl (see camera_monitor.BACKENDS)")
+    parser.add_argument("--input-size", type=int, help="camera(s): face DNN input size in pixels (default 300)")
+    parser.add_argument("--dnn-threads", type=int, help="camera(s): OpenCV threads per camera (0 = OpenCV default)")
+    parser.add_argument("--cpu-budget", type=float,
+                        help="camera(s): fraction of a core each camera may use; inference is paced to fit (0 = off)")
+    parser.add_argument("--latency-target", type=float,
+                        help="camera(s): seconds from capture to face result to pace inference for (0 = off)")
+    parser.add_argument("--poll", nargs="+", metavar="ADDRESS", help="daemon: ESP32 addresses to poll over HTTP")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics on 127.0.0.1:PORT (default: 9108 for daemon/listener, off otherwise)")
+    parser.add_argument("--trace", metavar="DIR",
+                        help="write Chrome trace files for this process and its workers to DIR (see tracing.py)")
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        import tracing
+        tracing.enable(args.trace)
+    port = args.metrics_port
+    if port is None and args.role in ("daemon", "listener"):
+        from metrics import METRICS_PORT
+        port = METRICS_PORT
+    if port:
+        from metrics import start_metrics_server
+        start_metrics_server(port=port)
+    ROLES[args.role](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# esp32_poller.py
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from item_registry import normalize_mac
+
+POLL_TIMEOUT = 2.0      # seconds per scanner request
+FAILURE_THRESHOLD = 3   # consecutive failures before a scanner's circuit opens
+BACKOFF_BASE = 5.0      # first open-circuit pause, doubled on every further failure
+BACKOFF_MAX = 120.0
+
+
+def parse_seen(data, default_location):
+    """Validate a /seen body: {"location": str, "seen": [mac, ...]}. Raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    location = data.get("location", default_location)
+    seen = data.get("seen", [])
+    if not isinstance(location, str) or not isinstance(seen, list) or not all(isinstance(m, str) for m in seen):
+        raise ValueError("malformed /seen body")
+    return {"location": location, "seen": {normalize_mac(m) for m in seen}}
+
+
+class ScannerClient:
+    """
+    One ESP32 /seen endpoint with its own keep-alive session and a
+    circuit breaker: after FAILURE_THRESHOLD consecutive failures the
+    scanner is skipped for an exponentially growing backoff period.
+    """
+
+    def __init__(self, address, timeout=POLL_TIMEOUT):
+        self.address = address
+        self.url = f"http://{address}/seen"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        self.failures = 0
+        self.open_until = 0.0
+        self.last_error = None
+        self.in_flight = None   # at most one request per scanner at a time
+        self.requests = 0
+        self.skipped = 0
+
+    def available(self, now=None):
+        return (now or time.monotonic()) >= self.open_until
+
+    def fetch(self):
+        """Returns {"location": str, "seen": set of normalized MACs}. Raises on failure."""
+        self.requests += 1
+        try:
+            resp = self.session.get(self.url, timeout=self.timeout)
+            resp.raise_for_status()
+            result = parse_seen(resp.json(), self.address)
+        except Exception as e:
+            # Garbage bodies count against the breaker like timeouts do
+            self._failed(e)
+            raise
+        self.failures = 0
+        self.open_until = 0.0
+        self.last_error = None
+        return result
+
+    def _failed(self, error):
+        self.failures += 1
+        self.last_error = error
+        if self.failures >= FAILURE_THRESHOLD:
+            backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.failures - FAILURE_THRESHOLD))
+            self.open_until = time.monotonic() + backoff
+
+    def close(self):
+        self.session.close()
+
+
+class ScannerPoller:
+    """Polls all ESP32 scanners concurrently and merges what they saw."""
+
+    def __init__(self, addresses, timeout=POLL_TIMEOUT, max_workers=None):
+        self.clients = [ScannerClient(addr, timeout) for addr in addresses]
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(self.clients)),
+                                           thread_name_prefix="esp32-poll")
+
+    def poll(self):
+        """
+        Returns {mac: location} for every tag seen by any reachable
+        scanner. Scanners with an open circuit are not contacted.
+        """
+        now = time.monotonic()
+        futures = {}
+        for client in self.clients:
+            busy = client.in_flight is not None and not client.in_flight.done()
+            if client.available(now) and not busy:
+                client.in_flight = self.executor.submit(client.fetch)
+                futures[client.in_flight] = client
+            else:
+                client.skipped += 1
+
+        # Individual requests already time out; this only guards against a hung worker
+        done, _ = wait(futures, timeout=self.timeout * 2)
+
+        seen = {}
+        for future in futures:   # scanner order, so merging is deterministic
+            if future in done and future.exception() is None:
+                result = future.result()
+                for mac in result["seen"]:
+                    seen.setdefault(mac, result["location"])
+        return seen
+
+    def stats(self):
+        return [
+            {
+                "address": c.address,
+                "requests": c.requests,
+                "failures": c.failures,
+                "skipped": c.skipped,
+                "circuit_open": not c.available(),
+                "last_error": str(c.last_error) if c.last_error else None,
+            }
+            for c in self.clients
+        ]
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for client in self.clients:
+            client.close()
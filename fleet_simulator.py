@@ -0,0 +1,343 @@
+# fleet_simulator.py
+#
+# Emulates a fleet of ESP32 BLE scanners (same JSON as ESP32_BLE_Scanner.ino)
+# publishing into an in-process broker stand-in, and measures how well the
+# Python MQTT callbacks keep up. No hardware or Mosquitto needed.
+#
+#   python fleet_simulator.py --scanners 6 --tags 300 --duration 30
+#   python fleet_simulator.py --target handler --scan-interval 1
+#   python fleet_simulator.py --binary     # one sighting_codec batch per scan
+import argparse
+import json
+import queue
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+
+import item_registry
+from item_registry import ItemRegistry, normalize_mac
+from sighting_codec import encode_scan
+
+SCAN_INTERVAL = 3.0     # seconds between scans per scanner (sketch: delay(3000))
+VISIBLE_FRACTION = 0.3  # share of all tags each scanner hears per scan
+LOCATIONS = ["Kitchen", "Hall", "Bedroom", "Office", "Garage", "Porch", "Lounge", "Bathroom"]
+
+
+# ==============================
+# Broker stand-in
+# ==============================
+class SimMessage:
+    """Same attributes the callbacks read from paho's MQTTMessage."""
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+        self.qos = 0
+        self.retain = False
+
+
+class InProcessBroker:
+    """
+    Delivers published messages to subscribed on_message callbacks from a
+    single network-loop thread, like paho's loop_forever(). The delivery
+    queue length is the backlog.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(list)
+        self.queue = queue.Queue()
+        self.delivered = 0
+        self.errors = 0
+        self._thread = None
+
+    def subscribe(self, topic, callback):
+        self.subscribers[topic].append(callback)
+
+    def publish(self, topic, payload):
+        self.queue.put(SimMessage(topic, payload))
+
+    def backlog(self):
+        return self.queue.qsize()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.queue.put(None)
+        self._thread.join()
+
+    def _loop(self):
+        while True:
+            msg = self.queue.get()
+            if msg is None:
+                break
+            for callback in self.subscribers.get(msg.topic, ()):
+                try:
+                    callback(self, None, msg)
+                except Exception:
+                    self.errors += 1
+            self.delivered += 1
+
+
+# ==============================
+# Scanner fleet
+# ==============================
+def make_tags(count, seed=0):
+    rng = random.Random(seed)
+    tags = []
+    for i in range(count):
+        mac = ":".join(f"{rng.randrange(256):02x}" for _ in range(6))
+        tags.append({"mac": mac, "name": f"Tag {i}", "required": i % 4 == 0, "last_seen": "Never"})
+    return tags
+
+
+class ScannerFleet:
+    """
+    N simulated scanners. Every scan interval each scanner publishes one
+    JSON message per tag it can hear, exactly like the sketch's loop(),
+    or with binary=True a single sighting_codec batch for the whole scan.
+    """
+
+    def __init__(self, broker, topic, tags, scanners, scan_interval=SCAN_INTERVAL,
+                 visible_fraction=VISIBLE_FRACTION, seed=0, binary=False):
+        self.broker = broker
+        self.topic = topic
+        self.tags = tags
+        self.scanners = [LOCATIONS[i % len(LOCATIONS)] + ("" if i < len(LOCATIONS) else f" {i}")
+                         for i in range(scanners)]
+        self.scan_interval = scan_interval
+        self.visible_fraction = visible_fraction
+        self.rng = random.Random(seed)
+        self.binary = binary
+
+        self.published = 0
+        self.pending = defaultdict(deque)  # normalized mac -> publish timestamps
+        self.pending_lock = threading.Lock()
+
+    def scan(self, location):
+        visible = self.rng.sample(self.tags, max(1, int(len(self.tags) * self.visible_fraction)))
+        if self.binary:
+            devices = [(tag["mac"], self.rng.randint(-60, -30)) for tag in visible]
+            now = time.perf_counter()
+            with self.pending_lock:
+                for tag in visible:
+                    self.pending[tag["mac"]].append(now)
+            self.broker.publish(self.topic, encode_scan(location, devices))
+            self.published += 1
+            return
+        for tag in visible:
+            doc = {"mac": tag["mac"], "name": tag["name"],
+                   "rssi": self.rng.randint(-60, -30), "last_seen": location}
+            now = time.perf_counter()
+            with self.pending_lock:
+                self.pending[tag["mac"]].append(now)
+            self.broker.publish(self.topic, json.dumps(doc).encode())
+            self.published += 1
+
+    def run(self, duration):
+        # Scanners start staggered across one interval, like real devices
+        start = time.perf_counter()
+        next_scan = [start + self.scan_interval * i / len(self.scanners) for i in range(len(self.scanners))]
+        while True:
+            i = min(range(len(next_scan)), key=next_scan.__getitem__)
+            if next_scan[i] - start >= duration:
+                break
+            delay = next_scan[i] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.scan(self.scanners[i])
+            next_scan[i] += self.scan_interval
+
+
+# ==============================
+# Latency watcher
+# ==============================
+class UpdateWatcher:
+    """
+    Follows the registry change feed; when an item changes, every sighting
+    of its MAC published before that moment counts as applied.
+
+    That only holds for targets that apply each message as it arrives. For
+    batched targets see watch_batches().
+    """
+
+    def __init__(self, registry, fleet):
+        self.registry = registry
+        self.fleet = fleet
+        self.latencies = []
+        self.stopped = False
+        self.batched = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def watch_batches(self, batcher):
+        """
+        Count a sighting as applied when the batch that carries it has been
+        applied. A sighting published after the batch was taken lands in
+        the next one, so the item changing is not enough. Each batch record
+        says how many sightings of its MAC it coalesced; those are that
+        MAC's oldest outstanding stamps, as delivery is in publish order.
+        """
+        sink = batcher.sink
+
+        def applied(batch):
+            sink(batch)
+            now = time.perf_counter()
+            with self.fleet.pending_lock:
+                for sighting in batch:
+                    stamps = self.fleet.pending.get(normalize_mac(sighting["mac"]))
+                    for _ in range(min(sighting.get("count", 1), len(stamps or ()))):
+                        self.latencies.append(now - stamps.popleft())
+
+        batcher.sink = applied
+        self.batched = True
+
+    def start(self):
+        if not self.batched:
+            self._thread.start()
+
+    def stop(self):
+        self.stopped = True
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        version = self.registry.version
+        while not self.stopped:
+            self.registry.wait_for_change(version, 0.2)
+            delta = self.registry.changes_since(version)
+            now = time.perf_counter()
+            if delta is None:
+                version = self.registry.version
+                continue
+            version, changed, _ = delta
+            with self.fleet.pending_lock:
+                for item in changed:
+                    stamps = self.fleet.pending.get(normalize_mac(item.get("mac")))
+                    while stamps and stamps[0] <= now:
+                        self.latencies.append(now - stamps.popleft())
+
+
+# ==============================
+# Targets
+# ==============================
+# Each returns (on_message, topic, batcher or None)
+def listener_target(tmp):
+    import mqtt_listener
+    batcher = mqtt_listener.setup(Path(tmp) / "history")
+    return mqtt_listener.on_message, "edc/devices", batcher
+
+
+def handler_target(tmp):
+    import mqtt_handler
+    return mqtt_handler.on_message, "edc/items", None
+
+
+TARGETS = {"listener": listener_target, "handler": handler_target}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run_load_test(target="listener", scanners=4, tags=200, duration=20.0, scan_interval=SCAN_INTERVAL,
+                  visible_fraction=VISIBLE_FRACTION, sample_every=1.0, binary=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        tag_list = make_tags(tags)
+        items_path = Path(tmp) / "items.json"
+        items_path.write_text(json.dumps(tag_list))
+        registry = ItemRegistry(path=str(items_path))
+        item_registry._registry = registry   # every module's get_registry() now sees the test items
+
+        on_message, topic, batcher = TARGETS[target](tmp)
+        broker = InProcessBroker()
+        broker.subscribe(topic, on_message)
+        fleet = ScannerFleet(broker, topic, tag_list, scanners, scan_interval, visible_fraction, binary=binary)
+        watcher = UpdateWatcher(registry, fleet)
+        if batcher is not None:
+            watcher.watch_batches(batcher)
+            batcher.start()
+
+        backlog = []
+        sampling = threading.Event()
+
+        def sample():
+            start = time.perf_counter()
+            while not sampling.wait(sample_every):
+                backlog.append((time.perf_counter() - start, broker.backlog()))
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        broker.start()
+        watcher.start()
+        sampler.start()
+
+        start = time.perf_counter()
+        fleet.run(duration)
+        publish_done = time.perf_counter()
+        broker.stop()
+        drained = time.perf_counter()
+        time.sleep(1.0)   # let batched targets apply their last window
+        sampling.set()
+        watcher.stop()
+        registry.close()
+
+    growth = 0.0
+    if len(backlog) >= 2:
+        (t0, b0), (t1, b1) = backlog[0], backlog[-1]
+        growth = (b1 - b0) / (t1 - t0) if t1 > t0 else 0.0
+
+    return {
+        "target": target,
+        "payload": "binary" if binary else "json",
+        "scanners": scanners,
+        "tags": tags,
+        "published": fleet.published,
+        "processed": broker.delivered,
+        "callback_errors": broker.errors,
+        "offered_rate": fleet.published / (publish_done - start),
+        "processed_rate": broker.delivered / (drained - start),
+        "drain_s": drained - publish_done,
+        "max_backlog": max((b for _, b in backlog), default=0),
+        "backlog_growth_per_s": growth,
+        "latency_samples": len(watcher.latencies),
+        "latency_p50_ms": percentile(watcher.latencies, 50) * 1000,
+        "latency_p95_ms": percentile(watcher.latencies, 95) * 1000,
+        "latency_p99_ms": percentile(watcher.latencies, 99) * 1000,
+    }
+
+
+def print_report(report):
+    print(f"\n=== {report['target']} ({report['payload']}): {report['scanners']} scanners, {report['tags']} tags ===")
+    print(f"published: {report['published']}  processed: {report['processed']}  "
+          f"callback errors: {report['callback_errors']}")
+    print(f"offered: {report['offered_rate']:.0f} msg/s  processed: {report['processed_rate']:.0f} msg/s  "
+          f"drain after last publish: {report['drain_s']:.2f}s")
+    print(f"backlog: max {report['max_backlog']}  growth {report['backlog_growth_per_s']:+.1f} msg/s")
+    print(f"publish -> item update ({report['latency_samples']} samples): "
+          f"p50 {report['latency_p50_ms']:.1f} ms  p95 {report['latency_p95_ms']:.1f} ms  "
+          f"p99 {report['latency_p99_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic ESP32 fleet load test for the MQTT callbacks")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="listener")
+    parser.add_argument("--scanners", type=int, default=4)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--scan-interval", type=float, default=SCAN_INTERVAL)
+    parser.add_argument("--visible", type=float, default=VISIBLE_FRACTION, help="fraction of tags each scanner hears")
+    parser.add_argument("--binary", action="store_true", help="publish one binary batch per scan instead of JSON per tag")
+    args = parser.parse_args()
+
+    print_report(run_load_test(args.target, args.scanners, args.tags, args.duration,
+                               args.scan_interval, args.visible, binary=args.binary))
+
+
+if __name__ == "__main__":
+    main()
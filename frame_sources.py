@@ -0,0 +1,158 @@
+# frame_sources.py
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Every source has the small part of the cv2.VideoCapture interface the
+# camera code uses: read() -> (ok, frame), isOpened(), release(), plus `fps`.
+# Finite sources also set `ended` once they run out, so a FramePipeline
+# stops instead of retrying read() forever.
+
+
+class VideoFileSource:
+    """Recorded clip, optionally looped."""
+
+    def __init__(self, path, loop=False):
+        self.path = str(path)
+        self.loop = loop
+        self.cap = cv2.VideoCapture(self.path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.ended = False
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        self.ended = not ret
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource:
+    """Still images from a directory, in file-name order."""
+
+    def __init__(self, directory, loop=False, fps=10.0):
+        self.paths = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        self.loop = loop
+        self.fps = fps
+        self.index = 0
+        self.ended = False
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self):
+        if self.index >= len(self.paths):
+            if not self.loop or not self.paths:
+                self.ended = True
+                return False, None
+            self.index = 0
+        frame = cv2.imread(str(self.paths[self.index]))
+        self.index += 1
+        return frame is not None, frame
+
+    def release(self):
+        pass
+
+
+class SyntheticSource:
+    """
+    Generated frames: a static noisy background with a bright "person"
+    block that walks across the scene for `present_frames` out of every
+    `period` frames. Deterministic for a given seed.
+    """
+
+    def __init__(self, frames=300, width=640, height=480, period=100, present_frames=40, seed=0, fps=30.0):
+        self.frames = frames
+        self.width = width
+        self.height = height
+        self.period = period
+        self.present_frames = present_frames
+        self.fps = fps
+        self.index = 0
+        self.ended = False
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(40, 90, (height, width, 3), dtype=np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.frames is not None and self.index >= self.frames:
+            self.ended = True
+            return False, None
+        frame = self.background.copy()
+        step = self.index % self.period
+        if step < self.present_frames:
+            w, h = self.width // 6, self.height // 2
+            x = int((self.width - w) * step / max(1, self.present_frames - 1))
+            y = self.height // 4
+            frame[y:y + h, x:x + w] = (200, 180, 160)
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class RealTimeSource:
+    """Wraps another source and paces read() to the source's fps, like a live camera."""
+
+    def __init__(self, source):
+        self.source = source
+        self.fps = source.fps
+        self.next_frame = time.monotonic()
+
+    @property
+    def ended(self):
+        return getattr(self.source, "ended", False)
+
+    def isOpened(self):
+        return self.source.isOpened()
+
+    def read(self):
+        delay = self.next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame = max(self.next_frame, time.monotonic()) + 1.0 / self.fps
+        return self.source.read()
+
+    def release(self):
+        self.source.release()
+
+
+def open_source(spec, loop=False, realtime=True):
+    """
+    Build a frame source from a string:
+      "0", "1", ...        camera index (cv2.VideoCapture)
+      "synthetic[:N]"      generated frames (N frames, default 300)
+      a directory          images in that directory
+      "rtsp://...", ...    capture URL, read like a camera
+      anything else        video file path
+    With `realtime` (the default) non-camera sources are paced to their
+    fps like a live camera; benchmarks pass realtime=False to replay as
+    fast as possible.
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return cv2.VideoCapture(int(spec))
+    if "://" in spec:
+        return cv2.VideoCapture(spec)
+    if spec.startswith("synthetic"):
+        _, _, count = spec.partition(":")
+        source = SyntheticSource(frames=int(count) if count else 300)
+    elif Path(spec).is_dir():
+        source = ImageDirSource(spec, loop=loop)
+    else:
+        source = VideoFileSource(spec, loop=loop)
+    return RealTimeSource(source) if realtime else source
@@ -3,92 +3,67 @@ import kivy
 from kivy.app import App
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
-from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
-from kivy.clock import Clock
-from kivy.uix.popup import Popup
-from kivy.core.window import Window
 
 import json
-import os
 from threading import Thread
 import paho.mqtt.client as mqtt
+from item_registry import get_registry
+from dashboard import ItemDashboard
+from ui_updates import UIUpdateQueue
+from state_socket import attach
+import tracing
 
 kivy.require("2.3.1")
 
-ITEMS_FILE = "items.json"
 MQTT_BROKER = "localhost"
 MQTT_TOPIC = "edc/missing"
 
 # -------------------------
-# Load/Save Items
+# Load Items
 # -------------------------
 def load_items():
-    if os.path.exists(ITEMS_FILE):
-        with open(ITEMS_FILE, "r") as f:
-            try:
-                items = json.load(f)
-                if isinstance(items, list):
-                    return {item["name"]: item for item in items}
-                return items
-            except:
-                return {}
-    return {}
-
-def save_items(items):
-    with open(ITEMS_FILE, "w") as f:
-        json.dump(list(items.values()), f, indent=2)
-
-# -------------------------
-# Missing Item Popup
-# -------------------------
-def show_missing_popup(item_name, last_seen):
-    content = BoxLayout(orientation="vertical", padding=5)
-    content.add_widget(Label(text=f"Missing: {item_name}\nLast seen: {last_seen}", font_size=14))
-    popup = Popup(
-        title="Missing Item",
-        content=content,
-        size_hint=(None, None),
-        size=(250, 100),
-        auto_dismiss=True,
-        separator_height=0
-    )
-    popup.pos = (Window.width - 260, Window.height - 120)
-    popup.open()
-    Clock.schedule_once(lambda dt: popup.dismiss(), 4)
+    # A copy: the registry replaces its name index on re-indexing, and the
+    # state client thread may change a mirror registry at any time
+    return get_registry().items_by_name()
 
 # -------------------------
 # Screens
 # -------------------------
+def format_item_row(item_name, item):
+    return f"{item_name} - Last seen: {item.get('last_seen','Never')}"
+
 class MainScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.items = load_items()
-        self.layout = GridLayout(cols=1, spacing=5, padding=10)
+        self.layout = BoxLayout(orientation="vertical", spacing=5, padding=10)
         self.add_widget(self.layout)
+        self.dashboard = ItemDashboard(format_item_row)
+        self.layout.add_widget(self.dashboard)
         self.add_btn = Button(text="Add Item", size_hint_y=None, height=40)
         self.add_btn.bind(on_release=self.go_to_add_item)
+        self.layout.add_widget(self.add_btn)
+        self.updates = UIUpdateQueue(self)
         self.refresh_dashboard()
 
     def go_to_add_item(self, instance):
         self.manager.current = "add_item"
 
     def refresh_dashboard(self):
-        self.layout.clear_widgets()
-        for item_name, item in self.items.items():
-            self.layout.add_widget(
-                Label(text=f"{item_name} - Last seen: {item.get('last_seen','Never')}")
-            )
-        self.layout.add_widget(self.add_btn)
+        self.dashboard.set_items(load_items())
+
+    def refresh_item(self, item_name):
+        item = get_registry().copy_by_name(item_name)
+        if item is None:
+            self.dashboard.remove_item(item_name)
+        else:
+            self.dashboard.update_item(item_name, item)
 
     def update_item_last_seen(self, item_name, last_seen):
-        if item_name in self.items:
-            self.items[item_name]["last_seen"] = last_seen
-            save_items(self.items)
-            self.refresh_dashboard()
-            show_missing_popup(item_name, last_seen)
+        # Applied with any other pending changes on the next frame
+        with tracing.span("gui.update_item_last_seen", item=item_name):
+            self.updates.submit_missing(item_name, last_seen)
 
 class AddItemScreen(Screen):
     def __init__(self, main_screen, **kwargs):
@@ -116,9 +91,8 @@ class AddItemScreen(Screen):
         mac = self.mac_input.text.strip()
         if not name:
             return
-        self.main_screen.items[name] = {"name": name, "mac": mac, "last_seen": "Never"}
-        save_items(self.main_screen.items)
-        self.main_screen.refresh_dashboard()
+        get_registry().add({"name": name, "mac": mac, "required": True, "last_seen": "Never"})
+        self.main_screen.refresh_item(name)
         self.go_back(instance)
 
     def go_back(self, instance):
@@ -131,10 +105,15 @@ def mqtt_listener(main_screen):
     def on_message(client, userdata, msg):
         try:
             missing_items = json.loads(msg.payload)
-            for item in missing_items:
-                name = item.get("name")
-                location = item.get("last_seen", "Unknown")
-                Clock.schedule_once(lambda dt, n=name, l=location: main_screen.update_item_last_seen(n, l))
+            # A traced publisher wraps the list: {"trace": id, "items": [...]}
+            trace = None
+            if isinstance(missing_items, dict):
+                trace, missing_items = missing_items.get("trace"), missing_items.get("items", [])
+            with tracing.span("gui.on_message", trace, items=len(missing_items)):
+                for item in missing_items:
+                    name = item.get("name")
+                    location = item.get("last_seen", "Unknown")
+                    main_screen.update_item_last_seen(name, location)
         except:
             pass
 
@@ -149,8 +128,16 @@ def mqtt_listener(main_screen):
 # -------------------------
 class EverydayCarryApp(App):
     def build(self):
+        # With a headless daemon running (python edc.py daemon) the registry
+        # is a live mirror of the daemon's, kept in sync over its socket
+        self.main_screen = None
+        self.state_client = attach(on_update=self.on_state_update)
+
         sm = ScreenManager()
         main_screen = MainScreen(name="main")
+        self.main_screen = main_screen
+        if self.state_client is not None:
+            main_screen.updates.submit_refresh(True)
         add_screen = AddItemScreen(main_screen, name="add_item")
         sm.add_widget(main_screen)
         sm.add_widget(add_screen)
@@ -161,5 +148,9 @@ class EverydayCarryApp(App):
 
         return sm
 
+    def on_state_update(self, full, changed, removed):
+        if self.main_screen is not None:
+            self.main_screen.updates.submit_refresh(full, changed, removed)
+
 if __name__ == "__main__":
     EverydayCarryApp().run()
@@ -0,0 +1,106 @@
+# import_benchmark.py
+#
+# Cold-start check: imports each entry module in a fresh interpreter,
+# reports the time taken and which heavy dependencies it dragged in, and
+# exits non-zero when a budget is blown.
+#
+#   python import_benchmark.py
+#   python import_benchmark.py --repeat 5 --detail
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+HEAVY = ("kivy", "cv2", "paho", "requests")
+
+# name -> (statement to time, seconds allowed, heavy modules it may load).
+# Budgets are for a Raspberry Pi 4; a desktop should come in far below.
+SCENARIOS = {
+    "edc": ("import edc", 0.2, ()),
+    "mqtt_listener": ("import mqtt_listener", 0.8, ()),
+    "listener startup": ("import mqtt_listener; mqtt_listener.setup(HISTORY_DIR)", 0.9, ()),
+    "mqtt_handler": ("import mqtt_handler", 0.8, ()),
+    "person_detector": ("import person_detector", 0.3, ()),
+    "missing_logic": ("import missing_logic", 0.2, ()),
+    "camera_monitor": ("import camera_monitor", 1.5, ("cv2",)),
+}
+
+PROBE = """
+import sys, time, json
+HISTORY_DIR = {history_dir!r}
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(statement, history_dir):
+    code = PROBE.format(statement=statement, heavy=HEAVY, history_dir=history_dir)
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "probe failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def importtime(statement):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                         cwd=HERE, capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return rows
+
+
+def import_detail(module, top=10):
+    """The slowest imports under `module` (interpreter startup excluded), from -X importtime."""
+    startup = {name for _, name in importtime("pass")}
+    rows = [row for row in importtime(f"import {module}") if row[1] not in startup]
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the EDC entry modules")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per scenario (median is reported)")
+    parser.add_argument("--detail", action="store_true", help="show the slowest imports of each module")
+    args = parser.parse_args()
+
+    failed = []
+    with tempfile.TemporaryDirectory() as history_dir:
+        print(f"{'scenario':<18} {'median':>9} {'budget':>8}  heavy modules")
+        for name, (statement, budget, allowed) in SCENARIOS.items():
+            try:
+                runs = [probe(statement, history_dir) for _ in range(args.repeat)]
+            except RuntimeError as e:
+                print(f"{name:<18} {'error':>9} {budget * 1000:>6.0f}ms  {e}")
+                failed.append(name)
+                continue
+            median = statistics.median(run["seconds"] for run in runs)
+            loaded = runs[-1]["loaded"]
+            unexpected = [m for m in loaded if m not in allowed]
+            status = ""
+            if median > budget or unexpected:
+                status = "  OVER BUDGET" if median > budget else "  UNEXPECTED IMPORT"
+                failed.append(name)
+            print(f"{name:<18} {median * 1000:>7.1f}ms {budget * 1000:>6.0f}ms  "
+                  f"{', '.join(loaded) or '-'}{status}")
+
+            if args.detail and statement.startswith("import ") and ";" not in statement:
+                for cumulative_us, module in import_detail(statement.split()[1]):
+                    print(f"    {cumulative_us / 1000:>8.1f}ms  {module}")
+
+    if failed:
+        print(f"\n{len(failed)} scenario(s) failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
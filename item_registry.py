@@ -0,0 +1,491 @@
+# item_registry.py
+import atexit
+import json
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:     # Windows: no cross-process lock, flushes still merge
+    fcntl = None
+
+from metrics import counter, histogram
+
+ITEMS_FILE = "items.json"
+FLUSH_INTERVAL = 2.0    # seconds a change may sit in memory before it is written
+FLUSH_THRESHOLD = 50    # number of pending changes that forces an early write
+CHANGE_LOG_SIZE = 5000  # versions kept for delta queries (see changes_since)
+SIGHTING_FIELDS = ("last_seen_location", "last_seen_time", "rssi", "location_confidence")
+
+FLUSH_SECONDS = histogram("edc_items_flush_seconds", "Time to write items.json")
+FLUSHED_CHANGES = counter("edc_items_flushed_changes_total", "Registry changes written to items.json")
+
+
+def normalize_mac(mac):
+    return (mac or "").strip().lower()
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on <path>.lock, held across one read-merge-write of items.json."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ==============================
+# Registry
+# ==============================
+class ItemRegistry:
+    """
+    Keeps items.json in memory, indexed by MAC and by name.
+    Updates only mark the registry dirty; a background flusher writes
+    the file once FLUSH_INTERVAL has passed or FLUSH_THRESHOLD changes
+    have piled up.
+
+    Every change bumps `version` and is recorded in a bounded change log,
+    so consumers can ask for only what changed since the version they
+    last saw.
+
+    Several processes may share one items.json. Each remembers which
+    items and fields it changed since its last write; flush() first
+    merges whatever another process wrote in the meantime (detected by
+    the file's inode, mtime and size), then writes, all under a file
+    lock. The flusher also picks up other processes' writes when there
+    is nothing to write, and refresh() does so on demand.
+
+    With path=None the registry is memory-only (e.g. a mirror of another
+    process's registry, see state_socket) and never touches disk.
+    """
+
+    def __init__(self, path=ITEMS_FILE, flush_interval=FLUSH_INTERVAL, flush_threshold=FLUSH_THRESHOLD):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self.lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._flusher = None
+
+        self.items = []      # file order
+        self.by_mac = {}     # normalized mac -> item
+        self.by_name = {}    # name -> item
+        self.dirty = 0
+        self._local = {}        # name -> fields changed here since the last write (None: whole item)
+        self._removed = set()   # names removed here since the last write
+        self._replaced = False  # replace_all() since the last write: ours wins outright
+        self._disk_stamp = None
+
+        self.epoch = os.urandom(4).hex()   # versions restart with every process; see state_server cursors
+        self.version = 0
+        self.changes = deque(maxlen=CHANGE_LOG_SIZE)   # (version, name, removed)
+        self.reset_version = 0                         # oldest version deltas can start from
+        self.changed = threading.Condition(self.lock)
+
+        self.load()
+
+    # --- Loading / indexing ---
+    def load(self):
+        stamp = self._stamp()
+        items = (self._read() or []) if stamp is not None else []
+        with self.lock:
+            self.items = items
+            self._reindex()
+            self.dirty = 0
+            self._local, self._removed, self._replaced = {}, set(), False
+            self._disk_stamp = stamp
+            self._reset()
+
+    def _stamp(self):
+        if self.path is None:
+            return None
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _read(self):
+        """Items from the file, or None if it cannot be read or parsed."""
+        try:
+            with open(self.path, "r") as f:
+                items = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print("Error reading items file:", e)
+            return None
+        if isinstance(items, dict):
+            items = list(items.values())
+        if not isinstance(items, list):
+            return None
+        return [item for item in items if isinstance(item, dict)]
+
+    def _reindex(self):
+        self.by_mac = {}
+        self.by_name = {}
+        for item in self.items:
+            self._index(item)
+
+    def _index(self, item):
+        mac = normalize_mac(item.get("mac"))
+        if mac:
+            self.by_mac[mac] = item
+        if "name" in item:
+            self.by_name[item["name"]] = item
+
+    # --- Change feed ---
+    def _record(self, item, removed=False):
+        self.version += 1
+        self.changes.append((self.version, item.get("name"), removed))
+        self.changed.notify_all()
+
+    def _changed_here(self, name, fields=None, removed=False):
+        """Remember a change of ours so a merge with the file keeps it (see flush)."""
+        if self.path is None:
+            return
+        if removed:
+            self._local.pop(name, None)
+            self._removed.add(name)
+            return
+        self._removed.discard(name)
+        if fields is None:
+            self._local[name] = None
+        elif self._local.get(name, ()) is not None:
+            self._local[name] = self._local.get(name, set()) | set(fields)
+
+    def _merge(self, disk_items):
+        """
+        Take items.json as another process left it, keeping the items and
+        fields changed here that are not written yet. Every item that
+        differs is recorded in the change log. Called with the lock held.
+        """
+        merged = []
+        seen = set()
+        for disk in disk_items:
+            name = disk.get("name")
+            if name is None:
+                merged.append(disk)
+                continue
+            if name in seen or name in self._removed:
+                continue
+            seen.add(name)
+            item = self.by_name.get(name)
+            fields = self._local.get(name, ())
+            if item is None:
+                item = dict(disk)
+                self._record(item)
+            elif fields is not None:
+                new = dict(disk)
+                new.update((field, item[field]) for field in fields if field in item)
+                if new != item:
+                    item.clear()
+                    item.update(new)
+                    self._record(item)
+            merged.append(item)
+        for item in self.items:
+            name = item.get("name")
+            if name is None or name in seen:
+                continue
+            if self._local.get(name, ()) is None:
+                merged.append(item)      # added here, not written yet
+            else:
+                self._record(item, removed=True)
+        self.items = merged
+        self._reindex()
+
+    def _reset(self):
+        self.version += 1
+        self.changes.clear()
+        self.reset_version = self.version
+        self.changed.notify_all()
+
+    def changes_since(self, since):
+        """
+        Returns (version, changed_items, removed_names), or None when
+        `since` is older than the change log and a full snapshot is needed.
+        """
+        with self.lock:
+            if since < self.reset_version or since > self.version:
+                return None
+            if self.changes and since < self.changes[0][0] - 1:
+                return None
+            changed = {}
+            removed = set()
+            for version, name, was_removed in self.changes:
+                if version <= since:
+                    continue
+                if was_removed:
+                    changed.pop(name, None)
+                    removed.add(name)
+                else:
+                    item = self.by_name.get(name)
+                    if item is not None:
+                        changed[name] = dict(item)
+                        removed.discard(name)
+            return self.version, list(changed.values()), sorted(removed)
+
+    def snapshot(self):
+        with self.lock:
+            return self.version, [dict(item) for item in self.items]
+
+    def wait_for_change(self, since, timeout=None):
+        """Block until the version moves past `since`. Returns the current version."""
+        with self.lock:
+            self.changed.wait_for(lambda: self.version > since, timeout)
+            return self.version
+
+    # --- Lookups ---
+    def get(self, mac):
+        return self.by_mac.get(normalize_mac(mac))
+
+    def get_by_name(self, name):
+        with self.lock:
+            return self.by_name.get(name)
+
+    def copy_by_name(self, name):
+        """A copy of the named item taken under the lock, or None; safe to read on any thread."""
+        with self.lock:
+            item = self.by_name.get(name)
+            return dict(item) if item is not None else None
+
+    def items_by_name(self):
+        """Copies of all items keyed by name, in file order. by_name itself is
+        replaced on re-indexing, so never hold on to it."""
+        with self.lock:
+            return {item["name"]: dict(item) for item in self.items if "name" in item}
+
+    def all(self):
+        with self.lock:
+            return list(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    # --- Mutations ---
+    def add(self, item):
+        """Add an item, replacing any existing item with the same name."""
+        with self.lock:
+            old = self.by_name.get(item.get("name"))
+            if old is not None:
+                self.items[self.items.index(old)] = item
+                self._reindex()
+            else:
+                self.items.append(item)
+                self._index(item)
+            self._record(item)
+            self._changed_here(item.get("name"))
+            self.mark_dirty()
+        return item
+
+    def remove(self, name):
+        with self.lock:
+            item = self.by_name.get(name)
+            if item is None:
+                return False
+            self.items.remove(item)
+            self._reindex()
+            self._record(item, removed=True)
+            self._changed_here(name, removed=True)
+            self.mark_dirty()
+            return True
+
+    def replace_all(self, items):
+        with self.lock:
+            self.items = list(items)
+            self._reindex()
+            self._reset()
+            self._replaced = self.path is not None
+            self.mark_dirty()
+
+    def update(self, mac, **fields):
+        """Update the item with this MAC. Returns the item, or None if unknown."""
+        with self.lock:
+            item = self.by_mac.get(normalize_mac(mac))
+            if item is None:
+                return None
+            item.update(fields)
+            self._record(item)
+            self._changed_here(item.get("name"), fields)
+            self.mark_dirty()
+            return item
+
+    def update_by_name(self, name, **fields):
+        with self.lock:
+            item = self.by_name.get(name)
+            if item is None:
+                return None
+            item.update(fields)
+            self._record(item)
+            self._changed_here(name, fields)
+            self.mark_dirty()
+            return item
+
+    def apply_delta(self, changed, removed=()):
+        """
+        Apply a change-feed delta (see changes_since) from another
+        registry: `changed` items replace the items with the same name in
+        place, `removed` names are dropped.
+        """
+        with self.lock:
+            reindex = False
+            for name in removed:
+                item = self.by_name.get(name)
+                if item is not None:
+                    self.items.remove(item)
+                    self._record(item, removed=True)
+                    self._changed_here(name, removed=True)
+                    reindex = True
+            for new in changed:
+                item = self.by_name.get(new.get("name"))
+                if item is None:
+                    item = dict(new)
+                    self.items.append(item)
+                    self._index(item)
+                else:
+                    reindex = reindex or normalize_mac(item.get("mac")) != normalize_mac(new.get("mac"))
+                    item.clear()
+                    item.update(new)
+                self._record(item)
+                self._changed_here(item.get("name"))
+            if reindex:
+                self._reindex()
+            self.mark_dirty(len(changed) + len(removed))
+
+    def apply_sightings(self, sightings):
+        """
+        Apply a batch of coalesced sightings (see sighting_batcher) in one
+        pass. Returns the items that were updated.
+        """
+        updated = []
+        with self.lock:
+            for sighting in sightings:
+                item = self.by_mac.get(normalize_mac(sighting["mac"]))
+                if item is None:
+                    continue
+                item["last_seen_location"] = sighting["location"]
+                item["last_seen_time"] = datetime.fromtimestamp(sighting["time"]).strftime("%Y-%m-%d %H:%M:%S")
+                item["rssi"] = sighting["rssi"]
+                if sighting.get("confidence") is not None:
+                    item["location_confidence"] = sighting["confidence"]
+                self._record(item)
+                self._changed_here(item.get("name"), SIGHTING_FIELDS)
+                updated.append(item)
+            if updated:
+                self.mark_dirty(len(updated))
+        return updated
+
+    # --- Write-behind ---
+    def mark_dirty(self, count=1):
+        if self.path is None:
+            return
+        with self.lock:
+            self.dirty += count
+            self.start()
+            if self.dirty >= self.flush_threshold:
+                self._wake.set()
+
+    def start(self):
+        """Start the background flusher, which also picks up other processes' writes."""
+        with self.lock:
+            if self.path is not None and self._flusher is None and not self._stopped:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+        return self
+
+    def _flush_loop(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print("Error writing items file:", e)
+
+    def flush(self):
+        """
+        Merge other processes' writes, then write pending changes to disk.
+        Safe to call from any thread. Returns True if the file was written.
+        """
+        return self._sync(write=True)
+
+    def refresh(self):
+        """Pick up other processes' writes to items.json, if any. Cheap when there are none."""
+        if self.path is None or self._stamp() == self._disk_stamp:
+            return False
+        self._sync(write=False)
+        return True
+
+    def _sync(self, write):
+        if self.path is None:
+            return False
+        with self._write_lock, file_lock(self.path):
+            stamp = self._stamp()
+            disk = self._read() if stamp is not None and stamp != self._disk_stamp else None
+            with self.lock:
+                if disk is not None and not self._replaced:
+                    self._merge(disk)
+                if disk is not None or stamp is None:
+                    self._disk_stamp = stamp
+                if not write or not self.dirty:
+                    return False
+                data = json.dumps(self.items, indent=2)
+                pending = self.dirty, self._local, self._removed, self._replaced
+                self.dirty = 0
+                self._local, self._removed, self._replaced = {}, set(), False
+
+            try:
+                with FLUSH_SECONDS.time():
+                    tmp_path = f"{self.path}.tmp"
+                    with open(tmp_path, "w") as f:
+                        f.write(data)
+                    os.replace(tmp_path, self.path)
+                FLUSHED_CHANGES.inc(pending[0])
+            except Exception:
+                with self.lock:
+                    self._restore(*pending)
+                raise
+            self._disk_stamp = self._stamp()
+        return True
+
+    def _restore(self, dirty, local, removed, replaced):
+        """Put back the bookkeeping of a write that failed."""
+        self.dirty += dirty
+        for name, fields in local.items():
+            if name not in self._removed:
+                self._changed_here(name, fields)
+        self._removed |= removed - set(self._local)
+        self._replaced = self._replaced or replaced
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+        flusher = self._flusher
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join()   # it may be mid-sync; nothing touches the file after close()
+        self.flush()
+
+
+# ==============================
+# Shared instance
+# ==============================
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ItemRegistry().start()
+            atexit.register(_registry.close)
+        return _registry
@@ -0,0 +1,261 @@
+# localization.py
+import threading
+import time
+
+import numpy as np
+
+from item_registry import normalize_mac
+
+WINDOW = 15.0           # seconds a scanner's reading of a tag stays in the vote
+HALF_LIFE = 4.0         # seconds for an old reading to lose half its weight
+SWITCH_MARGIN = 3.0     # dB a new room must beat the current one by before the tag moves
+INITIAL_TAGS = 256
+INITIAL_SCANNERS = 8
+
+
+class RoomLocalizer:
+    """
+    Assigns each tag to the room whose scanner hears it best.
+
+    Readings live in a tags x scanners grid of time-decayed RSSI averages
+    plus the time each cell was last heard. Cells older than WINDOW drop
+    out, the strongest remaining scanner wins, and confidence is that
+    scanner's share of the received power across all fresh scanners.
+    A tag only changes room when the new one is SWITCH_MARGIN dB
+    stronger, so it does not flip between two rooms heard equally well.
+    All of it runs as array operations over the rows a batch touches.
+
+    As in presence_engine, `track(mac)` decides which tags get a row;
+    other MACs are dropped, and rows of forgotten tags are reused.
+    """
+
+    def __init__(self, window=WINDOW, half_life=HALF_LIFE, switch_margin=SWITCH_MARGIN,
+                 tags=INITIAL_TAGS, scanners=INITIAL_SCANNERS, track=None):
+        self.track = track
+        self.window = window
+        self.half_life = half_life
+        self.switch_margin = switch_margin
+
+        self.lock = threading.RLock()
+        self.tag_index = {}       # normalized mac -> row
+        self.macs = []            # row -> mac (None when free)
+        self.free = []
+        self.scanner_index = {}   # location name -> column
+        self.scanners = []
+        self.rssi = np.full((tags, scanners), np.nan, dtype=np.float32)
+        self.heard = np.full((tags, scanners), -np.inf, dtype=np.float64)
+        self.room = np.full(tags, -1, dtype=np.int32)             # column of the current room
+        self.confidence = np.full(tags, np.nan, dtype=np.float32)
+
+    # --- Grid ---
+    def _grow(self, rows, cols):
+        old_rows, old_cols = self.rssi.shape
+        new_rows, new_cols = old_rows, old_cols
+        while new_rows < rows:
+            new_rows *= 2
+        while new_cols < cols:
+            new_cols *= 2
+        if (new_rows, new_cols) == (old_rows, old_cols):
+            return
+        rssi = np.full((new_rows, new_cols), np.nan, dtype=np.float32)
+        heard = np.full((new_rows, new_cols), -np.inf, dtype=np.float64)
+        rssi[:old_rows, :old_cols] = self.rssi
+        heard[:old_rows, :old_cols] = self.heard
+        self.rssi, self.heard = rssi, heard
+        if new_rows > old_rows:
+            self.room = np.concatenate((self.room, np.full(new_rows - old_rows, -1, dtype=np.int32)))
+            self.confidence = np.concatenate((self.confidence,
+                                              np.full(new_rows - old_rows, np.nan, dtype=np.float32)))
+
+    def rows_for(self, macs):
+        """Row numbers for `macs`, adding unknown tracked tags; -1 for untracked ones."""
+        rows = np.empty(len(macs), dtype=np.int64)
+        index = self.tag_index
+        for i, mac in enumerate(macs):
+            row = index.get(mac)
+            if row is None:
+                mac = normalize_mac(mac)
+                row = index.get(mac)
+                if row is None:
+                    row = self._add_row(mac)
+            rows[i] = row
+        self._grow(len(self.macs), len(self.scanners))
+        return rows
+
+    def _add_row(self, mac):
+        if not mac or (self.track is not None and not self.track(mac)):
+            return -1
+        if self.free:
+            row = self.free.pop()
+            self.macs[row] = mac
+        else:
+            row = len(self.macs)
+            self.macs.append(mac)
+        self.tag_index[mac] = row
+        return row
+
+    def forget(self, macs):
+        """Stop tracking tags (e.g. items deleted from the registry). Their rows are reused."""
+        with self.lock:
+            for mac in macs:
+                row = self.tag_index.pop(normalize_mac(mac), None)
+                if row is not None:
+                    self.rssi[row] = np.nan
+                    self.heard[row] = -np.inf
+                    self.room[row] = -1
+                    self.confidence[row] = np.nan
+                    self.macs[row] = None
+                    self.free.append(row)
+
+    def cols_for(self, locations):
+        cols = np.empty(len(locations), dtype=np.int64)
+        index = self.scanner_index
+        for i, location in enumerate(locations):
+            col = index.get(location)
+            if col is None:
+                col = len(self.scanners)
+                index[location] = col
+                self.scanners.append(location)
+            cols[i] = col
+        self._grow(len(self.macs), len(self.scanners))
+        return cols
+
+    # --- Updates ---
+    def update(self, macs, locations, rssi, seen_at, now=None):
+        """
+        Fold a batch of per-scanner readings into the grid and re-locate
+        the tags it touched. NaN RSSI readings and untracked tags are
+        ignored. Returns (rows, room columns, confidences) for those tags; a room of
+        -1 means no scanner has heard the tag within the window.
+        """
+        rssi = np.asarray(rssi, dtype=np.float32)
+        seen_at = np.asarray(seen_at, dtype=np.float64)
+        if not len(macs):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        with self.lock:
+            rows = self.rows_for(macs)
+            cols = self.cols_for(locations)
+            tracked = rows >= 0
+            if not tracked.all():
+                rows, cols, rssi, seen_at = rows[tracked], cols[tracked], rssi[tracked], seen_at[tracked]
+
+            valid = ~np.isnan(rssi)
+            r, c, v, t = rows[valid], cols[valid], rssi[valid], seen_at[valid]
+            if len(r):
+                # One reading per cell: the newest
+                order = np.argsort(t, kind="stable")[::-1]
+                cells = r[order] * self.rssi.shape[1] + c[order]
+                _, first = np.unique(cells, return_index=True)
+                pick = order[first]
+                r, c, v, t = r[pick], c[pick], v[pick], t[pick]
+
+                old = self.rssi[r, c]
+                age = np.maximum(t - self.heard[r, c], 0.0)
+                keep = np.where(np.isnan(old) | (age > self.window), 0.0, 0.5 ** (age / self.half_life))
+                self.rssi[r, c] = np.where(keep > 0, keep * old + (1 - keep) * v, v)
+                self.heard[r, c] = np.maximum(self.heard[r, c], t)
+
+            touched = np.unique(rows)
+            rooms, confidence = self._locate(touched, time.time() if now is None else now)
+            return touched, rooms, confidence
+
+    def _locate(self, rows, now):
+        n = len(self.scanners)
+        rssi = self.rssi[rows, :n]
+        fresh = ((now - self.heard[rows, :n]) <= self.window) & ~np.isnan(rssi)
+        scores = np.where(fresh, rssi, -np.inf)
+
+        arange = np.arange(len(rows))
+        best = scores.argmax(axis=1)
+        best_rssi = scores[arange, best]
+        heard = np.isfinite(best_rssi)
+
+        current = self.room[rows]
+        current_rssi = np.where(current >= 0, scores[arange, np.maximum(current, 0)], -np.inf)
+        # Only rows still heard in their current room are compared; the rest would be -inf - -inf
+        stay = np.isfinite(current_rssi)
+        stay[stay] = best_rssi[stay] - current_rssi[stay] < self.switch_margin
+        room = np.where(stay, current, best)
+        room = np.where(heard, room, -1).astype(np.int32)
+
+        # Share of linear received power, relative to the strongest scanner
+        top = np.where(heard, best_rssi, 0.0)[:, None]
+        power = np.where(fresh, 10.0 ** ((scores - top) / 10.0), 0.0)
+        total = power.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            confidence = np.where(heard, power[arange, np.maximum(room, 0)] / total, np.nan)
+
+        self.room[rows] = room
+        self.confidence[rows] = confidence
+        return room, confidence.astype(np.float32)
+
+    def update_sightings(self, sightings, now=None):
+        """
+        Localize a batch of per-scanner sightings (see sighting_batcher,
+        per_location=True) and collapse it to one sighting per tag whose
+        location is the assigned room, with a "confidence" field and that
+        room's smoothed RSSI. Tags no scanner has an RSSI for keep the most
+        recently reported location and the batch's strongest reading.
+        Untracked tags are left out.
+        """
+        if self.track is not None:
+            with self.lock:
+                tracked = self.rows_for([s["mac"] for s in sightings]) >= 0
+            sightings = [s for s, keep in zip(sightings, tracked) if keep]
+        if not sightings:
+            return []
+        macs = [s["mac"] for s in sightings]
+        locations = [s["location"] for s in sightings]
+        rssi = np.array([np.nan if s["rssi"] is None else s["rssi"] for s in sightings], dtype=np.float32)
+        seen_at = np.array([s["time"] for s in sightings], dtype=np.float64)
+        counts = np.array([s.get("count", 1) for s in sightings], dtype=np.int64)
+
+        with self.lock:
+            rows, rooms, confidence = self.update(macs, locations, rssi, seen_at, now)
+            row_of = self.rows_for(macs)
+            room_rssi = self.rssi[rows, np.maximum(rooms, 0)]
+
+        # Per-tag aggregates over the batch
+        slot = np.searchsorted(rows, row_of)
+        latest = np.full(len(rows), -np.inf)
+        np.maximum.at(latest, slot, seen_at)
+        strongest = np.full(len(rows), -np.inf, dtype=np.float32)
+        np.maximum.at(strongest, slot, np.where(np.isnan(rssi), -np.inf, rssi))
+        total = np.zeros(len(rows), dtype=np.int64)
+        np.add.at(total, slot, counts)
+        newest = {}
+        for i in np.argsort(seen_at, kind="stable"):
+            newest[slot[i]] = locations[i]
+
+        located = []
+        for i, row in enumerate(rows):
+            heard = rooms[i] >= 0
+            value = room_rssi[i] if heard else strongest[i]
+            located.append({
+                "mac": self.macs[row],
+                "location": self.scanners[rooms[i]] if heard else newest[i],
+                "rssi": int(round(float(value))) if np.isfinite(value) else None,
+                "time": float(latest[i]),
+                "count": int(total[i]),
+                "confidence": round(float(confidence[i]), 2) if heard else None,
+            })
+        return located
+
+    # --- Queries ---
+    def locate(self, mac):
+        """(room, confidence) from the last update, or None if the tag has no room."""
+        row = self.tag_index.get(normalize_mac(mac))
+        if row is None or self.room[row] < 0:
+            return None
+        return self.scanners[self.room[row]], float(self.confidence[row])
+
+    def scores(self, mac, now=None):
+        """{location: smoothed RSSI} for every scanner that heard the tag within the window."""
+        row = self.tag_index.get(normalize_mac(mac))
+        if row is None:
+            return {}
+        now = time.time() if now is None else now
+        with self.lock:
+            n = len(self.scanners)
+            fresh = np.flatnonzero((now - self.heard[row, :n]) <= self.window)
+            return {self.scanners[c]: float(self.rssi[row, c]) for c in fresh}
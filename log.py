@@ -1,31 +1,90 @@
 # log.py
 import logging
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+UI_FLUSH_RATE = 10  # max widget updates per second
+
+def compile_keywords(keywords):
+    """One precompiled regex matching any of the keywords, or None."""
+    if not keywords:
+        return None
+    return re.compile("|".join(re.escape(k) for k in keywords))
 
 class KivyLogHandler(logging.Handler):
-    def __init__(self, widget, formatter=None, IncludeKeywords=None, ExcludeKeywords=None, MaxLines=2000):
+    """
+    Keeps the last MaxLines records in a ring buffer and pushes them to
+    the widget from the Kivy Clock at most FlushRate times per second.
+    emit() never touches the widget, so it is safe from any thread.
+    """
+    def __init__(self, widget, formatter=None, IncludeKeywords=None, ExcludeKeywords=None, MaxLines=2000, FlushRate=UI_FLUSH_RATE):
         super().__init__()
+        from kivy.clock import Clock
+
         self.widget = widget
         self.formatter = formatter or logging.Formatter('%(asctime)s : %(levelname)s : %(message)s')
         self.IncludeKeywords = IncludeKeywords or []
         self.ExcludeKeywords = ExcludeKeywords or []
         self.MaxLines = MaxLines
+        self.include_re = compile_keywords(self.IncludeKeywords)
+        self.exclude_re = compile_keywords(self.ExcludeKeywords)
+
+        self.lines = deque(maxlen=MaxLines)
+        self.buffer_lock = threading.Lock()
+        self.pending = 0  # records added since the last flush
+        self._event = Clock.schedule_interval(self.update_widget, 1.0 / FlushRate)
 
     def emit(self, record):
         try:
             msg = self.format(record)
             # Filter by include/exclude keywords
-            if self.IncludeKeywords and not any(k in msg for k in self.IncludeKeywords):
+            if self.include_re is not None and not self.include_re.search(msg):
                 return
-            if self.ExcludeKeywords and any(k in msg for k in self.ExcludeKeywords):
+            if self.exclude_re is not None and self.exclude_re.search(msg):
                 return
-            self.widget.text += msg + '\n'
-            # Keep max lines
-            lines = self.widget.text.splitlines()
-            if len(lines) > self.MaxLines:
-                self.widget.text = '\n'.join(lines[-self.MaxLines:])
+            with self.buffer_lock:
+                self.lines.append(msg)
+                self.pending += 1
         except Exception:
             self.handleError(record)
 
+    def update_widget(self, dt=None):
+        with self.buffer_lock:
+            if not self.pending:
+                return
+            new = min(self.pending, len(self.lines))
+            self.pending = 0
+            lines = list(self.lines)
+
+        if hasattr(self.widget, "data"):
+            # Virtualized view (see make_log_view): only append the new rows
+            data = self.widget.data
+            data.extend({"text": line} for line in lines[-new:])
+            overflow = len(data) - self.MaxLines
+            if overflow > 0:
+                del data[:overflow]
+        else:
+            self.widget.text = '\n'.join(lines) + '\n'
+
+    def close(self):
+        self._event.cancel()
+        super().close()
+
+def make_log_view(**kwargs):
+    """RecycleView that only instantiates the visible log rows."""
+    from kivy.uix.recycleview import RecycleView
+    from kivy.uix.recycleboxlayout import RecycleBoxLayout
+
+    view = RecycleView(**kwargs)
+    view.viewclass = "Label"
+    layout = RecycleBoxLayout(orientation="vertical", default_size=(None, 20),
+                              default_size_hint=(1, None), size_hint_y=None)
+    layout.bind(minimum_height=layout.setter("height"))
+    view.add_widget(layout)
+    return view
+
 class UserFormatter(logging.Formatter):
     def format(self, record):
         return super().format(record)
@@ -37,12 +96,104 @@ def keyword_match(message, include, exclude):
         return False
     return True
 
-# Optional DBHandler placeholder
 class DBHandler(logging.Handler):
-    def __init__(self, db):
+    """
+    Non-blocking handler that stores records in the events table.
+    emit() only appends to a bounded in-memory queue; a worker thread
+    writes queued records with DB.add_events in batches and waits for
+    each batch to commit, so MaxQueue bounds everything held in memory
+    and `written` counts committed rows only. When the queue is full,
+    OverflowPolicy decides what happens:
+      "drop_oldest" - discard the oldest queued record
+      "block"       - wait up to BlockTimeout seconds for room, then drop
+      "sample"      - keep only every SampleEvery-th new record until there is room
+    """
+    def __init__(self, db, MaxQueue=10000, BatchSize=500, FlushInterval=0.5,
+                 OverflowPolicy="drop_oldest", BlockTimeout=0.1, SampleEvery=10):
         super().__init__()
+        if not getattr(db, "background", False):
+            raise ValueError("DBHandler needs a DB(background=True) so it can write from its worker thread")
+        if OverflowPolicy not in ("drop_oldest", "block", "sample"):
+            raise ValueError(f"Unknown overflow policy: {OverflowPolicy}")
         self.db = db
+        self.MaxQueue = MaxQueue
+        self.BatchSize = BatchSize
+        self.FlushInterval = FlushInterval
+        self.OverflowPolicy = OverflowPolicy
+        self.BlockTimeout = BlockTimeout
+        self.SampleEvery = SampleEvery
+
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._overflow_seen = 0
+
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
 
     def emit(self, record):
-        # Store log in database
-        pass
+        try:
+            row = (record.levelname, self.format(record),
+                   datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S"))
+            with self.cond:
+                if len(self.queue) >= self.MaxQueue and not self._make_room():
+                    self.dropped += 1
+                    return
+                self.queue.append(row)
+                if len(self.queue) >= self.BatchSize:
+                    self.cond.notify()
+        except Exception:
+            self.handleError(record)
+
+    def _make_room(self):
+        """Called with the queue full and the lock held. True if the new record may be queued."""
+        if self.OverflowPolicy == "drop_oldest":
+            self.queue.popleft()
+            self.dropped += 1
+            return True
+        if self.OverflowPolicy == "block":
+            return self.cond.wait_for(lambda: len(self.queue) < self.MaxQueue, self.BlockTimeout)
+        self._overflow_seen += 1
+        if self._overflow_seen % self.SampleEvery:
+            return False
+        self.queue.popleft()
+        self.dropped += 1
+        return True
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.stopped or len(self.queue) >= self.BatchSize, self.FlushInterval)
+                batch = [self.queue.popleft() for _ in range(min(self.BatchSize, len(self.queue)))]
+                if not self.queue:
+                    self._overflow_seen = 0
+                self.cond.notify_all()
+                stop = self.stopped and not self.queue
+            if batch:
+                try:
+                    ok = self.db.add_events(batch, wait=True)
+                except Exception as e:
+                    print("Error writing log records to database:", e)
+                    ok = False
+                if ok:
+                    self.written += len(batch)
+                else:
+                    self.failed += len(batch)
+            if stop:
+                break
+
+    def stats(self):
+        with self.cond:
+            return {"queued": len(self.queue), "written": self.written, "dropped": self.dropped,
+                    "failed": self.failed}
+
+    def close(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        self.worker.join()
+        self.db.flush()
+        super().close()
@@ -0,0 +1,251 @@
+# metrics.py
+#
+# In-process counters, gauges and latency histograms, served in the
+# Prometheus text format on a local HTTP endpoint. Recording is a lock and
+# an add; values that already exist elsewhere (queue depths, pipeline
+# stats) are read by callbacks only when /metrics is scraped.
+#
+#   from metrics import counter, histogram
+#   MESSAGES = counter("edc_mqtt_messages_total", "MQTT messages received", ["role"])
+#   MESSAGES.labels(role="listener").inc()
+#   with histogram("edc_db_commit_seconds", "SQLite batch commit time").time():
+#       ...
+import bisect
+import threading
+import time
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+# ==============================
+# Metric types
+# ==============================
+class Value:
+    """A counter or gauge value; set_function() makes it computed at scrape time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+        self.function = None
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+    def render(self, name, labelnames, key):
+        try:
+            value = self.get()
+        except Exception:
+            return []   # source gone (e.g. pipeline stopped); skip the sample
+        return [f"{name}{format_labels(labelnames, key)} {format_value(value)}"]
+
+
+class HistogramValue:
+    def __init__(self, buckets=None):
+        self.lock = threading.Lock()
+        self.buckets = tuple(buckets or LATENCY_BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return Timer(self)
+
+    def render(self, name, labelnames, key):
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{format_labels(labelnames, key, [('le', format_value(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labelnames, key)} {format_value(total)}")
+        lines.append(f"{name}_count{format_labels(labelnames, key)} {count}")
+        return lines
+
+
+class Timer:
+    """Context manager observing the elapsed seconds into a histogram."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metric:
+    """
+    A named metric and its children, one per set of label values. Each
+    child is a `child_class` built from the metric's options.
+    """
+    kind = "untyped"
+    child_class = Value
+
+    def __init__(self, name, help, labelnames=(), **options):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.options = options
+        self.lock = threading.Lock()
+        self.children = {}   # label values -> child
+        if not self.labelnames:
+            self.children[()] = self._child()
+
+    def _child(self):
+        return self.child_class(**self.options)
+
+    def labels(self, **values):
+        key = tuple(str(values[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self.children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+    child_class = Value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+    child_class = Value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    child_class = HistogramValue
+
+
+# ==============================
+# Registry
+# ==============================
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _get(self, cls, name, help, labelnames, **options):
+        """
+        Get or create a metric. Unlabelled metrics are returned as their
+        single value, ready for inc()/observe(); labelled ones need
+        labels(...) first. Hot paths should keep the labelled child.
+        """
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labelnames, **options)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered with a different type or labels")
+            return metric if metric.labelnames else metric.children[()]
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name, help, labelnames=()):
+    return REGISTRY._get(Counter, name, help, labelnames)
+
+
+def gauge(name, help, labelnames=()):
+    return REGISTRY._get(Gauge, name, help, labelnames)
+
+
+def histogram(name, help, labelnames=(), buckets=None):
+    return REGISTRY._get(Histogram, name, help, labelnames, buckets=buckets)
+
+
+# ==============================
+# HTTP endpoint
+# ==============================
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT, registry=REGISTRY):
+    """Serve /metrics from a background thread. Returns the server, or None if the port is taken."""
+    # Imported here so instrumented modules do not pay for http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"Metrics endpoint not started on {host}:{port}:", e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics on http://{host}:{port}/metrics")
+    return server
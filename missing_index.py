@@ -0,0 +1,160 @@
+# missing_index.py
+import threading
+
+from item_registry import get_registry
+
+FOLLOW_TIMEOUT = 1.0    # seconds the follower waits for a registry change before re-checking
+
+
+class MissingItemIndex:
+    """
+    Answers "which required items are not present?" without touching
+    the catalog. Every item gets a small integer id, and the required
+    and present sets are kept as bitsets (Python ints) that are updated
+    from the registry change feed. A check is one `required & ~present`
+    plus a lookup of the items whose bits are set; the name list is
+    cached until either set changes or an id is given to another item.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry or get_registry()
+        self.lock = threading.Lock()
+        self.ids = {}        # item name -> id
+        self.names = []      # id -> item name (None when free)
+        self.free = []
+        self.required = 0
+        self.present = 0
+        self.version = -1
+        self.generation = 0  # bumped whenever an id changes hands (ids are recycled)
+        self._cached_key = None
+        self._cached = []
+        self._stopped = False
+        self._follower = None
+        self.sync()
+
+    # --- Keeping up with the registry ---
+    def _id_for(self, name):
+        item_id = self.ids.get(name)
+        if item_id is None:
+            if self.free:
+                item_id = self.free.pop()
+                self.names[item_id] = name
+            else:
+                item_id = len(self.names)
+                self.names.append(name)
+            self.ids[name] = item_id
+            self.generation += 1
+        return item_id
+
+    def _set(self, item):
+        bit = 1 << self._id_for(item.get("name"))
+        if item.get("required", True):   # opt-out: items saved without the field are checked
+            self.required |= bit
+        else:
+            self.required &= ~bit
+        if item.get("present", True):
+            self.present |= bit
+        else:
+            self.present &= ~bit
+
+    def _drop(self, name):
+        item_id = self.ids.pop(name, None)
+        if item_id is None:
+            return
+        bit = 1 << item_id
+        self.required &= ~bit
+        self.present &= ~bit
+        self.names[item_id] = None
+        self.free.append(item_id)
+        self.generation += 1
+
+    def _rebuild(self):
+        version, items = self.registry.snapshot()
+        self.ids, self.names, self.free = {}, [], []
+        self.required = self.present = 0
+        self.generation += 1
+        for item in items:
+            self._set(item)
+        self.version = version
+
+    def sync(self):
+        """Apply registry changes since the last sync. Returns the synced version."""
+        with self.lock:
+            if self.version == self.registry.version:
+                return self.version
+            delta = self.registry.changes_since(self.version) if self.version >= 0 else None
+            if delta is None:
+                self._rebuild()
+                return self.version
+            self.version, changed, removed = delta
+            for name in removed:
+                self._drop(name)
+            for item in changed:
+                self._set(item)
+            return self.version
+
+    def start(self):
+        """Follow the change feed on a background thread so checks never need to sync."""
+        if self._follower is None:
+            self._follower = threading.Thread(target=self._follow, daemon=True)
+            self._follower.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+
+    def _follow(self):
+        while not self._stopped:
+            self.registry.wait_for_change(self.version, FOLLOW_TIMEOUT)
+            try:
+                self.sync()
+            except Exception as e:
+                print("Error updating missing-item index:", e)
+
+    # --- Checks ---
+    def missing_bits(self):
+        if self._follower is None:
+            self.sync()
+        with self.lock:
+            return self.required & ~self.present
+
+    def missing_names(self):
+        if self._follower is None:
+            self.sync()
+        with self.lock:
+            bits = self.required & ~self.present
+            key = (bits, self.generation)
+            if key != self._cached_key:
+                names = []
+                remaining = bits
+                while remaining:
+                    low = remaining & -remaining
+                    names.append(self.names[low.bit_length() - 1])
+                    remaining ^= low
+                self._cached_key, self._cached = key, names
+            return self._cached
+
+    def missing(self):
+        """Required items that are not present, as item dicts."""
+        items = []
+        for name in self.missing_names():
+            item = self.registry.get_by_name(name)
+            if item is not None:
+                items.append(dict(item))
+        return items
+
+    def missing_count(self):
+        return bin(self.missing_bits()).count("1")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_missing_index():
+    """Shared index over the shared registry, following its change feed."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MissingItemIndex().start()
+        return _index
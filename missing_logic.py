@@ -1,52 +1,49 @@
-import json
-import os
+import tracing
+from item_registry import get_registry
+from missing_index import get_missing_index
 
-ITEMS_FILE = "items.json"
+ITEM_DEFAULTS = {
+    "name": "Unnamed",
+    "mac": "unknown",
+    "present": True,
+    "required": True,
+    "last_seen": "unknown",
+}
 
-# Load items from JSON file
+# Load items from the shared registry
 def load_items():
-    if not os.path.exists(ITEMS_FILE):
-        return []
+    items = []
+    for item in get_registry().all():
+        # Ensure each item has the required keys
+        items.append({**ITEM_DEFAULTS, **item})
+    return items
 
-    try:
-        with open(ITEMS_FILE, "r") as f:
-            items = json.load(f)
-            # Ensure each item has the required keys
-            for item in items:
-                if "name" not in item:
-                    item["name"] = "Unnamed"
-                if "mac" not in item:
-                    item["mac"] = "unknown"
-                if "present" not in item:
-                    item["present"] = True
-                if "last_seen" not in item:
-                    item["last_seen"] = "unknown"
-            return items
-    except json.JSONDecodeError:
-        return []
-
-# Save items to JSON file
+# Replace all items (written to disk in the background)
 def save_items(items_list):
-    with open(ITEMS_FILE, "w") as f:
-        json.dump(items_list, f, indent=4)
+    get_registry().replace_all(items_list)
 
 # Optional: Get dict keyed by MAC for quick lookup
 def items_dict():
-    return {item["mac"].lower(): item for item in load_items()}
+    return dict(get_registry().by_mac)
 
 # Update an item in place
 def update_item(mac, present=None, last_seen=None):
-    items = load_items()
-    mac = mac.lower()
-    updated = False
-    for item in items:
-        if item["mac"].lower() == mac:
-            if present is not None:
-                item["present"] = present
-            if last_seen is not None:
-                item["last_seen"] = last_seen
-            updated = True
-            break
-    if updated:
-        save_items(items)
-    return updated
+    fields = {}
+    if present is not None:
+        fields["present"] = present
+    if last_seen is not None:
+        fields["last_seen"] = last_seen
+    registry = get_registry()
+    if not fields:
+        return registry.get(mac) is not None
+    return registry.update(mac, **fields) is not None
+
+# Required items that are not currently present (bitset lookup, no catalog scan)
+def check_missing_items():
+    with tracing.span("check_missing_items"):
+        # Another process may own items.json; a stat when nothing changed
+        get_registry().refresh()
+        missing = [{**ITEM_DEFAULTS, **item} for item in get_missing_index().missing()]
+    for item in missing:
+        print(f"Missing: {item['name']} (last seen {item['last_seen']})")
+    return missing
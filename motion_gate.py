@@ -0,0 +1,101 @@
+# motion_gate.py
+import cv2
+import numpy as np
+
+MOTION_WIDTH = 160          # frames are downscaled to this width before differencing
+PIXEL_DELTA = 25            # grey-level change that counts a pixel as "changed"
+MOTION_THRESHOLD = 0.01     # fraction of changed pixels that opens the gate
+BACKGROUND_RATE = 0.05      # how fast the background model follows the scene
+FORCE_EVERY = 50            # always let one frame through after this many skips
+
+
+class MotionGate:
+    """
+    Cheap check that decides whether a frame is worth running the DNN on.
+    Each frame is downscaled, converted to grey and compared against a
+    running-average background; all working buffers are allocated once
+    and reused.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, pixel_delta=PIXEL_DELTA, width=MOTION_WIDTH,
+                 background_rate=BACKGROUND_RATE, force_every=FORCE_EVERY):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.background_rate = background_rate
+        self.force_every = force_every
+
+        self.size = None
+        self.small = None
+        self.gray = None
+        self.background = None
+        self.background_u8 = None
+        self.diff = None
+        self.mask = None
+
+        self.frames = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.forced = 0
+        self.since_inference = 0
+        self.last_motion = 0.0
+
+    def _allocate(self, frame):
+        h, w = frame.shape[:2]
+        self.size = (self.width, max(1, round(h * self.width / w)))
+        sw, sh = self.size
+        self.small = np.empty((sh, sw) + frame.shape[2:], dtype=np.uint8)
+        self.gray = np.empty((sh, sw), dtype=np.uint8)
+        self.background_u8 = np.empty((sh, sw), dtype=np.uint8)
+        self.diff = np.empty((sh, sw), dtype=np.uint8)
+        self.mask = np.empty((sh, sw), dtype=np.uint8)
+
+    def motion(self, frame):
+        """Fraction of (downscaled) pixels that changed versus the background."""
+        if self.size is None:
+            self._allocate(frame)
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        if frame.ndim == 3:
+            cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        else:
+            self.gray[...] = self.small
+
+        if self.background is None:
+            self.background = self.gray.astype(np.float32)
+            return 1.0
+
+        cv2.convertScaleAbs(self.background, dst=self.background_u8)
+        cv2.absdiff(self.gray, self.background_u8, dst=self.diff)
+        cv2.threshold(self.diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self.mask)
+        cv2.accumulateWeighted(self.gray, self.background, self.background_rate)
+        return cv2.countNonZero(self.mask) / self.mask.size
+
+    def should_infer(self, frame):
+        self.frames += 1
+        self.last_motion = self.motion(frame)
+        self.since_inference += 1
+
+        if self.last_motion >= self.threshold:
+            run = True
+        elif self.since_inference > self.force_every:
+            run = True
+            self.forced += 1
+        else:
+            run = False
+
+        if run:
+            self.inferred += 1
+            self.since_inference = 0
+        else:
+            self.skipped += 1
+        return run
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "forced": self.forced,
+            "skip_ratio": self.skipped / self.frames if self.frames else 0.0,
+            "last_motion": self.last_motion,
+        }
@@ -1,12 +1,31 @@
-import paho.mqtt.client as mqtt
-from missing_logic import load_items, update_item
-from app_gui import gui_app  # reference to your running Kivy app
+import sys
+import time
+from missing_logic import update_item
+from item_registry import get_registry
+from sighting_codec import decode_payload
+from metrics import counter, histogram
 
 MQTT_BROKER = "172.20.10.9"  # replace with your broker IP
 MQTT_PORT = 1883
 MQTT_TOPIC = "edc/items"
 
-mqtt_client = mqtt.Client(callback_api=mqtt.MQTTv5)
+MESSAGES = {kind: counter("edc_mqtt_messages_total", "MQTT messages received", ["role", "kind"]).labels(
+    role="handler", kind=kind) for kind in ("json", "scan")}
+ERRORS = counter("edc_mqtt_errors_total", "MQTT messages that failed to apply", ["role"]).labels(role="handler")
+ON_MESSAGE_SECONDS = histogram("edc_mqtt_on_message_seconds", "Time spent in on_message", ["role"]).labels(
+    role="handler")
+
+# The running GUI's main screen, if the Kivy app lives in this process.
+# Never imports Kivy itself: a headless handler stays headless.
+def gui_main_screen():
+    if "kivy.app" not in sys.modules:
+        return None
+    from kivy.app import App
+    app = App.get_running_app()
+    root = app.root if app else None
+    if root is None or not hasattr(root, "has_screen") or not root.has_screen("main"):
+        return None
+    return root.get_screen("main")
 
 # Called when connection to broker is established
 def on_connect(client, userdata, flags, rc):
@@ -15,11 +34,19 @@ def on_connect(client, userdata, flags, rc):
 
 # Called when a message is received
 def on_message(client, userdata, msg):
-    payload = msg.payload.decode()
+    start = time.perf_counter()
     # Expected payload format: {"mac": "xx:xx:xx:xx", "present": false, "last_seen": "Front Door"}
+    # or a binary per-scan batch (see sighting_codec): every tag in it is present
     try:
-        import json
-        data = json.loads(payload)
+        kind, data = decode_payload(msg.payload)
+        MESSAGES[kind].inc()
+        if kind == "scan":
+            registry = get_registry()
+            with registry.lock:
+                for mac in data["macs"]:
+                    update_item(mac, present=True, last_seen=data["location"])
+            return
+
         mac = data.get("mac", "").lower()
         present = data.get("present", True)
         last_seen = data.get("last_seen", "unknown")
@@ -29,17 +56,23 @@ def on_message(client, userdata, msg):
 
         # If the item is missing, trigger popup in GUI
         if not present and updated:
-            item = [i for i in load_items() if i["mac"].lower() == mac][0]
+            item = get_registry().get(mac)
             name = item.get("name", "Unknown")
             last = item.get("last_seen", "unknown")
-            if gui_app:  # make sure the GUI app is running
-                gui_app.show_missing_item_popup(name, last)
+            main_screen = gui_main_screen()
+            if main_screen is not None:  # make sure the GUI app is running
+                main_screen.updates.submit_missing(name, last)
 
     except Exception as e:
+        ERRORS.inc()
         print("Error handling MQTT message:", e)
+    finally:
+        ON_MESSAGE_SECONDS.observe(time.perf_counter() - start)
 
 # Start MQTT client
 def start_mqtt():
+    import paho.mqtt.client as mqtt
+
     client = mqtt.Client()
     client.on_connect = on_connect
     client.on_message = on_message
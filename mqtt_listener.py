@@ -1,34 +1,135 @@
 # mqtt_listener.py
 
-import paho.mqtt.client as mqtt
-import json
-import os
-from datetime import datetime
+import time
+from threading import Thread
+from item_registry import get_registry, normalize_mac
+from sighting_batcher import SightingBatcher
+from rssi_history import RssiHistory
+from state_server import start_state_server
+from presence_engine import PresenceEngine
+from localization import RoomLocalizer
+from sighting_codec import decode_payload, scan_time
+from metrics import counter, gauge, histogram, SIZE_BUCKETS
 
 # ===== SETTINGS =====
 MQTT_BROKER = "localhost"      # Pi is running Mosquitto
 MQTT_PORT = 1883
 MQTT_TOPIC = "edc/devices"
-ITEMS_FILE = "items.json"
+BATCH_WINDOW = 0.5             # seconds of sightings applied together
+PRESENCE_TICK = 1.0            # seconds between presence timeout checks
+
+# ===== METRICS =====
+MESSAGES = {kind: counter("edc_mqtt_messages_total", "MQTT messages received", ["role", "kind"]).labels(
+    role="listener", kind=kind) for kind in ("json", "scan")}
+INVALID = counter("edc_mqtt_invalid_total", "MQTT payloads that could not be decoded", ["role"]).labels(role="listener")
+ON_MESSAGE_SECONDS = histogram("edc_mqtt_on_message_seconds", "Time spent in on_message", ["role"]).labels(
+    role="listener")
+BATCH_SECONDS = histogram("edc_sighting_batch_seconds", "Time to apply one sighting batch")
+BATCH_SIZE = histogram("edc_sighting_batch_size", "Readings per sighting batch", buckets=SIZE_BUCKETS)
+PRESENCE_CHANGES = counter("edc_presence_changes_total", "Tags arriving or leaving", ["change"])
 
 
 # ==============================
-# Load / Save Items
+# Batched Ingestion
 # ==============================
-def load_items():
-    if os.path.exists(ITEMS_FILE):
-        with open(ITEMS_FILE, "r") as f:
-            try:
-                items = json.load(f)
-                return {item["name"]: item for item in items}
-            except:
-                return {}
-    return {}
+# Built by setup(), so importing this module opens no files and starts nothing
+history = None
+presence = None
+localizer = None
+batcher = None
+presence_version = None   # registry version the presence engine's rows reflect
+registered_macs = {}      # item name -> normalized mac, to forget removed items
+
+
+def is_registered(mac):
+    return get_registry().get(mac) is not None
+
+
+def apply_presence(entered, exited):
+    PRESENCE_CHANGES.labels(change="arrived").inc(len(entered))
+    PRESENCE_CHANGES.labels(change="left").inc(len(exited))
+    registry = get_registry()
+    for mac in entered:
+        registry.update(mac, present=True)
+    for mac in exited:
+        registry.update(mac, present=False)
+    if entered or exited:
+        print(f"Presence: {len(entered)} arrived, {len(exited)} left")
+
+
+def sync_presence():
+    """
+    Give the presence engine a row for every registered item, so an item
+    persisted as present that is never heard again still times out.
+    Removed items are dropped from the localizer as well.
+    """
+    global presence_version
+    registry = get_registry()
+    delta = registry.changes_since(presence_version) if presence_version is not None else None
+    if delta is None:
+        version, changed = registry.snapshot()
+        names = {item.get("name") for item in changed}
+        removed = [name for name in registered_macs if name not in names]
+    else:
+        version, changed, removed = delta
+    if version == presence_version:
+        return
+
+    gone = [registered_macs.pop(name) for name in removed if name in registered_macs]
+    for item in changed:
+        mac = normalize_mac(item.get("mac"))
+        old = registered_macs.get(item.get("name"))
+        if old and old != mac:
+            gone.append(old)
+        if mac:
+            registered_macs[item.get("name")] = mac
+    presence.forget(gone)
+    localizer.forget(gone)
+    presence.seed((normalize_mac(item.get("mac")), item.get("present", True)) for item in changed)
+    presence_version = version
+
+
+def presence_loop():
+    # Tags that simply stop reporting only leave through the timeout
+    while True:
+        time.sleep(PRESENCE_TICK)
+        try:
+            sync_presence()
+        except Exception as e:
+            print("Error syncing presence with the registry:", e)
+        apply_presence(*presence.tick())
+
+
+def apply_batch(sightings):
+    # `sightings` holds one record per (tag, scanner); history keeps them all,
+    # everything after localization sees one record per tag in its assigned room
+    BATCH_SIZE.observe(len(sightings))
+    with BATCH_SECONDS.time():
+        history.append_batch(sightings)
+        located = localizer.update_sightings(sightings)
+        apply_presence(*presence.update_sightings(located))
+        updated = get_registry().apply_sightings(located)
+    if updated:
+        print(f"Updated {len(updated)} item(s) from {len(sightings)} reading(s)")
 
 
-def save_items(items):
-    with open(ITEMS_FILE, "w") as f:
-        json.dump(list(items.values()), f, indent=2)
+def setup(history_dir=None):
+    global history, presence, localizer, batcher, presence_version
+    # Only registered items get a history file, presence row or room; stray
+    # phones and beacons do not
+    history = RssiHistory(track=is_registered) if history_dir is None else RssiHistory(history_dir, track=is_registered)
+    presence = PresenceEngine(track=is_registered)
+    localizer = RoomLocalizer(track=is_registered)
+    presence_version = None
+    registered_macs.clear()
+    sync_presence()
+    batcher = SightingBatcher(apply_batch, window=BATCH_WINDOW, per_location=True)
+
+    # Read only when /metrics is scraped
+    gauge("edc_sightings_pending", "Sightings waiting for the next batch").set_function(lambda: len(batcher.pending))
+    gauge("edc_tags_present", "Tags currently present").set_function(lambda: int(presence.present[:presence.size].sum()))
+    gauge("edc_tags_tracked", "Tags the presence engine tracks").set_function(lambda: len(presence.index))
+    return batcher
 
 
 # ==============================
@@ -40,49 +141,51 @@ def on_connect(client, userdata, flags, rc):
 
 
 def on_message(client, userdata, msg):
-    try:
-        payload = json.loads(msg.payload.decode())
-    except:
-        print("Invalid JSON received")
-        return
+    with ON_MESSAGE_SECONDS.time():
+        try:
+            kind, payload = decode_payload(msg.payload)
+        except:
+            INVALID.inc()
+            print("Invalid payload received")
+            return
 
-    mac = payload.get("mac", "").lower()
-    location = payload.get("location", "Unknown")
-    rssi = payload.get("rssi", None)
-
-    if not mac:
-        return
+        MESSAGES[kind].inc()
+        if kind == "scan":
+            # One binary message per scan: every tag the scanner heard
+            batcher.add_many(payload["macs"], payload["location"], payload["rssi"], scan_time(payload))
+            return
 
-    print(f"Seen {mac} at {location} (RSSI {rssi})")
+        mac = payload.get("mac", "").lower()
+        # The ESP32 sketch reports its location name under "last_seen"
+        location = payload.get("location") or payload.get("last_seen", "Unknown")
+        rssi = payload.get("rssi", None)
 
-    items = load_items()
-    updated = False
+        if not mac:
+            return
 
-    for item_name, item in items.items():
-        stored_mac = item.get("mac", "").lower()
+        batcher.add(mac, location, rssi)
 
-        if stored_mac == mac:
 
-            item["last_seen_location"] = location
-            item["last_seen_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            item["rssi"] = rssi
+# ==============================
+# Main
+# ==============================
+def main():
+    import paho.mqtt.client as mqtt
 
-            print(f"Updated {item_name}")
-            updated = True
+    setup().start()
+    Thread(target=presence_loop, daemon=True).start()
+    start_state_server()
 
-    if updated:
-        save_items(items)
+    client = mqtt.Client()
+    client.on_connect = on_connect
+    client.on_message = on_message
 
+    client.connect(MQTT_BROKER, MQTT_PORT, 60)
 
-# ==============================
-# Main
-# ==============================
-client = mqtt.Client()
-client.on_connect = on_connect
-client.on_message = on_message
+    print("Listening for BLE devices...")
 
-client.connect(MQTT_BROKER, MQTT_PORT, 60)
+    client.loop_forever()
 
-print("Listening for BLE devices...")
 
-client.loop_forever()
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,141 @@
 # person_detector.py
-import cv2
 import json
 import time
-import paho.mqtt.client as mqtt
-from pathlib import Path
+import tracing
+from vision_pipeline import FramePipeline, LatestSlot, export_pipeline_metrics
+from missing_logic import check_missing_items  # indexed required-item check
+from metrics import counter, histogram
+
+# cv2, paho and the HOG model are only loaded by main(), so importing
+# this module is cheap and has no side effects.
 
 # --- MQTT Setup ---
 MQTT_BROKER = "localhost"
 MQTT_TOPIC = "edc/missing"
 
-mqtt_client = mqtt.Client()
-mqtt_client.connect(MQTT_BROKER, 1883, 60)
-mqtt_client.loop_start()
-
-# --- Items Data ---
-DATA_FILE = Path(__file__).parent / "data/items.json"
-
-def load_items():
-    if DATA_FILE.exists():
-        with open(DATA_FILE, "r") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-def check_missing_items():
-    """Return a list of missing items"""
-    items = load_items()
-    # Example logic: mark all items as missing for demonstration
-    # Replace this with ESP32 detection logic later
-    missing_items = [item for item in items if item.get("last_seen") != "Home"]
-    return missing_items
+# --- Detection Mode ---
+TRACKING_MODE = True   # full HOG every DETECT_EVERY frames, tracker in between
+DETECT_EVERY = 10
+VIDEO_SOURCE = "0"     # camera index, video file, image directory or "synthetic"
+
+# --- Metrics ---
+DETECT_SECONDS = histogram("edc_person_detect_seconds", "Person detection time per frame", ["mode"])
+TRACKING_SECONDS = DETECT_SECONDS.labels(mode="tracking")
+HOG_SECONDS = DETECT_SECONDS.labels(mode="hog")
+PERSON_LEFT = counter("edc_person_left_total", "Times a person was seen leaving")
+MISSING_PUBLISHED = counter("edc_missing_published_total", "Missing-item lists published to MQTT")
+
+mqtt_client = None
+hog_detect = None
+tracker = None
+debouncer = None
+
+def connect_mqtt():
+    import paho.mqtt.client as mqtt
+    client = mqtt.Client()
+    client.connect(MQTT_BROKER, 1883, 60)
+    client.loop_start()
+    return client
 
 # --- OpenCV Person Detector ---
-hog = cv2.HOGDescriptor()
-hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
-
-cap = cv2.VideoCapture(0)  # USB camera
-
-person_detected_last_frame = False
-
-print("Starting camera person detection...")
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("Failed to grab frame")
-        break
+def detect_people(frame):
+    """Inference stage: returns (resized frame, person rectangles)."""
+    import cv2
 
     # Resize for speed
     frame_resized = cv2.resize(frame, (640, 480))
 
     # Detect people
-    rects, weights = hog.detectMultiScale(frame_resized, winStride=(8,8), padding=(16,16), scale=1.05)
+    if TRACKING_MODE:
+        with TRACKING_SECONDS.time():
+            rects = tracker.process(frame_resized)
+    else:
+        with HOG_SECONDS.time():
+            rects = hog_detect(frame_resized)
+    return frame_resized, rects
+
+person_detected_last_frame = False
+display = LatestSlot()
+
+def on_people(result, frame, captured_at):
+    """Trigger stage: publish missing items when a person leaves."""
+    global person_detected_last_frame
+    frame_resized, rects = result
     person_detected = len(rects) > 0
 
-    # Draw rectangles
-    for (x, y, w, h) in rects:
-        cv2.rectangle(frame_resized, (x, y), (x + w, y + h), (0, 255, 0), 2)
+    if TRACKING_MODE:
+        # Debounced: a few missed frames do not count as leaving
+        person_left = debouncer.update(person_detected, captured_at) == "left"
+    else:
+        # Check if person just left (was detected last frame but now gone)
+        person_left = person_detected_last_frame and not person_detected
 
-    # Check if person just left (was detected last frame but now gone)
-    if person_detected_last_frame and not person_detected:
+    if person_left:
+        PERSON_LEFT.inc()
         print("Person left, checking missing items...")
         missing_items = check_missing_items()
         if missing_items:
-            # Publish missing items to MQTT
-            mqtt_client.publish(MQTT_TOPIC, json.dumps(missing_items))
+            # Publish missing items to MQTT; when tracing, wrapped with the
+            # trace id so the GUI's spans join this alert's trace
+            payload = missing_items
+            if tracing.current() is not None:
+                payload = {"trace": tracing.current(), "items": missing_items}
+            with tracing.span("mqtt.publish", topic=MQTT_TOPIC):
+                mqtt_client.publish(MQTT_TOPIC, json.dumps(payload))
+            MISSING_PUBLISHED.inc()
             print(f"Published missing items: {[item['name'] for item in missing_items]}")
 
     person_detected_last_frame = person_detected
-
-    # Show camera feed (optional)
-    cv2.imshow("Person Detector", frame_resized)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+    display.put((frame_resized, rects))
+
+def show_feed(pipeline):
+    """Show annotated frames until 'q' is pressed or the source runs out."""
+    import cv2
+
+    while not pipeline.finished.is_set():
+        shown = display.get(timeout=0.1)
+        if shown is not None:
+            (frame_resized, rects), _ = shown
+
+            # Draw rectangles
+            for (x, y, w, h) in rects:
+                cv2.rectangle(frame_resized, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+            # Show camera feed (optional)
+            cv2.imshow("Person Detector", frame_resized)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+    cv2.destroyAllWindows()
+
+def main(source=VIDEO_SOURCE, show=True):
+    global mqtt_client, hog_detect, tracker, debouncer
+    from person_tracker import DetectTracker, PresenceDebouncer, make_hog_detector
+    from frame_sources import open_source
+
+    mqtt_client = connect_mqtt()
+    hog_detect = make_hog_detector()
+    tracker = DetectTracker(hog_detect, detect_every=DETECT_EVERY)
+    debouncer = PresenceDebouncer()
+
+    cap = open_source(source)  # USB camera by default
+
+    print("Starting camera person detection...")
+
+    # Capture, HOG and triggering run in their own threads, each stage only
+    # taking the newest frame/result; the main thread just shows the feed.
+    pipeline = FramePipeline(cap, detect_people, on_people).start()
+    export_pipeline_metrics(pipeline, "detector")
+    try:
+        if show:
+            show_feed(pipeline)
+        else:
+            pipeline.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        cap.release()
+        mqtt_client.loop_stop()
+
+if __name__ == "__main__":
+    main()
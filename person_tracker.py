@@ -0,0 +1,133 @@
+# person_tracker.py
+import time
+
+import cv2
+
+DETECT_EVERY = 10      # run the full HOG detector once per this many frames
+ENTER_FRAMES = 2       # consecutive frames with a person before "entered"
+LEAVE_FRAMES = 12      # consecutive frames without a person before "left" (> one detect cycle)
+LEAVE_SECONDS = 1.5    # ...and at least this long since the person was last seen
+
+# HOG people detector settings
+HOG_WIN_STRIDE = (8, 8)
+HOG_PADDING = (16, 16)
+HOG_SCALE = 1.05
+
+
+def make_hog_detector():
+    """Returns detect(frame) -> person rectangles using OpenCV's default people HOG."""
+    hog = cv2.HOGDescriptor()
+    hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(frame):
+        rects, weights = hog.detectMultiScale(frame, winStride=HOG_WIN_STRIDE, padding=HOG_PADDING, scale=HOG_SCALE)
+        return rects
+
+    return detect
+
+
+def create_tracker():
+    """Fastest single-object tracker this OpenCV build provides, or None."""
+    for factory in ("TrackerKCF_create", "TrackerCSRT_create", "TrackerMIL_create"):
+        if hasattr(cv2, factory):
+            return getattr(cv2, factory)()
+        legacy = getattr(cv2, "legacy", None)
+        if legacy is not None and hasattr(legacy, factory):
+            return getattr(legacy, factory)()
+    return None
+
+
+# ==============================
+# Enter/leave state machine
+# ==============================
+class PresenceDebouncer:
+    """
+    Turns a noisy per-frame "person visible" signal into stable enter and
+    leave events. One missed detection no longer counts as a departure.
+    """
+
+    def __init__(self, enter_frames=ENTER_FRAMES, leave_frames=LEAVE_FRAMES, leave_seconds=LEAVE_SECONDS):
+        self.enter_frames = enter_frames
+        self.leave_frames = leave_frames
+        self.leave_seconds = leave_seconds
+        self.present = False
+        self.hits = 0
+        self.misses = 0
+        self.last_seen = 0.0
+
+    def update(self, detected, now=None):
+        """Returns "entered", "left" or None."""
+        if now is None:
+            now = time.time()
+
+        if detected:
+            self.hits += 1
+            self.misses = 0
+            self.last_seen = now
+            if not self.present and self.hits >= self.enter_frames:
+                self.present = True
+                return "entered"
+            return None
+
+        self.hits = 0
+        self.misses += 1
+        if self.present and self.misses >= self.leave_frames and now - self.last_seen >= self.leave_seconds:
+            self.present = False
+            return "left"
+        return None
+
+
+# ==============================
+# Detect-then-track
+# ==============================
+class DetectTracker:
+    """
+    Runs `detect(frame)` every `detect_every` frames and follows the
+    detected boxes with lightweight OpenCV trackers in between. If this
+    OpenCV build has no tracker, the last detections are held until the
+    next detector run.
+    """
+
+    def __init__(self, detect, detect_every=DETECT_EVERY):
+        self.detect = detect
+        self.detect_every = detect_every
+        self.trackers = []
+        self.boxes = []
+        self.frame_index = 0
+        self.recheck = False   # a track was lost: confirm with the detector next frame
+        self.detections = 0
+        self.tracked = 0
+
+    def process(self, frame):
+        """Returns a list of (x, y, w, h) person boxes for this frame."""
+        run_detector = self.frame_index % self.detect_every == 0 or self.recheck
+        self.frame_index += 1
+        self.recheck = False
+
+        if run_detector:
+            self.detections += 1
+            self.boxes = [tuple(int(v) for v in box) for box in self.detect(frame)]
+            self.trackers = []
+            for box in self.boxes:
+                tracker = create_tracker()
+                if tracker is None:
+                    break
+                tracker.init(frame, box)
+                self.trackers.append(tracker)
+            return self.boxes
+
+        self.tracked += 1
+        if not self.trackers:
+            return self.boxes
+
+        boxes = []
+        trackers = []
+        for tracker in self.trackers:
+            ok, box = tracker.update(frame)
+            if ok:
+                boxes.append(tuple(int(v) for v in box))
+                trackers.append(tracker)
+        self.recheck = len(trackers) < len(self.trackers)
+        self.trackers = trackers
+        self.boxes = boxes
+        return boxes
@@ -0,0 +1,195 @@
+# presence_engine.py
+import threading
+import time
+
+import numpy as np
+
+from item_registry import normalize_mac
+
+SMOOTHING = 0.3         # EWMA weight of a new RSSI reading
+ENTER_RSSI = -65.0      # smoothed RSSI at or above which an absent tag becomes present
+EXIT_RSSI = -75.0       # smoothed RSSI below which a present tag becomes absent
+EXIT_TIMEOUT = 30.0     # seconds without any sighting before a tag is absent
+INITIAL_CAPACITY = 256
+
+
+class PresenceEngine:
+    """
+    Per-tag presence with RSSI smoothing and hysteresis. State lives in
+    NumPy arrays indexed by a per-MAC row number, and whole batches of
+    sightings are applied with vectorized operations.
+
+    A tag enters when its smoothed RSSI reaches ENTER_RSSI and leaves when
+    it drops below EXIT_RSSI or goes unseen for EXIT_TIMEOUT seconds; the
+    gap between the two thresholds stops it flapping at the boundary.
+
+    `track(mac)` decides which tags get a row (e.g. only registered
+    items); sightings of any other MAC are ignored, so stray phones and
+    beacons cost nothing. Rows of forgotten tags are reused.
+    """
+
+    def __init__(self, smoothing=SMOOTHING, enter_rssi=ENTER_RSSI, exit_rssi=EXIT_RSSI,
+                 exit_timeout=EXIT_TIMEOUT, capacity=INITIAL_CAPACITY, track=None):
+        self.track = track
+        self.smoothing = smoothing
+        self.enter_rssi = enter_rssi
+        self.exit_rssi = exit_rssi
+        self.exit_timeout = exit_timeout
+
+        self.lock = threading.RLock()
+        self.index = {}   # normalized mac -> row
+        self.macs = []    # row -> mac (None when free)
+        self.free = []
+        self.size = 0
+        self.rssi = np.full(capacity, np.nan, dtype=np.float32)
+        self.last_seen = np.zeros(capacity, dtype=np.float64)
+        self.present = np.zeros(capacity, dtype=bool)
+
+    # --- Rows ---
+    def _grow(self, needed):
+        capacity = len(self.rssi)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == len(self.rssi):
+            return
+        self.rssi = np.concatenate((self.rssi, np.full(capacity - len(self.rssi), np.nan, dtype=np.float32)))
+        self.last_seen = np.concatenate((self.last_seen, np.zeros(capacity - len(self.last_seen))))
+        self.present = np.concatenate((self.present, np.zeros(capacity - len(self.present), dtype=bool)))
+
+    def rows_for(self, macs):
+        """
+        Row numbers for a sequence of MACs, adding unknown tracked ones;
+        -1 for MACs that are not tracked. Cache these for hot paths.
+        """
+        rows = np.empty(len(macs), dtype=np.int64)
+        index = self.index
+        for i, mac in enumerate(macs):
+            row = index.get(mac)
+            if row is None:
+                mac = normalize_mac(mac)
+                row = index.get(mac)
+                if row is None:
+                    row = self._add_row(mac)
+            rows[i] = row
+        return rows
+
+    def _add_row(self, mac):
+        if not mac or (self.track is not None and not self.track(mac)):
+            return -1
+        if self.free:
+            row = self.free.pop()
+            self.macs[row] = mac
+        else:
+            row = self.size
+            self.size += 1
+            self._grow(self.size)
+            self.macs.append(mac)
+        self.index[mac] = row
+        return row
+
+    def seed(self, states, now=None):
+        """
+        Add rows for known tags, given as (mac, present) pairs, that have
+        not been heard yet. Tags persisted as present get EXIT_TIMEOUT from
+        `now` to be heard, so one that never reports is still timed out.
+        Tags that already have a row are left alone.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            for mac, present in states:
+                mac = normalize_mac(mac)
+                if not mac or mac in self.index:
+                    continue
+                row = self.rows_for([mac])[0]
+                if row < 0:
+                    continue
+                self.present[row] = bool(present)
+                self.last_seen[row] = now if present else 0.0
+
+    def forget(self, macs):
+        """Stop tracking tags (e.g. items deleted from the registry). Their rows are reused."""
+        with self.lock:
+            for mac in macs:
+                row = self.index.pop(normalize_mac(mac), None)
+                if row is not None:
+                    self.rssi[row] = np.nan
+                    self.last_seen[row] = 0.0
+                    self.present[row] = False
+                    self.macs[row] = None
+                    self.free.append(row)
+
+    # --- Updates ---
+    def update(self, macs, rssi, seen_at, now=None):
+        """
+        Apply a batch of sightings. `rssi` and `seen_at` are array-likes
+        aligned with `macs`; NaN RSSI refreshes last-seen only.
+        Returns (entered_macs, exited_macs).
+        """
+        with self.lock:
+            rows = self.rows_for(macs)
+        return self.update_rows(rows, rssi, seen_at, now)
+
+    def update_rows(self, rows, rssi, seen_at, now=None):
+        """Same as update() for callers that already hold row numbers (see rows_for)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        rssi = np.asarray(rssi, dtype=np.float32)
+        seen_at = np.asarray(seen_at, dtype=np.float64)
+        tracked = rows >= 0
+        if not tracked.all():
+            rows, rssi, seen_at = rows[tracked], rssi[tracked], seen_at[tracked]
+        with self.lock:
+            if len(rows):
+                # Oldest first, so for repeated MACs the newest reading wins
+                order = np.argsort(seen_at, kind="stable")
+                rows, rssi, seen_at = rows[order], rssi[order], seen_at[order]
+                rows_u, last = np.unique(rows[::-1], return_index=True)
+                last = len(rows) - 1 - last
+                rows, rssi, seen_at = rows_u, rssi[last], seen_at[last]
+
+                old = self.rssi[rows]
+                smoothed = np.where(np.isnan(old), rssi, old + self.smoothing * (rssi - old))
+                self.rssi[rows] = np.where(np.isnan(rssi), old, smoothed)
+                self.last_seen[rows] = np.maximum(self.last_seen[rows], seen_at)
+            return self._evaluate(time.time() if now is None else now)
+
+    def update_sightings(self, sightings, now=None):
+        """Apply a batch of coalesced sightings (see sighting_batcher)."""
+        macs = [s["mac"] for s in sightings]
+        rssi = [np.nan if s["rssi"] is None else s["rssi"] for s in sightings]
+        seen_at = [s["time"] for s in sightings]
+        return self.update(macs, rssi, seen_at, now)
+
+    def tick(self, now=None):
+        """Re-evaluate timeouts without new sightings. Returns (entered_macs, exited_macs)."""
+        with self.lock:
+            return self._evaluate(time.time() if now is None else now)
+
+    def _evaluate(self, now):
+        n = self.size
+        rssi = self.rssi[:n]
+        present = self.present[:n]
+        fresh = (now - self.last_seen[:n]) <= self.exit_timeout
+
+        with np.errstate(invalid="ignore"):
+            entered = ~present & fresh & (rssi >= self.enter_rssi)
+            exited = present & (~fresh | (rssi < self.exit_rssi))
+        present |= entered
+        present &= ~exited
+
+        return ([self.macs[i] for i in np.flatnonzero(entered)],
+                [self.macs[i] for i in np.flatnonzero(exited)])
+
+    # --- Queries ---
+    def is_present(self, mac):
+        row = self.index.get(normalize_mac(mac))
+        return row is not None and bool(self.present[row])
+
+    def smoothed_rssi(self, mac):
+        row = self.index.get(normalize_mac(mac))
+        if row is None or np.isnan(self.rssi[row]):
+            return None
+        return float(self.rssi[row])
+
+    def present_macs(self):
+        with self.lock:
+            return [self.macs[i] for i in np.flatnonzero(self.present[:self.size])]
@@ -0,0 +1,109 @@
+# rate_controller.py
+import time
+
+CPU_BUDGET = 0.75       # fraction of one core the whole process may use
+LATENCY_TARGET = None   # seconds from capture to inference result, None to ignore
+WINDOW = 1.0            # seconds between adjustments
+MIN_INTERVAL = 0.0      # fastest pacing: as fast as frames arrive
+MAX_INTERVAL = 2.0      # slowest pacing: one inference every 2 s
+STEP = 0.01             # first interval when backing off from "as fast as possible"
+BACKOFF = 1.5           # interval multiplier when over a target
+SPEEDUP = 0.8           # interval multiplier when comfortably under every target
+HEADROOM = 0.8          # "comfortably under" = below this fraction of the target
+LATENCY_SMOOTHING = 0.3 # EWMA weight of the newest latency sample
+
+
+class RateController:
+    """
+    Paces the inference stage instead of a fixed sleep. Each WINDOW the
+    measured process CPU use (fraction of one core) and the smoothed
+    capture-to-result latency are compared with their targets: over
+    either one and the interval between inferences grows by BACKOFF;
+    comfortably under all of them and it shrinks by SPEEDUP.
+    """
+
+    def __init__(self, cpu_budget=CPU_BUDGET, latency_target=LATENCY_TARGET, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, window=WINDOW):
+        self.cpu_budget = cpu_budget
+        self.latency_target = latency_target
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.window = window
+
+        self.interval = min_interval
+        self.next_at = 0.0
+        self.latency = None
+
+        self.window_start = time.monotonic()
+        self.cpu_start = time.process_time()
+        self.window_count = 0
+
+        self.cpu = 0.0
+        self.rate = 0.0
+        self.adjustments = 0
+
+    def pace(self, stopping=None):
+        """Wait until the next inference is due; False if `stopping` was set meanwhile."""
+        delay = self.next_at - time.monotonic()
+        if delay > 0:
+            if stopping is not None:
+                return not stopping.wait(delay)
+            time.sleep(delay)
+        return True
+
+    def record(self, captured_at):
+        """Call after each inference with the frame's capture time (time.time())."""
+        now = time.monotonic()
+        self.next_at = now + self.interval
+        self.window_count += 1
+
+        latency = time.time() - captured_at
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+
+        elapsed = now - self.window_start
+        if elapsed >= self.window:
+            self._adjust(now, elapsed)
+
+    def _adjust(self, now, elapsed):
+        cpu_now = time.process_time()
+        self.cpu = (cpu_now - self.cpu_start) / elapsed
+        self.rate = self.window_count / elapsed
+        self.window_start, self.cpu_start, self.window_count = now, cpu_now, 0
+
+        loads = []
+        if self.cpu_budget:
+            loads.append(self.cpu / self.cpu_budget)
+        if self.latency_target:
+            loads.append(self.latency / self.latency_target)
+        if not loads:
+            return
+
+        interval = self.interval
+        if max(loads) > 1.0:
+            interval = min(self.max_interval, max(interval * BACKOFF, STEP))
+        elif max(loads) < HEADROOM:
+            interval *= SPEEDUP
+            if interval < STEP:
+                interval = self.min_interval
+        if interval != self.interval:
+            self.interval = max(self.min_interval, interval)
+            self.adjustments += 1
+
+    def current_rate(self):
+        """Rate over the last window, or since then if inference has stalled."""
+        elapsed = time.monotonic() - self.window_start
+        if elapsed >= 2 * self.window:
+            return self.window_count / elapsed
+        return self.rate
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "rate": self.current_rate(),
+            "cpu": self.cpu,
+            "latency": self.latency or 0.0,
+            "adjustments": self.adjustments,
+        }
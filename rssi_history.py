@@ -0,0 +1,265 @@
+# rssi_history.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from item_registry import normalize_mac
+
+HISTORY_DIR = Path.home() / "EDC-Detector" / "data" / "history"
+LOCATIONS_FILE = HISTORY_DIR / "locations.json"
+CAPACITY = 8192     # records per tag (~6.8 h at one sighting every 3 s)
+MAX_OPEN = 256      # ring buffers kept mapped at once; least recently used are closed
+RETENTION = 7 * 24 * 3600   # seconds an untracked tag's file is kept after its last write
+SWEEP_INTERVAL = 3600       # seconds between retention sweeps
+
+MAGIC = b"EDCR"
+VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u4"),
+    ("capacity", "<u8"),
+    ("count", "<u8"),    # total records ever written; head = count % capacity
+])
+
+RECORD_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("location", "<u2"),
+    ("rssi", "<i2"),
+])
+
+NO_RSSI = -32768
+
+
+# ==============================
+# Location ids
+# ==============================
+class LocationTable:
+    """Maps scanner location names to small integer ids, persisted as JSON."""
+
+    def __init__(self, path=LOCATIONS_FILE):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.names = []
+        self.ids = {}
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                try:
+                    self.names = json.load(f)
+                except json.JSONDecodeError:
+                    self.names = []
+        self.ids = {name: i for i, name in enumerate(self.names)}
+
+    def id_for(self, name):
+        location_id = self.ids.get(name)
+        if location_id is not None:
+            return location_id
+        with self.lock:
+            location_id = self.ids.get(name)
+            if location_id is None:
+                location_id = len(self.names)
+                self.names.append(name)
+                self.ids[name] = location_id
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "w") as f:
+                    json.dump(self.names, f, indent=2)
+            return location_id
+
+    def name_for(self, location_id):
+        if 0 <= location_id < len(self.names):
+            return self.names[location_id]
+        return "Unknown"
+
+
+# ==============================
+# Ring buffer
+# ==============================
+class RingBuffer:
+    """Fixed-size, memory-mapped ring of RECORD_DTYPE records for one tag."""
+
+    def __init__(self, path, capacity=CAPACITY):
+        self.path = Path(path)
+        size = HEADER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize
+
+        if self.path.exists() and self.path.stat().st_size >= HEADER_DTYPE.itemsize:
+            header = np.memmap(self.path, dtype=HEADER_DTYPE, mode="r", shape=(1,))
+            valid = header["magic"][0] == MAGIC and header["version"][0] == VERSION
+            existing = int(header["capacity"][0])
+            del header
+            if valid and self.path.stat().st_size == HEADER_DTYPE.itemsize + existing * RECORD_DTYPE.itemsize:
+                capacity = existing
+            else:
+                print(f"Discarding unreadable history file {self.path}")
+                self.path.unlink()
+
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "wb") as f:
+                f.truncate(size)
+            header = np.memmap(self.path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+            header[0] = (MAGIC, VERSION, capacity, 0)
+            header.flush()
+            del header
+
+        self.capacity = capacity
+        self.header = np.memmap(self.path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        self.records = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r+",
+                                 offset=HEADER_DTYPE.itemsize, shape=(capacity,))
+
+    @property
+    def count(self):
+        return int(self.header["count"][0])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp, location_id, rssi):
+        count = self.count
+        self.records[count % self.capacity] = (timestamp, location_id, rssi)
+        self.header["count"] = count + 1
+
+    def ordered(self):
+        """All stored records, oldest first."""
+        count = self.count
+        if count <= self.capacity:
+            return np.array(self.records[:count])
+        head = count % self.capacity
+        return np.concatenate((self.records[head:], self.records[:head]))
+
+    def flush(self):
+        self.records.flush()
+        self.header.flush()
+
+    def close(self):
+        self.flush()
+        # Dropping the last references unmaps the file
+        self.records = self.header = None
+
+
+# ==============================
+# History store
+# ==============================
+class RssiHistory:
+    """
+    Per-MAC sighting history. Each tag gets its own ring buffer file in
+    HISTORY_DIR, so history survives restarts and memory use stays fixed
+    regardless of how long the listener runs.
+
+    `track(mac)` decides which tags get a file (e.g. only registered
+    items), so phones with rotating random addresses do not fill the
+    disk. At most `max_open` rings are mapped at once, and sweep()
+    deletes files of untracked tags not written for RETENTION seconds.
+    """
+
+    def __init__(self, directory=HISTORY_DIR, capacity=CAPACITY, track=None, max_open=MAX_OPEN):
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.track = track
+        self.max_open = max_open
+        self.locations = LocationTable(self.directory / "locations.json")
+        self.lock = threading.Lock()
+        self.buffers = OrderedDict()   # mac -> open ring, least recently used first
+        self.next_sweep = 0.0
+
+    def _path(self, mac):
+        return self.directory / (mac.replace(":", "") + ".ring")
+
+    def _buffer(self, mac):
+        ring = self.buffers.get(mac)
+        if ring is not None:
+            self.buffers.move_to_end(mac)
+            return ring
+        ring = RingBuffer(self._path(mac), self.capacity)
+        self.buffers[mac] = ring
+        while len(self.buffers) > self.max_open:
+            _, oldest = self.buffers.popitem(last=False)
+            oldest.close()
+        return ring
+
+    def append(self, mac, location, rssi, timestamp=None):
+        mac = normalize_mac(mac)
+        if not mac or (self.track is not None and not self.track(mac)):
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        location_id = self.locations.id_for(location)
+        with self.lock:
+            self._buffer(mac).append(timestamp, location_id, NO_RSSI if rssi is None else rssi)
+
+    def append_batch(self, sightings):
+        """Record a batch of coalesced sightings (see sighting_batcher)."""
+        for sighting in sightings:
+            self.append(sighting["mac"], sighting["location"], sighting["rssi"], sighting["time"])
+        if time.monotonic() >= self.next_sweep:
+            self.sweep()
+
+    def sweep(self, retention=RETENTION):
+        """Delete ring files of untracked tags that were not written for `retention` seconds."""
+        self.next_sweep = time.monotonic() + SWEEP_INTERVAL
+        if self.track is None or not self.directory.exists():
+            return 0
+        cutoff = time.time() - retention
+        removed = 0
+        with self.lock:
+            for path in self.directory.glob("*.ring"):
+                stem = path.stem
+                mac = ":".join(stem[i:i + 2] for i in range(0, len(stem), 2))
+                if self.track(mac) or self.track(stem):
+                    continue
+                try:
+                    if path.stat().st_mtime > cutoff:
+                        continue
+                    ring = self.buffers.pop(mac, None) or self.buffers.pop(stem, None)
+                    if ring is not None:
+                        ring.close()
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    print(f"Error removing history file {path}:", e)
+        if removed:
+            print(f"Removed {removed} stale history file(s)")
+        return removed
+
+    def query(self, mac, location=None, since=None, until=None):
+        """
+        Records for one tag, oldest first, optionally filtered to one
+        location name and a [since, until] time range (epoch seconds).
+        Records without an RSSI reading are dropped.
+        """
+        mac = normalize_mac(mac)
+        path = self._path(mac)
+        with self.lock:
+            if mac not in self.buffers and not path.exists():
+                return np.empty(0, dtype=RECORD_DTYPE)
+            records = self._buffer(mac).ordered()
+
+        mask = records["rssi"] != NO_RSSI
+        if location is not None:
+            location_id = self.locations.ids.get(location)
+            if location_id is None:
+                return records[:0]
+            mask &= records["location"] == location_id
+        if since is not None:
+            mask &= records["time"] >= since
+        if until is not None:
+            mask &= records["time"] <= until
+        return records[mask]
+
+    def recent(self, mac, seconds, location=None):
+        return self.query(mac, location=location, since=time.time() - seconds)
+
+    def mean_rssi(self, mac, seconds, location=None):
+        records = self.recent(mac, seconds, location)
+        if not len(records):
+            return None
+        return float(records["rssi"].mean())
+
+    def flush(self):
+        with self.lock:
+            for ring in self.buffers.values():
+                ring.flush()
@@ -0,0 +1,105 @@
+# sighting_batcher.py
+import threading
+import time
+
+BATCH_WINDOW = 0.5      # seconds sightings are buffered before being applied
+MAX_PENDING = 1000      # distinct MACs that force an early flush
+
+
+class SightingBatcher:
+    """
+    Buffers BLE sightings and hands them to `sink` in batches.
+    Repeated sightings of one MAC inside a window are coalesced into a
+    single record keeping the latest location and the strongest RSSI.
+
+    With per_location=True the record is kept per (MAC, location) instead,
+    so every scanner's reading of a tag survives for room localization.
+    """
+
+    def __init__(self, sink, window=BATCH_WINDOW, max_pending=MAX_PENDING, per_location=False):
+        self.sink = sink
+        self.window = window
+        self.max_pending = max_pending
+        self.per_location = per_location
+
+        self.lock = threading.Lock()
+        self.pending = {}
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+        self.received = 0
+        self.applied = 0
+        self.batches = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def add(self, mac, location, rssi, seen_at=None):
+        if seen_at is None:
+            seen_at = time.time()
+        with self.lock:
+            self._add(mac, location, rssi, seen_at)
+
+    def add_many(self, macs, location, rssi, seen_at=None):
+        """Add every tag from one scanner's scan under a single lock (see sighting_codec)."""
+        if seen_at is None:
+            seen_at = time.time()
+        with self.lock:
+            for mac, value in zip(macs, rssi):
+                self._add(mac, location, int(value), seen_at)
+
+    def _add(self, mac, location, rssi, seen_at):
+        self.received += 1
+        key = (mac, location) if self.per_location else mac
+        sighting = self.pending.get(key)
+        if sighting is None:
+            self.pending[key] = {
+                "mac": mac,
+                "location": location,
+                "rssi": rssi,
+                "time": seen_at,
+                "count": 1,
+            }
+            if len(self.pending) >= self.max_pending:
+                self._wake.set()
+            return
+
+        sighting["count"] += 1
+        if seen_at >= sighting["time"]:
+            sighting["time"] = seen_at
+            sighting["location"] = location
+        if rssi is not None and (sighting["rssi"] is None or rssi > sighting["rssi"]):
+            sighting["rssi"] = rssi
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return 0
+            batch = list(self.pending.values())
+            self.pending = {}
+
+        self.sink(batch)
+        self.applied += len(batch)
+        self.batches += 1
+        return len(batch)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.window)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print("Error applying sightings:", e)
@@ -0,0 +1,106 @@
+# sighting_codec.py
+#
+# Compact per-scan sighting payload: one MQTT message carries every tag a
+# scanner heard in one scan, instead of one JSON document per tag.
+#
+#   header   "EDC" | version u8 | scan time u32 (epoch s, 0 = use receive time)
+#            | location length u8 | location (UTF-8) | count u16
+#   records  count x (MAC 6 bytes | RSSI i8)
+#
+# All integers little-endian. Anything not starting with the magic is
+# treated as the existing JSON format.
+import json
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"EDC"
+VERSION = 1
+HEADER = struct.Struct("<3sBIB")
+COUNT = struct.Struct("<H")
+RECORD_DTYPE = np.dtype([("mac", "u1", 6), ("rssi", "i1")])
+MAX_RECORDS = 0xFFFF
+
+
+class PayloadError(ValueError):
+    pass
+
+
+def is_binary(payload):
+    return payload[:3] == MAGIC
+
+
+def encode_scan(location, devices, seen_at=None):
+    """
+    Encode one scan. `devices` is a sequence of (mac, rssi) pairs, MACs as
+    "aa:bb:cc:dd:ee:ff" strings; RSSI is clamped to the i8 range.
+    """
+    location = location.encode("utf-8")[:255]
+    if len(devices) > MAX_RECORDS:
+        raise PayloadError(f"too many devices for one payload: {len(devices)}")
+
+    records = np.empty(len(devices), dtype=RECORD_DTYPE)
+    if devices:
+        macs = bytes.fromhex("".join(mac.replace(":", "").replace("-", "") for mac, _ in devices))
+        if len(macs) != 6 * len(devices):
+            raise PayloadError("MACs must be 6 bytes")
+        records["mac"] = np.frombuffer(macs, dtype=np.uint8).reshape(-1, 6)
+        records["rssi"] = np.clip([rssi for _, rssi in devices], -128, 127)
+
+    return b"".join((
+        HEADER.pack(MAGIC, VERSION, int(seen_at or 0), len(location)),
+        location,
+        COUNT.pack(len(devices)),
+        records.tobytes(),
+    ))
+
+
+def decode_scan(payload):
+    """
+    Decode one binary scan in bulk. Returns a dict with "location",
+    "time" (None when the scanner had no clock), "macs" (list of
+    normalized MAC strings) and "rssi" (int8 array aligned with "macs").
+    """
+    if len(payload) < HEADER.size:
+        raise PayloadError("payload too short")
+    magic, version, seen_at, location_len = HEADER.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise PayloadError(f"unsupported payload version {version}")
+
+    offset = HEADER.size
+    location = bytes(payload[offset:offset + location_len]).decode("utf-8", "replace")
+    offset += location_len
+    if len(payload) < offset + COUNT.size:
+        raise PayloadError("payload truncated")
+    (count,) = COUNT.unpack_from(payload, offset)
+    offset += COUNT.size
+    if len(payload) != offset + count * RECORD_DTYPE.itemsize:
+        raise PayloadError("record block does not match count")
+
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE, count=count, offset=offset)
+    raw = records["mac"].tobytes()
+    return {
+        "location": location,
+        "time": float(seen_at) if seen_at else None,
+        "macs": [raw[i:i + 6].hex(":") for i in range(0, len(raw), 6)],
+        "rssi": records["rssi"].copy(),
+    }
+
+
+def decode_payload(payload):
+    """
+    Auto-detect and decode an MQTT payload. Returns ("scan", dict) for a
+    binary batch (see decode_scan) or ("json", object) for anything else.
+    Raises PayloadError or ValueError on malformed input.
+    """
+    if is_binary(payload):
+        return "scan", decode_scan(payload)
+    return "json", json.loads(payload.decode() if isinstance(payload, (bytes, bytearray)) else payload)
+
+
+def scan_time(scan, received_at=None):
+    """Scan timestamp, falling back to the receive time for scanners without a clock."""
+    if scan["time"] is not None:
+        return scan["time"]
+    return time.time() if received_at is None else received_at
@@ -0,0 +1,200 @@
+# state_server.py
+import base64
+import hashlib
+import json
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from item_registry import get_registry
+
+STATE_API_HOST = "127.0.0.1"
+STATE_API_PORT = 8765
+LONG_POLL_MAX = 30      # seconds a /changes?wait=... request may block
+WS_PING_INTERVAL = 15   # seconds between keep-alive pings on idle sockets
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Endpoints:
+#   GET /items                 full snapshot, ETag = its cursor
+#   GET /changes?since=C       items changed since cursor C (add &wait=S to long-poll)
+#   GET /ws?since=C            WebSocket; pushes the same delta documents as /changes
+#
+# A cursor is "<epoch>.<version>", taken from a document's "version". The
+# epoch is new for every registry, i.e. every daemon start, and versions
+# restart with it; a cursor or ETag from another epoch gets a full snapshot.
+
+
+def make_etag(cursor):
+    return f'"{cursor}"'
+
+
+def make_cursor(registry, version):
+    return f"{registry.epoch}.{version}"
+
+
+def parse_cursor(registry, cursor):
+    """Registry version of a client cursor; -1 (full snapshot) if it is from another epoch."""
+    epoch, _, version = cursor.rpartition(".")
+    version = int(version)
+    return version if epoch == registry.epoch else -1
+
+
+def delta_document(registry, since):
+    delta = registry.changes_since(since)
+    if delta is None:
+        version, items = registry.snapshot()
+        return {"version": version, "full": True, "changed": items, "removed": []}
+    version, changed, removed = delta
+    return {"version": version, "full": False, "changed": changed, "removed": removed}
+
+
+def client_document(registry, since):
+    """delta_document with its version as a cursor, for clients that may outlive the process."""
+    document = delta_document(registry, since)
+    return dict(document, version=make_cursor(registry, document["version"]))
+
+
+# ==============================
+# WebSocket framing (server side, text frames only)
+# ==============================
+def ws_accept_key(key):
+    digest = hashlib.sha1((key + WS_GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def ws_frame(payload, opcode=0x1):
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 1 << 16:
+        header.append(126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(127)
+        header += struct.pack("!Q", length)
+    return bytes(header) + payload
+
+
+# ==============================
+# HTTP handler
+# ==============================
+class StateRequestHandler(BaseHTTPRequestHandler):
+    registry = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            since = parse_cursor(self.registry, query.get("since", [""])[0] or "-1")
+            wait = min(float(query.get("wait", ["0"])[0]), LONG_POLL_MAX)
+        except ValueError:
+            self.send_error(400, "Bad query")
+            return
+
+        if url.path == "/items":
+            self.send_items()
+        elif url.path == "/changes":
+            if wait > 0:
+                self.registry.wait_for_change(since, wait)
+            document = client_document(self.registry, since)
+            self.send_json(document, document["version"])
+        elif url.path == "/ws":
+            self.serve_websocket(since)
+        else:
+            self.send_error(404, "Not found")
+
+    def send_items(self):
+        version, body = self.server.snapshot_body()
+        self.send_body(body, version)
+
+    def send_json(self, document, cursor):
+        self.send_body(json.dumps(document).encode(), cursor)
+
+    def send_body(self, body, cursor):
+        etag = make_etag(cursor)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def serve_websocket(self, since):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key or self.headers.get("Upgrade", "").lower() != "websocket":
+            self.send_error(400, "Expected WebSocket upgrade")
+            return
+
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", ws_accept_key(key))
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            while not self.server.stopping:
+                if self.registry.version != since:
+                    document = delta_document(self.registry, since)
+                    since = document["version"]
+                    document["version"] = make_cursor(self.registry, since)
+                    self.wfile.write(ws_frame(json.dumps(document).encode()))
+                    self.wfile.flush()
+                elif self.registry.wait_for_change(since, WS_PING_INTERVAL) == since:
+                    self.wfile.write(ws_frame(b"", opcode=0x9))
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+
+
+# ==============================
+# Server
+# ==============================
+class StateServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, registry, address):
+        handler = type("BoundStateRequestHandler", (StateRequestHandler,), {"registry": registry})
+        super().__init__(address, handler)
+        self.registry = registry
+        self.stopping = False
+        self._snapshot_lock = threading.Lock()
+        self._snapshot = (None, b"")
+
+    def snapshot_body(self):
+        """Full item list encoded once per registry version and shared by all pollers.
+        Returns (cursor, body)."""
+        with self._snapshot_lock:
+            version, body = self._snapshot
+            if version != self.registry.version:
+                version, items = self.registry.snapshot()
+                body = json.dumps({"version": make_cursor(self.registry, version), "items": items}).encode()
+                self._snapshot = (version, body)
+            return make_cursor(self.registry, version), body
+
+    def stop(self):
+        self.stopping = True
+        self.shutdown()
+        self.server_close()
+
+
+def start_state_server(registry=None, host=STATE_API_HOST, port=STATE_API_PORT):
+    server = StateServer(registry or get_registry(), (host, port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"State API listening on http://{host}:{server.server_address[1]}")
+    return server
@@ -0,0 +1,258 @@
+# state_socket.py
+#
+# Local IPC between the headless daemon, which owns the item registry, and
+# any number of GUIs. Newline-delimited compact JSON over a Unix socket.
+#
+#   daemon -> GUI   {"version": N, "full": true, "changed": [...], "removed": []}   on attach
+#                   {"version": N, "full": false, "changed": [...], "removed": [...]} per change
+#   GUI -> daemon   {"op": "add", "item": {...}}
+#                   {"op": "remove", "name": "..."}
+#                   {"op": "update", "name": "...", "fields": {...}}
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+import item_registry
+from item_registry import ItemRegistry, get_registry
+from state_server import delta_document
+
+STATE_SOCKET = Path.home() / "EDC-Detector" / "data" / "state.sock"
+PUSH_WAIT = 15          # seconds a connection waits for a change before re-checking the peer
+RECONNECT_BASE = 0.5    # first reconnect delay, doubled up to RECONNECT_MAX
+RECONNECT_MAX = 10.0
+
+
+def encode(doc):
+    return (json.dumps(doc, separators=(",", ":")) + "\n").encode()
+
+
+# ==============================
+# Daemon side
+# ==============================
+class StateSocketHandler(socketserver.StreamRequestHandler):
+    registry = None
+
+    def handle(self):
+        registry = self.registry
+        closed = threading.Event()
+        threading.Thread(target=self._read_commands, args=(closed,), daemon=True).start()
+
+        version = -1   # forces a full snapshot first
+        try:
+            while not closed.is_set():
+                if version >= 0:
+                    registry.wait_for_change(version, PUSH_WAIT)
+                    if registry.version == version:
+                        continue
+                doc = delta_document(registry, version)
+                self.wfile.write(encode(doc))
+                self.wfile.flush()
+                version = doc["version"]
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            closed.set()
+
+    def _read_commands(self, closed):
+        try:
+            for line in self.rfile:
+                try:
+                    apply_command(self.registry, json.loads(line))
+                except Exception as e:
+                    print("Bad state command:", e)
+        except (OSError, ValueError):
+            pass
+        closed.set()   # the push loop notices within PUSH_WAIT
+
+
+def apply_command(registry, command):
+    op = command.get("op")
+    if op == "add":
+        registry.add(command["item"])
+    elif op == "remove":
+        registry.remove(command["name"])
+    elif op == "update":
+        registry.update_by_name(command["name"], **command.get("fields", {}))
+    else:
+        raise ValueError(f"unknown op {op!r}")
+
+
+class StateSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def start_state_socket(registry=None, path=STATE_SOCKET):
+    """
+    Serve the registry on a Unix socket from a background thread. Returns
+    the server. Raises RuntimeError if another daemon already answers on
+    `path`. Commands are unauthenticated, so the socket is owner-only.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if daemon_running(path):
+        raise RuntimeError(f"another EDC daemon is already serving {path}")
+    if path.exists():
+        path.unlink()   # stale socket from a previous run
+
+    handler = type("BoundStateSocketHandler", (StateSocketHandler,), {"registry": registry or get_registry()})
+    umask = os.umask(0o177)   # created 0600, never briefly world-connectable
+    try:
+        server = StateSocketServer(str(path), handler)
+    finally:
+        os.umask(umask)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"State socket on {path}")
+    return server
+
+
+# ==============================
+# GUI side
+# ==============================
+class MirrorRegistry(ItemRegistry):
+    """
+    Memory-only copy of the daemon's registry. Reads are local; add,
+    remove and update are sent to the daemon and applied locally right
+    away, and the daemon's own changes arrive through the feed.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        super().__init__(path=None)
+
+    def add(self, item):
+        self.client.send({"op": "add", "item": item})
+        return super().add(item)
+
+    def remove(self, name):
+        self.client.send({"op": "remove", "name": name})
+        return super().remove(name)
+
+    def update(self, mac, **fields):
+        item = self.get(mac)
+        if item is None:
+            return None
+        return self.update_by_name(item.get("name"), **fields)
+
+    def update_by_name(self, name, **fields):
+        self.client.send({"op": "update", "name": name, "fields": fields})
+        return super().update_by_name(name, **fields)
+
+    def replace_all(self, items):
+        # Local only: used for snapshots, never pushed back to the daemon
+        super().replace_all(items)
+
+    def close(self):
+        self.client.close()
+
+
+class StateClient:
+    """
+    Keeps a MirrorRegistry in sync with the daemon over the state socket,
+    reconnecting with backoff. `on_update(full, changed_names, removed_names)`
+    is called from the client thread after each snapshot or delta.
+    """
+
+    def __init__(self, path=STATE_SOCKET, on_update=None):
+        self.path = str(path)
+        self.on_update = on_update
+        self.registry = MirrorRegistry(self)
+        self.connected = threading.Event()
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stopped = True
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def send(self, command):
+        with self._send_lock:
+            sock = self._sock
+            if sock is None:
+                print("State daemon not connected; change kept locally only")
+                return False
+            try:
+                sock.sendall(encode(command))
+                return True
+            except OSError as e:
+                print("Error sending to state daemon:", e)
+                return False
+
+    def _run(self):
+        delay = RECONNECT_BASE
+        while not self._stopped:
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                time.sleep(delay)
+                delay = min(RECONNECT_MAX, delay * 2)
+                continue
+
+            delay = RECONNECT_BASE
+            self._sock = sock
+            self.connected.set()
+            try:
+                for line in sock.makefile("rb"):
+                    self._apply(json.loads(line))
+            except (OSError, ValueError) as e:
+                if not self._stopped:
+                    print("State daemon connection lost:", e)
+            finally:
+                self.connected.clear()
+                with self._send_lock:
+                    self._sock = None
+                sock.close()
+
+    def _apply(self, doc):
+        if doc["full"]:
+            self.registry.replace_all(doc["changed"])
+        else:
+            self.registry.apply_delta(doc["changed"], doc["removed"])
+        changed = [item.get("name") for item in doc["changed"]]
+        if self.on_update is not None:
+            self.on_update(doc["full"], changed, doc["removed"])
+
+
+def daemon_running(path=STATE_SOCKET):
+    if not os.path.exists(path):
+        return False
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def attach(on_update=None, path=STATE_SOCKET, timeout=2.0):
+    """
+    Connect to a running daemon and make the mirror the shared registry
+    of this process (see item_registry.get_registry). Returns the client,
+    or None if no daemon is listening.
+    """
+    if not daemon_running(path):
+        return None
+    client = StateClient(path, on_update).start()
+    client.connected.wait(timeout)
+    item_registry._registry = client.registry
+    return client
@@ -0,0 +1,52 @@
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import database
+
+
+@pytest.fixture(autouse=True)
+def db_file(monkeypatch, tmp_path):
+    path = tmp_path / "data" / "edc.db"
+    monkeypatch.setattr(database, "DB_FILE", path)
+    return path
+
+
+@pytest.mark.parametrize("module", ["database", "add_item_window"])
+def test_import_creates_nothing(tmp_path, module):
+    home = tmp_path / "home"
+    home.mkdir()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=Path(database.__file__).parent,
+                   env={"HOME": str(home), "PATH": ""}, check=True)
+    assert list(home.iterdir()) == []
+
+
+def test_connect_creates_directory(db_file):
+    db = database.DB()
+    assert db_file.exists()
+    db.close()
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_writes_and_reads(background):
+    db = database.DB(background=background, flush_interval=0.01)
+    assert db.create_user("a@example.com", "pw")
+    assert not db.create_user("a@example.com", "pw")   # UNIQUE email
+    db.add_events([("INFO", "one", "t"), ("WARNING", "two", "t")])
+    db.flush()
+    assert db.verify_user("a@example.com", "pw")
+    assert [e[1] for e in db.GetEvents()] == ["one", "two"]
+    db.close()
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_write_after_close_raises(background):
+    db = database.DB(background=background)
+    db.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        db.create_user("a@example.com", "pw")    # wait=True used to block forever
+    with pytest.raises(sqlite3.ProgrammingError):
+        db.add_event("INFO", "late", "t")
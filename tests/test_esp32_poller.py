@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import esp32_poller
+from esp32_poller import ScannerClient, ScannerPoller
+
+
+class StandIn:
+    """A local ESP32 /seen endpoint whose reply each test controls."""
+
+    def __init__(self):
+        self.body = {"location": "Kitchen", "seen": ["AA:BB:CC:DD:EE:01"]}
+        self.delay = 0.0
+        self.status = 200
+        self.hits = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stand_in.hits += 1
+                time.sleep(stand_in.delay)
+                body = stand_in.body if isinstance(stand_in.body, bytes) else json.dumps(stand_in.body).encode()
+                self.send_response(stand_in.status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.address = f"127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def scanner():
+    stand_in = StandIn()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(esp32_poller, "FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(esp32_poller, "BACKOFF_BASE", 0.2)
+
+
+def test_poll_merges_scanners(scanner):
+    other = StandIn()
+    other.body = {"location": "Hall", "seen": ["aa:bb:cc:dd:ee:01", "aa:bb:cc:dd:ee:02"]}
+    poller = ScannerPoller([scanner.address, other.address])
+    try:
+        # Scanner order decides which location wins for a tag both saw
+        assert poller.poll() == {"aa:bb:cc:dd:ee:01": "Kitchen", "aa:bb:cc:dd:ee:02": "Hall"}
+    finally:
+        poller.close()
+        other.close()
+
+
+def test_timeout_counts_as_failure(scanner):
+    scanner.delay = 0.5
+    client = ScannerClient(scanner.address, timeout=0.1)
+    with pytest.raises(Exception):
+        client.fetch()
+    assert client.failures == 1
+    client.close()
+
+
+@pytest.mark.parametrize("body", [["not", "an", "object"], {"seen": "aa:bb"}, {"location": 3}, b"not json"])
+def test_malformed_bodies_trip_the_breaker(scanner, fast_backoff, body):
+    scanner.body = body
+    client = ScannerClient(scanner.address)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            client.fetch()
+    assert client.failures == 2
+    assert not client.available()
+    client.close()
+
+
+def test_open_circuit_skips_scanner_then_half_opens(scanner, fast_backoff):
+    scanner.status = 500
+    poller = ScannerPoller([scanner.address], timeout=0.5)
+    try:
+        poller.poll()
+        poller.poll()
+        hits = scanner.hits
+        assert poller.stats()[0]["circuit_open"]
+
+        assert poller.poll() == {}            # open: not contacted
+        assert scanner.hits == hits
+
+        time.sleep(0.25)                      # half-open: one trial request
+        scanner.status = 200
+        assert poller.poll() == {"aa:bb:cc:dd:ee:01": "Kitchen"}
+        assert scanner.hits == hits + 1
+        assert poller.stats()[0]["failures"] == 0
+    finally:
+        poller.close()
+
+
+def test_failed_trial_reopens_with_longer_backoff(scanner, fast_backoff):
+    scanner.status = 500
+    client = ScannerClient(scanner.address)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            client.fetch()
+    first = client.open_until - time.monotonic()
+    time.sleep(0.25)
+    assert client.available()
+    with pytest.raises(Exception):
+        client.fetch()
+    assert client.open_until - time.monotonic() > first
+    client.close()
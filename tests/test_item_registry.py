@@ -0,0 +1,130 @@
+import json
+
+from item_registry import ItemRegistry
+
+
+def make_registry(items, path=None):
+    registry = ItemRegistry(path=path)
+    registry.replace_all(items)
+    return registry
+
+
+def test_lookups_by_mac_and_name():
+    registry = make_registry([{"name": "Keys", "mac": "AA:BB"}])
+    assert registry.get(" aa:bb ")["name"] == "Keys"
+    assert registry.get_by_name("Keys")["mac"] == "AA:BB"
+    assert registry.get("cc:dd") is None
+
+
+def test_remove_and_readd_are_visible_through_lookups():
+    registry = make_registry([{"name": "T0", "mac": "m0"}, {"name": "T1", "mac": "m1"}])
+    registry.remove("T0")
+    assert registry.get_by_name("T0") is None
+    assert registry.copy_by_name("T0") is None
+    assert list(registry.items_by_name()) == ["T1"]
+    registry.add({"name": "T0", "mac": "m0"})
+    assert list(registry.items_by_name()) == ["T1", "T0"]
+
+
+def test_copies_are_detached_from_the_registry():
+    registry = make_registry([{"name": "Keys", "mac": "aa"}])
+    items = registry.items_by_name()
+    copy = registry.copy_by_name("Keys")
+    registry.update("aa", last_seen="Hall")
+    registry.add({"name": "Phone", "mac": "bb"})
+    assert "last_seen" not in items["Keys"] and "last_seen" not in copy
+    assert list(items) == ["Keys"]
+
+
+def test_changes_since_reports_changed_and_removed():
+    registry = make_registry([{"name": "A", "mac": "aa"}, {"name": "B", "mac": "bb"}])
+    version = registry.version
+    registry.update("aa", present=False)
+    registry.remove("B")
+    new_version, changed, removed = registry.changes_since(version)
+    assert new_version == registry.version
+    assert [item["name"] for item in changed] == ["A"]
+    assert removed == ["B"]
+    assert registry.changes_since(version - 10) is None
+
+
+def test_apply_delta_mirrors_another_registry():
+    source = make_registry([{"name": "A", "mac": "aa"}, {"name": "B", "mac": "bb"}])
+    mirror = make_registry(source.snapshot()[1])
+    version = source.version
+    source.update_by_name("A", mac="cc")
+    source.remove("B")
+    _, changed, removed = source.changes_since(version)
+    mirror.apply_delta(changed, removed)
+    assert mirror.get("cc")["name"] == "A"
+    assert mirror.get("aa") is None and mirror.get_by_name("B") is None
+
+
+def test_write_behind_flush(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps([{"name": "Keys", "mac": "aa"}]))
+    registry = ItemRegistry(path=str(path), flush_interval=60)
+    registry.update("aa", present=False)
+    assert json.loads(path.read_text())[0].get("present") is None   # not written yet
+    assert registry.flush()
+    assert json.loads(path.read_text())[0]["present"] is False
+    assert not registry.flush()
+    registry.close()
+
+
+def shared_file(tmp_path, items):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(items))
+    return str(path)
+
+
+def test_flush_merges_changes_from_another_process(tmp_path):
+    path = shared_file(tmp_path, [{"name": "A", "mac": "aa"}, {"name": "B", "mac": "bb"}])
+    gui = ItemRegistry(path=path)
+    listener = ItemRegistry(path=path)
+
+    gui.add({"name": "C", "mac": "cc"})
+    gui.flush()
+    listener.update("bb", rssi=-50)
+    listener.update("aa", present=False)
+    gui.update("aa", last_seen="Hall")
+    listener.flush()
+    gui.flush()
+
+    on_disk = {item["name"]: item for item in json.loads(open(path).read())}
+    assert list(on_disk) == ["A", "B", "C"]
+    assert on_disk["A"] == {"name": "A", "mac": "aa", "present": False, "last_seen": "Hall"}
+    assert on_disk["B"]["rssi"] == -50
+    assert gui.get("bb")["rssi"] == -50
+    assert listener.get_by_name("C") == {"name": "C", "mac": "cc"}
+    assert "last_seen" not in listener.get("aa")   # until it looks at the file again
+    assert listener.refresh()
+    assert listener.get("aa")["last_seen"] == "Hall"
+
+
+def test_refresh_reports_other_process_changes_in_the_change_log(tmp_path):
+    path = shared_file(tmp_path, [{"name": "A", "mac": "aa"}, {"name": "B", "mac": "bb"}])
+    detector = ItemRegistry(path=path)
+    handler = ItemRegistry(path=path)
+    assert not detector.refresh()
+
+    version = detector.version
+    handler.update("aa", present=False)
+    handler.remove("B")
+    handler.flush()
+    assert detector.refresh()
+    _, changed, removed = detector.changes_since(version)
+    assert changed == [{"name": "A", "mac": "aa", "present": False}]
+    assert removed == ["B"]
+    assert detector.dirty == 0
+
+
+def test_removal_here_survives_a_merge(tmp_path):
+    path = shared_file(tmp_path, [{"name": "A", "mac": "aa"}, {"name": "B", "mac": "bb"}])
+    gui = ItemRegistry(path=path)
+    other = ItemRegistry(path=path)
+    gui.remove("A")
+    other.update("bb", rssi=-60)
+    other.flush()
+    gui.flush()
+    assert json.loads(open(path).read()) == [{"name": "B", "mac": "bb", "rssi": -60}]
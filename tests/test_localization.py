@@ -0,0 +1,84 @@
+import warnings
+
+import pytest
+
+from localization import RoomLocalizer
+
+
+def sighting(mac, location, rssi, time, count=1):
+    return {"mac": mac, "location": location, "rssi": rssi, "time": time, "count": count}
+
+
+@pytest.fixture
+def localizer():
+    return RoomLocalizer(window=10.0, half_life=4.0, switch_margin=3.0)
+
+
+def test_assigns_strongest_room_and_its_rssi(localizer):
+    (tag,) = localizer.update_sightings([
+        sighting("AA:BB", "Kitchen", -70, 100.0),
+        sighting("aa:bb", "Hall", -50, 100.0, count=2),
+    ], now=100.0)
+    assert tag["mac"] == "aa:bb"
+    assert tag["location"] == "Hall"
+    assert tag["rssi"] == -50
+    assert tag["count"] == 3
+    assert 0.9 < tag["confidence"] <= 1.0
+    assert localizer.locate("aa:bb")[0] == "Hall"
+
+
+def test_hysteresis_keeps_room_and_reports_its_rssi(localizer):
+    localizer.update_sightings([sighting("aa", "Kitchen", -60, 100.0)], now=100.0)
+    # Office is 2 dB stronger, inside the switch margin: the tag stays,
+    # and the RSSI written back is the Kitchen reading, not Office's
+    (tag,) = localizer.update_sightings([sighting("aa", "Office", -58, 101.0)], now=101.0)
+    assert tag["location"] == "Kitchen"
+    assert tag["rssi"] == -60
+
+    (tag,) = localizer.update_sightings([sighting("aa", "Office", -45, 102.0)], now=102.0)
+    assert tag["location"] == "Office"
+    assert tag["rssi"] == round(localizer.scores("aa", now=102.0)["Office"])   # smoothed with the -58
+
+
+def test_stale_readings_drop_out(localizer):
+    localizer.update_sightings([sighting("aa", "Kitchen", -40, 100.0)], now=100.0)
+    (tag,) = localizer.update_sightings([sighting("aa", "Hall", -80, 120.0)], now=120.0)
+    assert tag["location"] == "Hall"
+    assert localizer.scores("aa", now=120.0) == {"Hall": -80.0}
+
+
+def test_tags_without_rssi_keep_newest_location_without_warnings(localizer):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        tags = localizer.update_sightings([
+            sighting("aa", "Kitchen", None, 100.0),
+            sighting("aa", "Hall", None, 101.0),
+            sighting("bb", "Hall", -60, 101.0),
+        ], now=101.0)
+    aa, bb = sorted(tags, key=lambda t: t["mac"])
+    assert (aa["location"], aa["rssi"], aa["confidence"]) == ("Hall", None, None)
+    assert localizer.locate("aa") is None
+    assert bb["location"] == "Hall"
+
+
+def test_grid_grows(localizer):
+    batch = [sighting(f"tag{i}", f"room{i % 20}", -50 - i % 7, 100.0) for i in range(600)]
+    tags = localizer.update_sightings(batch, now=100.0)
+    assert len(tags) == 600
+    assert localizer.locate("tag599")[0] == "room19"
+
+
+def test_untracked_tags_get_no_rows_and_forgotten_rows_are_reused():
+    registered = {"aa", "bb"}
+    localizer = RoomLocalizer(track=registered.__contains__)
+    strays = [sighting(f"stray{i}", "Hall", -50, 100.0) for i in range(5000)]
+    (tag,) = localizer.update_sightings(strays + [sighting("AA", "Hall", -60, 100.0)], now=100.0)
+    assert tag["mac"] == "aa"
+    assert localizer.macs == ["aa"]
+    assert localizer.rssi.shape[0] == 256
+
+    localizer.forget(["aa"])
+    assert localizer.locate("aa") is None
+    (tag,) = localizer.update_sightings([sighting("bb", "Kitchen", -70, 101.0)], now=101.0)
+    assert localizer.macs == ["bb"]
+    assert localizer.scores("bb", now=101.0) == {"Kitchen": -70.0}
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+
+import pytest
+
+import database
+from log import DBHandler
+
+
+class SlowDB:
+    """Stands in for DB(background=True): add_events blocks until `gate` opens."""
+
+    background = True
+
+    def __init__(self, ok=True):
+        self.gate = threading.Event()
+        self.busy = threading.Event()
+        self.ok = ok
+        self.rows = []
+
+    def add_events(self, events, wait=False):
+        if not wait:
+            raise AssertionError("queued without waiting: nothing bounds the DB's own queue")
+        self.busy.set()
+        self.gate.wait(5)
+        if self.ok:
+            self.rows.extend(events)
+        return self.ok
+
+    def flush(self):
+        pass
+
+
+def record(i):
+    return logging.LogRecord("edc", logging.INFO, __file__, 0, f"r{i}", None, None)
+
+
+def blocked_handler(db, **kwargs):
+    """A handler whose worker is stuck committing r0, with r1..r10 emitted behind it."""
+    handler = DBHandler(db, MaxQueue=3, BatchSize=1, FlushInterval=10, **kwargs)
+    handler.emit(record(0))
+    assert db.busy.wait(2)
+    for i in range(1, 11):
+        handler.emit(record(i))
+    return handler
+
+
+def queued(handler):
+    return [row[1] for row in handler.queue]
+
+
+def finish(handler, db):
+    db.gate.set()
+    handler.close()
+    return [row[1] for row in db.rows]
+
+
+def test_drop_oldest_keeps_the_newest_records():
+    db = SlowDB()
+    handler = blocked_handler(db)
+    assert queued(handler) == ["r8", "r9", "r10"]
+    assert handler.stats()["dropped"] == 7
+    assert handler.written == 0            # r0 is not committed yet
+    assert finish(handler, db) == ["r0", "r8", "r9", "r10"]
+    assert handler.written == 4
+
+
+def test_block_waits_then_drops():
+    db = SlowDB()
+    start = time.monotonic()
+    handler = blocked_handler(db, OverflowPolicy="block", BlockTimeout=0.02)
+    assert time.monotonic() - start >= 7 * 0.02
+    assert queued(handler) == ["r1", "r2", "r3"]
+    assert handler.dropped == 7
+    assert finish(handler, db) == ["r0", "r1", "r2", "r3"]
+
+
+def test_block_gets_in_when_the_worker_makes_room():
+    db = SlowDB()
+    handler = blocked_handler(db, OverflowPolicy="block", BlockTimeout=0.02)
+    handler.BlockTimeout = 5
+    threading.Timer(0.1, db.gate.set).start()
+    handler.emit(record(11))
+    assert "r11" in queued(handler) + [row[1] for row in db.rows]
+    assert finish(handler, db)[-1] == "r11"
+
+
+def test_sample_keeps_every_nth_overflowing_record():
+    db = SlowDB()
+    handler = blocked_handler(db, OverflowPolicy="sample", SampleEvery=2)
+    assert queued(handler) == ["r5", "r7", "r9"]
+    assert handler.dropped == 7
+    assert finish(handler, db) == ["r0", "r5", "r7", "r9"]
+
+
+def test_failed_commits_are_not_counted_as_written():
+    db = SlowDB(ok=False)
+    handler = blocked_handler(db)
+    finish(handler, db)
+    assert handler.stats()["written"] == 0
+    assert handler.stats()["failed"] == 4
+
+
+def test_unknown_policy_and_foreground_db_are_rejected():
+    with pytest.raises(ValueError):
+        DBHandler(SlowDB(), OverflowPolicy="spill")
+    with pytest.raises(ValueError):
+        DBHandler(object())
+
+
+def test_written_matches_committed_rows(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "DB_FILE", tmp_path / "edc.db")
+    db = database.DB(background=True, flush_interval=0.01)
+    handler = DBHandler(db, BatchSize=20, FlushInterval=0.05)
+    for i in range(50):
+        handler.emit(record(i))
+    handler.close()
+    assert handler.written == len(db.GetEvents()) == 50
+    db.close()
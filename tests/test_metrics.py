@@ -0,0 +1,37 @@
+import pytest
+
+from metrics import SIZE_BUCKETS, Counter, Gauge, Histogram, HistogramValue, MetricsRegistry, Value
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_labelled_children_get_the_metric_type(registry):
+    counter = registry._get(Counter, "c_total", "c", ["role"])
+    gauge = registry._get(Gauge, "g", "g", ["role"])
+    histogram = registry._get(Histogram, "h_seconds", "h", ["role"], buckets=SIZE_BUCKETS)
+    assert type(counter.labels(role="a")) is Value
+    assert type(gauge.labels(role="a")) is Value
+    child = histogram.labels(role="a")
+    assert type(child) is HistogramValue and child.buckets == SIZE_BUCKETS
+    assert histogram.labels(role="a") is child
+
+
+def test_render(registry):
+    registry._get(Counter, "c_total", "Things", ["role"]).labels(role="x").inc(3)
+    registry._get(Histogram, "h_seconds", "Time", (), buckets=None).observe(0.002)
+    text = registry.render()
+    assert "# TYPE c_total counter\n" in text
+    assert 'c_total{role="x"} 3\n' in text
+    assert '# TYPE h_seconds histogram\n' in text
+    assert 'h_seconds_bucket{le="0.0025"} 1\n' in text
+    assert 'h_seconds_bucket{le="0.001"} 0\n' in text
+    assert "h_seconds_count 1\n" in text
+
+
+def test_type_clash(registry):
+    registry._get(Counter, "x", "x", [])
+    with pytest.raises(ValueError):
+        registry._get(Gauge, "x", "x", [])
@@ -0,0 +1,67 @@
+from item_registry import ItemRegistry
+from missing_index import MissingItemIndex
+
+
+def make_registry(items):
+    registry = ItemRegistry(path=None)
+    registry.replace_all(items)
+    return registry
+
+
+def names(index):
+    return sorted(item["name"] for item in index.missing())
+
+
+def test_reports_required_items_that_are_not_present():
+    registry = make_registry([
+        {"name": "Keys", "mac": "aa", "required": True, "present": False},
+        {"name": "Wallet", "mac": "bb", "required": True, "present": True},
+        {"name": "Umbrella", "mac": "cc", "required": False, "present": False},
+    ])
+    index = MissingItemIndex(registry)
+    assert names(index) == ["Keys"]
+    assert index.missing_count() == 1
+
+
+def test_items_without_required_field_are_checked():
+    # e.g. added through the GUI before the field existed
+    registry = make_registry([{"name": "Keys", "mac": "aa", "last_seen": "Never"}])
+    index = MissingItemIndex(registry)
+    assert names(index) == []
+    registry.update("aa", present=False)
+    assert names(index) == ["Keys"]
+
+
+def test_follows_updates_adds_and_removes():
+    registry = make_registry([{"name": "Keys", "mac": "aa", "required": True, "present": True}])
+    index = MissingItemIndex(registry)
+    assert names(index) == []
+
+    registry.update("aa", present=False)
+    assert names(index) == ["Keys"]
+
+    registry.add({"name": "Phone", "mac": "dd", "required": True, "present": False})
+    assert names(index) == ["Keys", "Phone"]
+
+    registry.remove("Keys")
+    assert names(index) == ["Phone"]
+
+
+def test_recycled_id_does_not_return_stale_names():
+    registry = make_registry([{"name": "A", "mac": "aa", "required": True, "present": False}])
+    index = MissingItemIndex(registry)
+    assert index.missing_names() == ["A"]
+
+    # B takes A's freed id, so the missing bits are unchanged
+    registry.remove("A")
+    registry.add({"name": "B", "mac": "bb", "required": True, "present": False})
+    assert index.missing_names() == ["B"]
+    assert names(index) == ["B"]
+
+
+def test_rebuilds_after_replace_all():
+    registry = make_registry([{"name": "A", "mac": "aa", "required": True, "present": False}])
+    index = MissingItemIndex(registry)
+    assert names(index) == ["A"]
+    registry.replace_all([{"name": "C", "mac": "cc", "required": True, "present": False}])
+    assert names(index) == ["C"]
@@ -0,0 +1,84 @@
+import item_registry
+import mqtt_listener
+from item_registry import ItemRegistry
+from presence_engine import PresenceEngine
+
+MAC = "aa:bb:cc:dd:ee:01"
+
+
+def engine():
+    return PresenceEngine(smoothing=1.0, enter_rssi=-65, exit_rssi=-75, exit_timeout=30)
+
+
+def test_hysteresis_between_enter_and_exit_thresholds():
+    presence = engine()
+    assert presence.update([MAC], [-70], [0], now=0) == ([], [])   # not strong enough to enter
+    assert presence.update([MAC], [-60], [1], now=1) == ([MAC], [])
+    assert presence.update([MAC], [-70], [2], now=2) == ([], [])   # between thresholds: stays
+    assert presence.is_present(MAC)
+    assert presence.update([MAC], [-80], [3], now=3) == ([], [MAC])
+
+
+def test_smoothing_damps_a_single_weak_reading():
+    presence = PresenceEngine(smoothing=0.3)
+    presence.update([MAC], [-50], [0], now=0)
+    presence.update([MAC], [-90], [1], now=1)
+    assert presence.is_present(MAC)
+    assert presence.smoothed_rssi(MAC) == -62.0
+
+
+def test_newest_reading_wins_within_a_batch():
+    presence = engine()
+    presence.update([MAC, MAC], [-60, -90], [2, 1], now=2)
+    assert presence.is_present(MAC)
+
+
+def test_timeout_without_sightings():
+    presence = engine()
+    presence.update([MAC], [-60], [0], now=0)
+    assert presence.tick(now=20) == ([], [])
+    assert presence.tick(now=31) == ([], [MAC])
+
+
+def test_seeded_present_tag_times_out_if_never_heard():
+    presence = engine()
+    presence.seed([(MAC, True), ("aa:bb:cc:dd:ee:02", False)], now=100)
+    assert presence.is_present(MAC)
+    assert presence.tick(now=120) == ([], [])
+    assert presence.tick(now=131) == ([], [MAC])
+
+
+def test_forget_stops_tracking():
+    presence = engine()
+    presence.update([MAC], [-60], [0], now=0)
+    presence.forget([MAC])
+    assert not presence.is_present(MAC)
+    assert presence.tick(now=100) == ([], [])
+
+
+def test_listener_keeps_presence_rows_in_sync_with_registry(tmp_path, monkeypatch):
+    registry = ItemRegistry(path=None)
+    registry.replace_all([{"name": "Keys", "mac": MAC, "present": True}])
+    monkeypatch.setattr(item_registry, "_registry", registry)
+    mqtt_listener.setup(tmp_path / "history")
+    presence = mqtt_listener.presence
+    assert presence.is_present(MAC)
+
+    registry.add({"name": "Phone", "mac": "AA:BB:CC:DD:EE:02", "present": True})
+    registry.remove("Keys")
+    mqtt_listener.sync_presence()
+    assert sorted(presence.index) == ["aa:bb:cc:dd:ee:02"]
+
+
+def test_untracked_macs_get_no_rows_and_forgotten_rows_are_reused():
+    registered = {MAC, "aa:bb:cc:dd:ee:02"}
+    presence = PresenceEngine(smoothing=1.0, track=registered.__contains__)
+    strays = [f"02:00:00:00:{i // 256:02x}:{i % 256:02x}" for i in range(40000)]
+    presence.update(strays + [MAC], [-50] * 40001, [0] * 40001, now=0)
+    assert presence.size == 1 and presence.present_macs() == [MAC]
+    assert len(presence.rssi) == 256
+
+    presence.forget([MAC])
+    presence.update(["AA:BB:CC:DD:EE:02"], [-50], [1], now=1)
+    assert presence.size == 1
+    assert presence.present_macs() == ["aa:bb:cc:dd:ee:02"]
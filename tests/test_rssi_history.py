@@ -0,0 +1,48 @@
+import os
+import time
+
+from rssi_history import RssiHistory
+
+
+def test_append_and_query(tmp_path):
+    history = RssiHistory(tmp_path, capacity=4)
+    for i in range(6):
+        history.append("AA:BB:CC:DD:EE:01", "Kitchen" if i % 2 else "Hall", -50 - i, timestamp=100 + i)
+    records = history.query("aa:bb:cc:dd:ee:01")
+    # Ring of 4 keeps the newest records, oldest first
+    assert list(records["time"]) == [102, 103, 104, 105]
+    assert list(history.query("aa:bb:cc:dd:ee:01", location="Kitchen")["rssi"]) == [-53, -55]
+
+
+def test_untracked_macs_get_no_file(tmp_path):
+    tracked = {"aa:bb:cc:dd:ee:01"}
+    history = RssiHistory(tmp_path, capacity=4, track=lambda mac: mac in tracked)
+    history.append_batch([
+        {"mac": "aa:bb:cc:dd:ee:01", "location": "Hall", "rssi": -60, "time": 1.0},
+        {"mac": "12:34:56:78:9a:bc", "location": "Hall", "rssi": -60, "time": 1.0},
+    ])
+    assert sorted(p.name for p in tmp_path.glob("*.ring")) == ["aabbccddee01.ring"]
+
+
+def test_open_rings_are_bounded(tmp_path):
+    history = RssiHistory(tmp_path, capacity=4, max_open=3)
+    for i in range(10):
+        history.append(f"aa:bb:cc:dd:ee:{i:02x}", "Hall", -60, timestamp=1.0)
+    assert len(history.buffers) == 3
+    # Evicted rings are reopened from disk on demand
+    assert len(history.query("aa:bb:cc:dd:ee:00")) == 1
+
+
+def test_sweep_removes_old_files_of_untracked_tags(tmp_path):
+    tracked = {"aa:bb:cc:dd:ee:01", "aa:bb:cc:dd:ee:02"}
+    history = RssiHistory(tmp_path, capacity=4, track=lambda mac: mac in tracked)
+    for mac in tracked:
+        history.append(mac, "Hall", -60, timestamp=1.0)
+    history.flush()
+
+    tracked.discard("aa:bb:cc:dd:ee:02")
+    old = time.time() - 3600
+    os.utime(tmp_path / "aabbccddee02.ring", (old, old))
+    assert history.sweep(retention=60) == 1
+    assert sorted(p.name for p in tmp_path.glob("*.ring")) == ["aabbccddee01.ring"]
+    assert history.sweep(retention=60) == 0
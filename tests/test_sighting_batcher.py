@@ -0,0 +1,60 @@
+import threading
+import time
+
+from sighting_batcher import SightingBatcher
+
+
+def test_coalesces_by_mac():
+    batches = []
+    batcher = SightingBatcher(batches.append)
+    batcher.add("aa", "Kitchen", -70, seen_at=10)
+    batcher.add("aa", "Hall", -50, seen_at=12)
+    batcher.add("aa", "Office", None, seen_at=11)   # older: location kept, no RSSI
+    batcher.add("bb", "Hall", None, seen_at=10)
+    assert batcher.flush() == 2
+    assert batcher.flush() == 0
+    (batch,) = batches
+    a, b = sorted(batch, key=lambda s: s["mac"])
+    assert (a["location"], a["rssi"], a["time"], a["count"]) == ("Hall", -50, 12, 3)
+    assert b["rssi"] is None
+    assert (batcher.received, batcher.applied, batcher.batches) == (4, 2, 1)
+
+
+def test_per_location_keeps_every_scanner():
+    batches = []
+    batcher = SightingBatcher(batches.append, per_location=True)
+    batcher.add_many(["aa", "bb"], "Kitchen", [-60, -80], seen_at=10)
+    batcher.add_many(["aa"], "Hall", [-55], seen_at=10)
+    batcher.add("aa", "Kitchen", -65, seen_at=11)
+    batcher.flush()
+    readings = {(s["mac"], s["location"]): s["rssi"] for s in batches[0]}
+    assert readings == {("aa", "Kitchen"): -60, ("bb", "Kitchen"): -80, ("aa", "Hall"): -55}
+
+
+def test_max_pending_flushes_early():
+    flushed = threading.Event()
+    batcher = SightingBatcher(lambda batch: flushed.set(), window=60, max_pending=3).start()
+    try:
+        batcher.add_many(["aa", "bb"], "Hall", [-50, -50])
+        assert not flushed.wait(0.2)
+        batcher.add("cc", "Hall", -50)
+        assert flushed.wait(2)
+    finally:
+        batcher.stop()
+
+
+def test_stop_flushes_remainder_and_survives_sink_errors():
+    batches = []
+
+    def sink(batch):
+        if not batches:
+            batches.append(None)
+            raise RuntimeError("sink down")
+        batches.append(batch)
+
+    batcher = SightingBatcher(sink, window=0.05).start()
+    batcher.add("aa", "Hall", -50)
+    time.sleep(0.2)                      # first batch hits the failing sink
+    batcher.add("bb", "Hall", -50)
+    batcher.stop()
+    assert [s["mac"] for s in batches[-1]] == ["bb"]
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from sighting_codec import HEADER, PayloadError, decode_payload, decode_scan, encode_scan, scan_time
+
+DEVICES = [("AA:BB:CC:DD:EE:01", -40), ("aa-bb-cc-dd-ee-02", -200), ("aabbccddee03", 90)]
+
+
+def test_round_trip():
+    scan = decode_scan(encode_scan("Küche", DEVICES, seen_at=1700000000))
+    assert scan["location"] == "Küche"
+    assert scan["time"] == 1700000000.0
+    assert scan["macs"] == ["aa:bb:cc:dd:ee:01", "aa:bb:cc:dd:ee:02", "aa:bb:cc:dd:ee:03"]
+    assert scan["rssi"].tolist() == [-40, -128, 90]   # clamped to i8
+
+
+def test_zero_record_frame():
+    scan = decode_scan(encode_scan("Hall", []))
+    assert scan["macs"] == [] and len(scan["rssi"]) == 0
+    assert scan["time"] is None
+    assert scan_time(scan, received_at=5.0) == 5.0
+
+
+@pytest.mark.parametrize("cut", [1, 7, HEADER.size, HEADER.size + 5])
+def test_truncated_frame(cut):
+    payload = encode_scan("Hall", DEVICES)
+    with pytest.raises(PayloadError):
+        decode_scan(payload[:-cut])
+
+
+def test_trailing_bytes_rejected():
+    with pytest.raises(PayloadError):
+        decode_scan(encode_scan("Hall", DEVICES) + b"\x00")
+
+
+def test_bad_version_byte():
+    payload = bytearray(encode_scan("Hall", DEVICES))
+    payload[3] = 99
+    with pytest.raises(PayloadError):
+        decode_scan(bytes(payload))
+
+
+def test_bad_mac_rejected():
+    with pytest.raises(PayloadError):
+        encode_scan("Hall", [("aa:bb:cc", -50)])
+
+
+def test_decode_payload_detects_format():
+    assert decode_payload(encode_scan("Hall", DEVICES))[0] == "scan"
+    message = {"mac": "aa:bb:cc:dd:ee:01", "last_seen": "Hall", "rssi": -60}
+    assert decode_payload(json.dumps(message).encode()) == ("json", message)
+    with pytest.raises(ValueError):
+        decode_payload(b"\xff not json")
@@ -0,0 +1,84 @@
+import http.client
+import json
+
+import pytest
+
+from item_registry import ItemRegistry
+from state_server import start_state_server
+
+ITEMS = [{"name": "Keys", "mac": "aa"}, {"name": "Phone", "mac": "bb"}]
+
+
+def serve(registry):
+    server = start_state_server(registry, port=0)
+    return server, server.server_address[1]
+
+
+def get(port, path, etag=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path, headers={"If-None-Match": etag} if etag else {})
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp.status, resp.getheader("ETag"), json.loads(body) if resp.status == 200 else None
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """A registry on a shared items.json, served like the daemon serves it."""
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(ITEMS))
+    registry = ItemRegistry(path=str(path))
+    server, port = serve(registry)
+    yield registry, port
+    server.stop()
+
+
+def test_items_etag_and_304(daemon):
+    registry, port = daemon
+    status, etag, doc = get(port, "/items")
+    assert status == 200 and [item["name"] for item in doc["items"]] == ["Keys", "Phone"]
+    assert etag == f'"{doc["version"]}"'
+    assert get(port, "/items", etag)[:2] == (304, etag)
+
+    registry.update("aa", present=False)
+    status, new_etag, doc = get(port, "/items", etag)
+    assert status == 200 and new_etag != etag
+    assert doc["items"][0]["present"] is False
+
+
+def test_changes_since_a_cursor(daemon):
+    registry, port = daemon
+    cursor = get(port, "/items")[2]["version"]
+    registry.update("bb", rssi=-40)
+    _, etag, doc = get(port, f"/changes?since={cursor}")
+    assert doc["full"] is False
+    assert doc["changed"] == [{"name": "Phone", "mac": "bb", "rssi": -40}]
+    assert get(port, f"/changes?since={cursor}", etag)[0] == 304
+    assert get(port, f"/changes?since={doc['version']}")[2]["changed"] == []
+
+
+def test_restart_invalidates_etags_and_cursors(daemon, tmp_path):
+    registry, port = daemon
+    _, etag, doc = get(port, "/items")
+    cursor = doc["version"]
+
+    # A restarted daemon on the same file: versions start over, the epoch does not repeat
+    restarted = ItemRegistry(path=str(tmp_path / "items.json"))
+    restarted.update("aa", present=False)
+    while restarted.version < registry.version:
+        restarted.update("bb", rssi=-50)
+    server, new_port = serve(restarted)
+    try:
+        status, _, doc = get(new_port, "/items", etag)
+        assert status == 200
+        doc = get(new_port, f"/changes?since={cursor}")[2]
+        assert doc["full"] is True and len(doc["changed"]) == 2
+        assert get(new_port, "/changes?since=1")[2]["full"] is True   # bare versions carry no epoch
+    finally:
+        server.stop()
+
+
+def test_bad_cursor_is_rejected(daemon):
+    _, port = daemon
+    assert get(port, "/changes?since=abc.x")[0] == 400
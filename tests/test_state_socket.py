@@ -0,0 +1,88 @@
+import os
+import stat
+import threading
+
+import pytest
+
+import item_registry
+from item_registry import ItemRegistry
+from state_socket import StateClient, attach, daemon_running, start_state_socket
+
+
+@pytest.fixture
+def sock_path(tmp_path):
+    return tmp_path / "state.sock"
+
+
+@pytest.fixture
+def daemon(sock_path):
+    registry = ItemRegistry(path=None)
+    registry.replace_all([{"name": "Keys", "mac": "aa", "present": True}])
+    server = start_state_socket(registry, sock_path)
+    yield registry
+    server.shutdown()
+    server.server_close()
+
+
+def wait_until(condition, timeout=5):
+    done = threading.Event()
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return True
+        done.wait(0.02)
+    return condition()
+
+
+def test_socket_is_owner_only(daemon, sock_path):
+    assert stat.S_IMODE(os.stat(sock_path).st_mode) == 0o600
+
+
+def test_second_daemon_refuses_a_live_socket(daemon, sock_path):
+    with pytest.raises(RuntimeError):
+        start_state_socket(ItemRegistry(path=None), sock_path)
+    assert daemon_running(sock_path)
+
+
+def test_stale_socket_is_replaced(sock_path):
+    first = start_state_socket(ItemRegistry(path=None), sock_path)
+    first.shutdown()
+    first.server_close()          # leaves the socket file behind
+    assert sock_path.exists() and not daemon_running(sock_path)
+    second = start_state_socket(ItemRegistry(path=None), sock_path)
+    assert daemon_running(sock_path)
+    second.shutdown()
+    second.server_close()
+
+
+def test_mirror_follows_the_daemon_and_sends_commands(daemon, sock_path):
+    updates = []
+    client = StateClient(sock_path, on_update=lambda *args: updates.append(args)).start()
+    mirror = client.registry
+    try:
+        assert client.connected.wait(5)
+        assert wait_until(lambda: mirror.get("aa") is not None)
+        assert updates[0] == (True, ["Keys"], [])
+
+        daemon.update("aa", present=False)
+        assert wait_until(lambda: mirror.get("aa").get("present") is False)
+        assert updates[-1] == (False, ["Keys"], [])
+
+        mirror.add({"name": "Phone", "mac": "bb"})
+        mirror.update("bb", present=True)
+        mirror.remove("Keys")
+        assert mirror.get_by_name("Keys") is None             # applied locally at once
+        assert wait_until(lambda: daemon.get_by_name("Keys") is None)
+        assert daemon.get_by_name("Phone") == {"name": "Phone", "mac": "bb", "present": True}
+    finally:
+        client.close()
+
+
+def test_attach_replaces_the_shared_registry(daemon, sock_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(item_registry, "_registry", None)
+    assert attach(path=tmp_path / "nobody.sock") is None
+    client = attach(path=sock_path)
+    try:
+        assert item_registry.get_registry() is client.registry
+        assert wait_until(lambda: client.registry.get("aa") is not None)
+    finally:
+        client.close()
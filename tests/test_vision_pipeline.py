@@ -0,0 +1,42 @@
+import time
+
+from frame_sources import RealTimeSource, SyntheticSource, open_source
+from vision_pipeline import FramePipeline, LatestSlot
+
+
+def test_latest_slot_keeps_only_the_newest_value():
+    slot = LatestSlot()
+    slot.put(1)
+    slot.put(2)
+    assert slot.get(timeout=0)[0] == 2
+    assert slot.dropped == 1
+    assert slot.get(timeout=0) is None
+
+
+def test_open_source_paces_recorded_sources_unless_asked_not_to():
+    assert isinstance(open_source("synthetic:5"), RealTimeSource)
+    assert isinstance(open_source("synthetic:5", realtime=False), SyntheticSource)
+
+
+def test_realtime_source_keeps_up_with_inference_and_pipeline_ends():
+    results = []
+    source = RealTimeSource(SyntheticSource(frames=20, width=64, height=48, fps=100))
+    pipeline = FramePipeline(source, lambda frame: frame.shape, lambda r, f, t: results.append(r)).start()
+    assert pipeline.finished.wait(5)
+    pipeline.wait()
+    stats = pipeline.stats()
+    assert stats["captured"] == 20
+    assert stats["inferred"] >= 18
+    assert stats["read_failures"] == 0
+    assert results
+
+
+def test_end_of_clip_stops_an_unpaced_pipeline():
+    def slow_infer(frame):
+        time.sleep(0.01)
+        return True
+
+    pipeline = FramePipeline(SyntheticSource(frames=50, width=64, height=48), slow_infer, lambda *a: None).start()
+    assert pipeline.finished.wait(5)
+    pipeline.stop()
+    assert pipeline.stats()["read_failures"] == 0
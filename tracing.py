@@ -0,0 +1,330 @@
+# tracing.py
+#
+# Opt-in spans for following one missing-item alert through every stage:
+# frame capture, inference, cooldown, the missing-item check, the MQTT
+# publish and the GUI. Spans of the same alert share a trace id, which is
+# carried across MQTT in the payload. Each process streams its spans to
+# its own Chrome trace file. `merge` joins the files into one timeline
+# and links each trace's spans with flow arrows.
+#
+#   EDC_TRACE=/tmp/edc-trace python edc.py daemon --detector   # or: edc.py ... --trace DIR
+#   EDC_TRACE=/tmp/edc-trace python gui.py
+#   python tracing.py merge /tmp/edc-trace -o trace.json      # open in ui.perfetto.dev
+#   python tracing.py summary /tmp/edc-trace
+#
+# With EDC_TRACE unset, span() returns a shared no-op and nothing is recorded.
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+TRACE_ENV = "EDC_TRACE"
+MAX_EVENTS = 100000     # spans kept in memory between writes; older ones are dropped
+FLUSH_INTERVAL = 1.0    # seconds between writes to the trace file
+CATEGORY = "edc"
+
+ENABLED = bool(os.environ.get(TRACE_ENV))
+trace_dir = os.environ.get(TRACE_ENV) or None
+
+_events = deque(maxlen=MAX_EVENTS)
+_local = threading.local()
+_ids = itertools.count(1)
+_start_lock = threading.Lock()
+_writer = None
+# perf_counter -> wall clock in microseconds, so files from different processes line up
+_epoch_us = (time.time() - time.perf_counter()) * 1e6
+
+
+def enable(directory):
+    """Turn tracing on for this process; spawned children inherit it through EDC_TRACE."""
+    global ENABLED, trace_dir
+    os.environ[TRACE_ENV] = str(directory)
+    trace_dir = str(directory)
+    ENABLED = True
+
+
+def now_us():
+    return time.perf_counter() * 1e6 + _epoch_us
+
+
+# ==============================
+# Recording
+# ==============================
+def new_trace():
+    """A fresh trace id, unique across processes, or None while tracing is off."""
+    if not ENABLED:
+        return None
+    return (os.getpid() << 24) | (next(_ids) & 0xFFFFFF)
+
+
+def current():
+    """The trace id of the innermost active span on this thread, or None."""
+    if not ENABLED:
+        return None
+    return getattr(_local, "trace", None)
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, name, trace, args):
+        self.name = name
+        self.trace = trace
+        self.args = args
+
+    def __enter__(self):
+        self.outer = getattr(_local, "trace", None)
+        if self.trace is None:
+            self.trace = self.outer
+        _local.trace = self.trace
+        self.start = now_us()
+        return self
+
+    def __exit__(self, *exc):
+        end = now_us()
+        _local.trace = self.outer
+        args = self.args
+        if self.trace is not None:
+            args["trace"] = self.trace
+        if exc[0] is not None:
+            args["error"] = exc[0].__name__
+        _record({"name": self.name, "ph": "X", "ts": self.start, "dur": end - self.start, "args": args})
+        return False
+
+
+def span(name, trace=None, **args):
+    """
+    Time a block as `name`. Nested spans and anything called inside inherit
+    `trace` (default: the enclosing span's). `links=[...]` in args ties a
+    span to further traces, e.g. one GUI update applying several alerts.
+    """
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(name, trace, args)
+
+
+def instant(name, trace=None, **args):
+    """A zero-length marker, e.g. a trigger swallowed by the cooldown."""
+    if not ENABLED:
+        return
+    trace = current() if trace is None else trace
+    if trace is not None:
+        args["trace"] = trace
+    _record({"name": name, "ph": "i", "s": "t", "ts": now_us(), "args": args})
+
+
+def _record(event):
+    tid = getattr(_local, "tid", None)
+    if tid is None:
+        tid = _local.tid = threading.get_native_id()
+        _events.append({"name": "thread_name", "ph": "M", "tid": tid,
+                        "args": {"name": threading.current_thread().name}})
+    event["tid"] = tid
+    event["cat"] = CATEGORY
+    _events.append(event)
+    if _writer is None:
+        _start_writer()
+
+
+# ==============================
+# Writing
+# ==============================
+class TraceWriter:
+    """
+    Streams spans to <dir>/<process>-<pid>.json in Chrome's JSON array
+    format. The array is left open, as the format allows, so a process
+    that is killed still leaves a readable file.
+    """
+
+    def __init__(self, directory):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.pid = os.getpid()
+        self.path = Path(directory) / f"{process_name().replace(' ', '_')}-{self.pid}.json"
+        self.lock = threading.Lock()
+        with open(self.path, "w") as f:
+            f.write("[\n")
+            f.write(json.dumps({"name": "process_name", "ph": "M", "pid": self.pid,
+                                "args": {"name": process_name()}}) + ",\n")
+
+    def flush(self):
+        with self.lock:
+            lines = []
+            while _events:
+                event = _events.popleft()
+                event["pid"] = self.pid
+                lines.append(json.dumps(event, separators=(",", ":")) + ",\n")
+            if lines:
+                with open(self.path, "a") as f:
+                    f.writelines(lines)
+
+    def run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError as e:
+                print("Error writing trace:", e)
+
+
+def process_name():
+    import multiprocessing
+    name = multiprocessing.current_process().name
+    if name == "MainProcess":
+        name = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else "python"
+    return name
+
+
+def _start_writer():
+    global _writer
+    import atexit
+    with _start_lock:
+        if _writer is not None:
+            return
+        writer = TraceWriter(trace_dir)
+        threading.Thread(target=writer.run, name="trace-writer", daemon=True).start()
+        atexit.register(writer.flush)
+        print(f"Tracing to {writer.path}")
+        _writer = writer
+
+
+def flush():
+    if _writer is not None:
+        _writer.flush()
+
+
+# ==============================
+# Merging and summaries
+# ==============================
+def read_trace_file(path):
+    """Events from one (possibly unterminated) trace file."""
+    text = Path(path).read_text().strip()
+    if not text:
+        return []
+    if text.startswith("{"):
+        return json.loads(text).get("traceEvents", [])
+    text = text.rstrip(",\n ")
+    if not text.endswith("]"):
+        text += "]"
+    return json.loads(text)
+
+
+def read_traces(paths):
+    events = []
+    for path in paths:
+        path = Path(path)
+        files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+        for file in files:
+            try:
+                if path.is_dir() and file.read_text()[:1] == "{":
+                    continue   # an earlier merge output, not a process's file
+                events.extend(e for e in read_trace_file(file) if e.get("ph") not in ("s", "t", "f"))
+            except (OSError, ValueError) as e:
+                print(f"Skipping {file}: {e}")
+    return events
+
+
+def trace_ids(event):
+    args = event.get("args", {})
+    ids = list(args.get("links", ()))
+    if args.get("trace") is not None:
+        ids.append(args["trace"])
+    return ids
+
+
+def group_spans(events):
+    """Trace id -> its spans ("X" events) in start order."""
+    traces = {}
+    for event in events:
+        if event.get("ph") == "X":
+            for trace in trace_ids(event):
+                traces.setdefault(trace, []).append(event)
+    for spans in traces.values():
+        spans.sort(key=lambda e: e["ts"])
+    return traces
+
+
+def flow_events(traces):
+    """Chrome flow arrows from each span of a trace to the next, across threads and processes."""
+    flows = []
+    for trace, spans in traces.items():
+        if len(spans) < 2:
+            continue
+        for i, event in enumerate(spans):
+            phase = "s" if i == 0 else "f" if i == len(spans) - 1 else "t"
+            flow = {"name": "trace", "cat": CATEGORY, "ph": phase, "id": trace,
+                    "pid": event.get("pid"), "tid": event.get("tid"), "ts": event["ts"]}
+            if phase != "s":
+                flow["bp"] = "e"
+            flows.append(flow)
+    return flows
+
+
+def merge(paths, output):
+    events = read_traces(paths)
+    events.extend(flow_events(group_spans(events)))
+    with open(output, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    print(f"Wrote {len(events)} events to {output}")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summary(paths, alert_span="check_missing_items"):
+    """Per-span latencies, then a stage-by-stage breakdown of the slowest alerts."""
+    events = read_traces(paths)
+    durations = {}
+    for event in events:
+        if event.get("ph") == "X":
+            durations.setdefault(event["name"], []).append(event["dur"] / 1000)
+    print(f"{'span':32} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, values in sorted(durations.items()):
+        print(f"{name:32} {len(values):7} {percentile(values, 0.5):9.2f} "
+              f"{percentile(values, 0.95):9.2f} {max(values):9.2f}")
+
+    alerts = [spans for spans in group_spans(events).values() if any(e["name"] == alert_span for e in spans)]
+    if not alerts:
+        return
+
+    def total(spans):
+        return max(e["ts"] + e["dur"] for e in spans) - spans[0]["ts"]
+
+    alerts.sort(key=total, reverse=True)
+    print(f"\n{len(alerts)} alerts; slowest first (offsets from the first span):")
+    for spans in alerts[:5]:
+        print(f"  end to end {total(spans) / 1000:.1f} ms")
+        start = spans[0]["ts"]
+        for e in spans:
+            print(f"    +{(e['ts'] - start) / 1000:9.2f} ms  {e['name']:28} {e['dur'] / 1000:8.2f} ms")
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Merge or summarize EDC trace files")
+    parser.add_argument("command", choices=["merge", "summary"])
+    parser.add_argument("paths", nargs="+", help="trace directories or files")
+    parser.add_argument("-o", "--output", default="trace.json", help="merge: output file")
+    args = parser.parse_args(argv)
+    if args.command == "merge":
+        merge(args.paths, args.output)
+    else:
+        summary(args.paths)
+
+
+if __name__ == "__main__":
+    main()
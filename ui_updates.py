@@ -0,0 +1,149 @@
+# ui_updates.py
+import threading
+import time
+
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+
+import tracing
+from item_registry import get_registry
+
+ALERT_INTERVAL = 5.0    # minimum seconds between missing-item notifications
+ALERT_DURATION = 4.0    # seconds a notification stays on screen
+ALERT_MAX_LISTED = 5    # items named in one notification before "... and N more"
+
+
+class MissingAlert:
+    """A single missing-items popup that is updated in place instead of stacked."""
+
+    def __init__(self):
+        self.label = Label(text="", font_size=14)
+        content = BoxLayout(orientation="vertical", padding=5)
+        content.add_widget(self.label)
+        self.popup = Popup(title="Missing Item", content=content,
+                           size_hint=(None, None), size=(250, 100),
+                           auto_dismiss=True, separator_height=0)
+        self.is_open = False
+        self.popup.bind(on_dismiss=self._dismissed)
+        self._close_event = None
+
+    def _dismissed(self, instance):
+        self.is_open = False
+
+    def show(self, missing):
+        """missing: list of (item_name, last_seen)."""
+        if len(missing) == 1:
+            name, last_seen = missing[0]
+            self.popup.title = "Missing Item"
+            self.label.text = f"Missing: {name}\nLast seen: {last_seen}"
+        else:
+            names = ", ".join(name for name, _ in missing[:ALERT_MAX_LISTED])
+            if len(missing) > ALERT_MAX_LISTED:
+                names += f" and {len(missing) - ALERT_MAX_LISTED} more"
+            self.popup.title = f"{len(missing)} Missing Items"
+            self.label.text = names
+        self.label.text_size = (230, None)
+
+        self.popup.pos = (Window.width - 260, Window.height - 120)
+        if not self.is_open:
+            self.popup.open()
+            self.is_open = True
+        if self._close_event is not None:
+            self._close_event.cancel()
+        self._close_event = Clock.schedule_once(lambda dt: self.popup.dismiss(), ALERT_DURATION)
+
+
+class UIUpdateQueue:
+    """
+    Collects item changes from any thread and applies them on the Kivy
+    thread at most once per frame: one registry update per item, one
+    dashboard row refresh per item, and one aggregated, rate-limited
+    missing-items notification however many messages arrived.
+    """
+
+    def __init__(self, main_screen, alert_interval=ALERT_INTERVAL):
+        self.main_screen = main_screen
+        self.alert_interval = alert_interval
+        self.lock = threading.Lock()
+        self.pending = {}    # item name -> fields to set
+        self.missing = {}    # item name -> last seen, waiting to be announced
+        self.refresh = set() # item names changed elsewhere (e.g. by the state daemon)
+        self.traces = set()  # trace ids of pending missing-item submissions (tracing only)
+        self.alert_traces = set()
+        self.full_refresh = False
+        self.last_alert = 0.0
+        self.alert = None
+        self._apply_trigger = Clock.create_trigger(self._apply)
+        self._alert_trigger = Clock.create_trigger(self._announce)
+
+    def submit(self, item_name, **fields):
+        with self.lock:
+            self.pending.setdefault(item_name, {}).update(fields)
+        self._apply_trigger()
+
+    def submit_missing(self, item_name, last_seen):
+        trace = tracing.current()
+        with self.lock:
+            self.pending.setdefault(item_name, {})["last_seen"] = last_seen
+            self.missing[item_name] = last_seen
+            if trace is not None:
+                self.traces.add(trace)
+        self._apply_trigger()
+
+    def submit_refresh(self, full, changed=(), removed=()):
+        """Redraw rows for changes already made to the registry, e.g. a state_socket mirror."""
+        with self.lock:
+            self.full_refresh = self.full_refresh or full
+            self.refresh.update(changed)
+            self.refresh.update(removed)
+        self._apply_trigger()
+
+    def _apply(self, dt):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            refresh, self.refresh = self.refresh, set()
+            full, self.full_refresh = self.full_refresh, False
+            traces, self.traces = self.traces, set()
+            self.alert_traces |= traces
+
+        with tracing.span("gui.apply", links=sorted(traces), items=len(pending)):
+            self._apply_changes(pending, refresh, full)
+        if self.missing:
+            self._announce(dt)
+
+    def _apply_changes(self, pending, refresh, full):
+        registry = get_registry()
+        if full:
+            self.main_screen.refresh_dashboard()
+            refresh = set()
+
+        changed = []
+        for item_name, fields in pending.items():
+            if registry.update_by_name(item_name, **fields) is not None:
+                changed.append(item_name)
+        for item_name in refresh.union(changed):
+            self.main_screen.refresh_item(item_name)
+
+    def _announce(self, dt):
+        wait = self.last_alert + self.alert_interval - time.monotonic()
+        if wait > 0:
+            # Rate limited: fold everything that arrives meanwhile into the next alert
+            self._alert_trigger.timeout = wait
+            self._alert_trigger()
+            return
+
+        with self.lock:
+            missing, self.missing = self.missing, {}
+            traces, self.alert_traces = self.alert_traces, set()
+        registry = get_registry()
+        missing = [(name, last) for name, last in missing.items() if registry.get_by_name(name) is not None]
+        if not missing:
+            return
+        with tracing.span("gui.alert", links=sorted(traces), items=len(missing)):
+            if self.alert is None:
+                self.alert = MissingAlert()
+            self.alert.show(missing)
+        self.last_alert = time.monotonic()
@@ -0,0 +1,266 @@
+# vision_benchmark.py
+#
+# Replays recorded or synthetic frames through the camera detectors as
+# fast as possible and reports throughput and per-stage latency.
+#
+#   python vision_benchmark.py --source clip.mp4 --detector both
+#   python vision_benchmark.py --source synthetic:500 --detector hog --motion-gate
+#   python vision_benchmark.py --source clip.mp4 --detector face --sweep --json fps.json
+import argparse
+import json
+import os
+import platform
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+import camera_monitor
+from frame_sources import open_source
+from motion_gate import MotionGate
+from person_tracker import make_hog_detector
+
+PERCENTILES = (50, 90, 99)
+SWEEP_SIZES = (160, 224, 300)
+SWEEP_PAIRS = (("default", "cpu"), ("opencv", "opencl"), ("opencv", "opencl_fp16"),
+               ("openvino", "cpu"), ("cuda", "cuda"), ("cuda", "cuda_fp16"))
+
+
+class StageTimer:
+    """Collects wall-clock durations per named stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def time(self, stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.samples[stage].append(time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        rows = {}
+        for stage, values in self.samples.items():
+            ms = np.asarray(values) * 1000.0
+            rows[stage] = {
+                "count": len(ms),
+                "mean_ms": float(ms.mean()),
+                **{f"p{p}_ms": float(np.percentile(ms, p)) for p in PERCENTILES},
+            }
+        return rows
+
+
+# ==============================
+# Detector runs
+# ==============================
+def make_face_run(gate, backend=None, target=None, size=None):
+    net = camera_monitor.load_face_net(backend, target)
+
+    def run(frame, timer):
+        if gate is not None and not timer.time("motion_gate", gate.should_infer, frame):
+            return None
+        resized = timer.time("resize", camera_monitor.resize_for_model, frame, size)
+        blob = timer.time("blobFromImage", camera_monitor.make_blob, resized, size)
+        net.setInput(blob)
+        detections = timer.time("forward", net.forward)
+        return timer.time("postprocess", camera_monitor.has_confident_face, detections)
+
+    return run
+
+
+def make_hog_run(gate):
+    detect = make_hog_detector()
+
+    def run(frame, timer):
+        if gate is not None and not timer.time("motion_gate", gate.should_infer, frame):
+            return None
+        resized = timer.time("resize", cv2.resize, frame, (640, 480))
+        rects = timer.time("detectMultiScale", detect, resized)
+        return timer.time("postprocess", lambda r: len(r) > 0, rects)
+
+    return run
+
+
+def benchmark(name, run, source_spec, max_frames, cooldown):
+    source = open_source(source_spec, realtime=False)
+    if not source.isOpened():
+        print(f"Could not open source {source_spec}")
+        return None
+
+    # Trigger counting uses the source's own clock, so cooldowns behave
+    # as they would live even though frames are replayed faster.
+    fps = getattr(source, "fps", 30.0) or 30.0
+    timer = StageTimer()
+    frames = detections = triggers = 0
+    last_trigger = -cooldown
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    while max_frames is None or frames < max_frames:
+        ret, frame = timer.time("read", source.read)
+        if not ret or frame is None:
+            break
+        detected = timer.time("total", run, frame, timer)
+        media_time = frames / fps
+        frames += 1
+        if detected:
+            detections += 1
+            if media_time - last_trigger > cooldown:
+                triggers += 1
+                last_trigger = media_time
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    source.release()
+
+    return {
+        "detector": name,
+        "frames": frames,
+        "wall_s": wall,
+        "fps": frames / wall if wall else 0.0,
+        "realtime_x": (frames / fps) / wall if wall else 0.0,
+        "cpu_s": cpu,
+        "cpu_per_frame_ms": cpu / frames * 1000.0 if frames else 0.0,
+        "detections": detections,
+        "triggers": triggers,
+        "stages": timer.summary(),
+    }
+
+
+def print_report(report):
+    print(f"\n=== {report['detector']} ===")
+    print(f"frames: {report['frames']}  wall: {report['wall_s']:.2f}s  "
+          f"fps: {report['fps']:.1f}  ({report['realtime_x']:.1f}x real time)")
+    print(f"cpu: {report['cpu_s']:.2f}s ({report['cpu_per_frame_ms']:.1f} ms/frame)  "
+          f"detections: {report['detections']}  triggers: {report['triggers']}")
+    header = "  ".join(f"{'p' + str(p):>8}" for p in PERCENTILES)
+    print(f"{'stage':<18}{'count':>7}  {'mean':>8}  {header}   (ms)")
+    for stage, row in report["stages"].items():
+        cols = "  ".join(f"{row[f'p{p}_ms']:8.2f}" for p in PERCENTILES)
+        print(f"{stage:<18}{row['count']:>7}  {row['mean_ms']:8.2f}  {cols}")
+
+
+# ==============================
+# Face detector configurations
+# ==============================
+def available_pairs():
+    """Backend/target pairs from SWEEP_PAIRS that this OpenCV build can run."""
+    pairs = []
+    for backend, target in SWEEP_PAIRS:
+        if backend not in camera_monitor.BACKENDS or target not in camera_monitor.TARGETS:
+            continue
+        try:
+            targets = cv2.dnn.getAvailableTargets(camera_monitor.BACKENDS[backend])
+        except (AttributeError, cv2.error):
+            targets = [camera_monitor.TARGETS["cpu"]] if backend == "default" else []
+        if camera_monitor.TARGETS[target] in targets or backend == "default":
+            pairs.append((backend, target))
+    return pairs
+
+
+def parse_pair(spec):
+    """'opencv/opencl' -> ("opencv", "opencl"); a bare backend runs on the cpu target."""
+    backend, _, target = spec.partition("/")
+    return backend, target or "cpu"
+
+
+def face_configs(args):
+    if args.sweep:
+        pairs = available_pairs()
+        sizes = args.input_size or SWEEP_SIZES
+        threads = args.threads or sorted({1, 2, os.cpu_count() or 1})
+    else:
+        pairs = [parse_pair(spec) for spec in args.backend or ["default/cpu"]]
+        sizes = args.input_size or [camera_monitor.INPUT_SIZE]
+        threads = args.threads or [camera_monitor.DNN_THREADS]
+    return [{"backend": b, "target": t, "input_size": size, "threads": n}
+            for b, t in pairs for size in sizes for n in threads]
+
+
+def config_name(config):
+    threads = config["threads"] or "default"
+    return f"face {config['backend']}/{config['target']} {config['input_size']}px {threads} threads"
+
+
+def benchmark_face(config, args):
+    """One face run under `config`; None if the backend cannot run here."""
+    default_threads = cv2.getNumThreads()
+    if config["threads"]:
+        cv2.setNumThreads(config["threads"])
+    try:
+        gate = MotionGate() if args.motion_gate else None
+        run = make_face_run(gate, config["backend"], config["target"], config["input_size"])
+        report = benchmark(config_name(config), run, args.source, args.max_frames, args.cooldown)
+    except (cv2.error, ValueError) as e:
+        print(f"Skipping {config_name(config)}: {str(e).strip().splitlines()[-1]}")
+        return None
+    finally:
+        cv2.setNumThreads(default_threads)
+    if report is not None:
+        report["config"] = config
+    return report
+
+
+def print_fps_table(reports):
+    """Which configuration reached what FPS on this machine, fastest first."""
+    print(f"\n=== FPS by configuration on {platform.machine()} ({os.cpu_count()} CPUs, OpenCV {cv2.__version__}) ===")
+    print(f"{'configuration':<46}{'fps':>8}{'forward p50':>13}{'cpu ms/frame':>14}{'detections':>12}")
+    for report in sorted(reports, key=lambda r: r["fps"], reverse=True):
+        forward = report["stages"].get("forward") or report["stages"].get("detectMultiScale") or {}
+        print(f"{report['detector']:<46}{report['fps']:8.1f}{forward.get('p50_ms', 0.0):13.2f}"
+              f"{report['cpu_per_frame_ms']:14.1f}{report['detections']:12}")
+
+
+def save_reports(reports, path):
+    machine = {"machine": platform.machine(), "platform": platform.platform(),
+               "cpus": os.cpu_count(), "opencv": cv2.__version__}
+    with open(path, "w") as f:
+        json.dump({"machine": machine, "reports": reports}, f, indent=2)
+    print(f"Saved {len(reports)} reports to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the camera detectors")
+    parser.add_argument("--source", default="synthetic:300", help="video file, image directory, camera index or synthetic[:N]")
+    parser.add_argument("--detector", choices=("face", "hog", "both"), default="both")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--motion-gate", action="store_true", help="put a MotionGate in front of the detector")
+    parser.add_argument("--cooldown", type=float, default=camera_monitor.COOLDOWN)
+    parser.add_argument("--backend", nargs="+", metavar="BACKEND[/TARGET]",
+                        help=f"face: backend/target pairs, from {sorted(camera_monitor.BACKENDS)} / "
+                             f"{sorted(camera_monitor.TARGETS)}")
+    parser.add_argument("--input-size", nargs="+", type=int, help="face: input sizes to try")
+    parser.add_argument("--threads", nargs="+", type=int, help="face: OpenCV thread counts to try (0 = default)")
+    parser.add_argument("--sweep", action="store_true",
+                        help="face: try every available backend/target with several input sizes and thread counts")
+    parser.add_argument("--json", metavar="FILE", help="also save all reports with machine details to FILE")
+    args = parser.parse_args()
+
+    reports = []
+    configs = []
+    if args.detector in ("face", "both"):
+        try:
+            camera_monitor.load_face_net()
+            configs = face_configs(args)
+        except Exception as e:
+            print("Skipping face detector, model could not be loaded:", e)
+    for config in configs:
+        report = benchmark_face(config, args)
+        if report is not None:
+            print_report(report)
+            reports.append(report)
+    if args.detector in ("hog", "both"):
+        report = benchmark("hog", make_hog_run(MotionGate() if args.motion_gate else None),
+                           args.source, args.max_frames, args.cooldown)
+        if report is not None:
+            print_report(report)
+            reports.append(report)
+
+    if len(reports) > 1:
+        print_fps_table(reports)
+    if args.json:
+        save_reports(reports, args.json)
+
+
+if __name__ == "__main__":
+    main()
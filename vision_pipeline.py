@@ -0,0 +1,182 @@
+# vision_pipeline.py
+import threading
+import time
+
+import tracing
+from metrics import counter
+
+PIPELINE_METRICS = (
+    ("captured", "edc_pipeline_frames_captured_total", "Frames read from the source"),
+    ("inferred", "edc_pipeline_frames_inferred_total", "Frames that reached the inference stage"),
+    ("frames_dropped", "edc_pipeline_frames_dropped_total", "Frames superseded before inference"),
+    ("results_dropped", "edc_pipeline_results_dropped_total", "Results superseded before the trigger stage"),
+    ("read_failures", "edc_pipeline_read_failures_total", "Failed reads from the source"),
+)
+
+
+class LatestSlot:
+    """
+    Single-slot mailbox: put() overwrites whatever is waiting, get()
+    returns only the newest value. Values that were overwritten before
+    anyone took them are counted in `dropped`.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.value = None
+        self.stamp = 0.0
+        self.seq = 0
+        self.taken = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, value, stamp=None):
+        with self.cond:
+            if self.seq > self.taken:
+                self.dropped += 1
+            self.value = value
+            self.stamp = time.time() if stamp is None else stamp
+            self.seq += 1
+            self.cond.notify_all()
+
+    def get(self, timeout=None):
+        """Wait for a value newer than the last one taken. Returns (value, stamp) or None."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > self.taken or self.closed, timeout):
+                return None
+            if self.seq == self.taken:
+                return None
+            self.taken = self.seq
+            value, self.value = self.value, None
+            return value, self.stamp
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class FramePipeline:
+    """
+    Three-stage camera pipeline:
+      capture   - reads frames as fast as the camera delivers them into a LatestSlot
+      inference - takes only the newest frame and runs infer(frame)
+      trigger   - takes only the newest result and calls on_result(result, frame, captured_at)
+    A slow stage never builds a backlog: older frames/results are replaced,
+    so a trigger acts on a frame at most one inference old. With tracing on,
+    each frame gets a trace id that on_result and everything it calls inherit.
+    An optional `controller` (see rate_controller) paces the inference stage.
+
+    When a finite source (a clip, an image directory) runs out, the
+    stages drain the last frame and exit; `finished` is set once the
+    trigger stage is done, and wait() returns.
+    """
+
+    def __init__(self, cap, infer, on_result, read_retry_delay=0.1, controller=None):
+        self.cap = cap
+        self.infer = infer
+        self.on_result = on_result
+        self.read_retry_delay = read_retry_delay
+        self.controller = controller
+
+        self.frames = LatestSlot()
+        self.results = LatestSlot()
+        self.stopping = threading.Event()
+        self.finished = threading.Event()
+        self.threads = []
+
+        self.captured = 0
+        self.inferred = 0
+        self.read_failures = 0
+
+    def start(self):
+        for target, name in ((self._capture_loop, "capture"),
+                             (self._inference_loop, "inference"),
+                             (self._trigger_loop, "trigger")):
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.frames.close()
+        self.results.close()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        self.threads = []
+
+    def wait(self):
+        for thread in self.threads:
+            thread.join()
+
+    def _capture_loop(self):
+        while not self.stopping.is_set():
+            trace = tracing.new_trace()
+            with tracing.span("capture", trace):
+                ret, frame = self.cap.read()
+            if not ret or frame is None:
+                if getattr(self.cap, "ended", False):
+                    break   # end of a clip: let the other stages drain
+                self.read_failures += 1
+                time.sleep(self.read_retry_delay)
+                continue
+            self.captured += 1
+            self.frames.put((frame, trace))
+        self.frames.close()
+
+    def _inference_loop(self):
+        controller = self.controller
+        while not self.stopping.is_set():
+            if controller is not None and not controller.pace(self.stopping):
+                break
+            taken = self.frames.get(timeout=0.5)
+            if taken is None:
+                if self.frames.closed:
+                    break
+                continue
+            (frame, trace), captured_at = taken
+            try:
+                with tracing.span("inference", trace):
+                    result = self.infer(frame)
+            except Exception as e:
+                print("Error running inference:", e)
+                continue
+            self.inferred += 1
+            if controller is not None:
+                controller.record(captured_at)
+            self.results.put((result, frame, trace), stamp=captured_at)
+        self.results.close()
+
+    def _trigger_loop(self):
+        try:
+            while not self.stopping.is_set():
+                taken = self.results.get(timeout=0.5)
+                if taken is None:
+                    if self.results.closed:
+                        break
+                    continue
+                (result, frame, trace), captured_at = taken
+                try:
+                    with tracing.span("trigger", trace):
+                        self.on_result(result, frame, captured_at)
+                except Exception as e:
+                    print("Error handling detection:", e)
+        finally:
+            self.finished.set()
+
+    def stats(self):
+        return {
+            "captured": self.captured,
+            "inferred": self.inferred,
+            "frames_dropped": self.frames.dropped,
+            "results_dropped": self.results.dropped,
+            "read_failures": self.read_failures,
+        }
+
+
+def export_pipeline_metrics(pipeline, name):
+    """Expose pipeline.stats() as counters labelled pipeline=name, read only at scrape time."""
+    for key, metric, help in PIPELINE_METRICS:
+        counter(metric, help, ["pipeline"]).labels(pipeline=name).set_function(lambda key=key: pipeline.stats()[key])